@@ -0,0 +1,86 @@
+#File for resolving many battles at once with NumPy, for simulations
+# resolve() plays thousands of battles side by side, one round of all of them per step,
+# with the same rules as MUDGame's battles when Steve has no food and just attacks:
+# 1. Steve hits the creature for his attack, if the creature dies Steve wins.
+# 2. The creature moves: a boss at 50 HP or less heals 10 to 20 HP instead of attacking with a 31 in 101 chance
+#    (Boss.random_move), otherwise it hits Steve, whose defence takes off that percentage of the damage (Steve.take_damage).
+#    If Steve dies the creature wins.
+# The interactive game keeps resolving battles one round at a time.
+# Needs numpy, unlike the rest of the game.
+# e.g.
+#   result = resolve(*arrays_from(steves, creatures), rng=np.random.default_rng(1))
+#   print((result.winner == STEVE_WINS).mean())
+from typing import NamedTuple
+
+import numpy as np
+
+from data import *
+
+UNFINISHED, STEVE_WINS, CREATURE_WINS = 0, 1, 2 # values of BatchResult.winner
+BOSS_HEAL_THRESHOLD = 50 # a boss above this many HP always attacks
+BOSS_HEAL_CHANCE = 30 # out of 0 to 100 inclusive, like randint(0, 100) <= 30
+BOSS_HEAL_MIN, BOSS_HEAL_MAX = 10, 20
+
+
+class BatchResult(NamedTuple):
+    winner: np.ndarray         # int8, UNFINISHED, STEVE_WINS or CREATURE_WINS
+    rounds: np.ndarray         # int32, rounds played, a round being Steve's hit and the creature's move
+    steve_hp: np.ndarray       # int64, Steve's HP at the end
+    creature_hp: np.ndarray    # int64, the creature's HP at the end
+
+
+def arrays_from(steves: list[Steve], creatures: list[Creature]) -> tuple:
+    """Stats of battles between steves[i] and creatures[i], as the arrays resolve() takes.
+    Nothing is changed, the battles are only played on the arrays."""
+    if len(steves) != len(creatures):
+        raise ValueError(f"arrays_from() needs as many Steves as creatures, not {len(steves)} and {len(creatures)}.")
+    return (
+        np.array([steve.health for steve in steves], dtype=np.int64),
+        np.array([steve.get_attack() for steve in steves], dtype=np.int64),
+        np.array([steve.get_defence() for steve in steves], dtype=np.int64),
+        np.array([creature.hitpoints for creature in creatures], dtype=np.int64),
+        np.array([creature.maxhp for creature in creatures], dtype=np.int64),
+        np.array([creature.attack for creature in creatures], dtype=np.int64),
+        np.array([isinstance(creature, Boss) for creature in creatures], dtype=bool),
+    )
+
+def resolve(steve_hp, steve_attack, steve_defence, creature_hp, creature_maxhp, creature_attack, is_boss,
+            rng: np.random.Generator = None, max_rounds: int = 1000) -> BatchResult:
+    """Plays battle i between a Steve with steve_hp[i], steve_attack[i] and steve_defence[i]
+    and a creature with creature_hp[i] (out of creature_maxhp[i]) and creature_attack[i], which is a boss if is_boss[i].
+    The arguments can be arrays or scalars, scalars apply to every battle. The input arrays are not changed.
+    Battles that are not over after max_rounds rounds (e.g. nobody does any damage) are UNFINISHED."""
+    if rng is None:
+        rng = np.random.default_rng()
+    steve_hp, steve_attack, steve_defence, creature_hp, creature_maxhp, creature_attack = (
+        np.array(a, dtype=np.int64) for a in np.broadcast_arrays(steve_hp, steve_attack, steve_defence,
+                                                                  creature_hp, creature_maxhp, creature_attack))
+    is_boss = np.broadcast_to(np.asarray(is_boss, dtype=bool), steve_hp.shape)
+    # damage Steve takes from each creature's hit, the same float maths as Steve.take_damage, truncated like int()
+    hit = (creature_attack * ((100 - steve_defence) / 100)).astype(np.int64)
+    winner = np.full(steve_hp.shape, UNFINISHED, dtype=np.int8)
+    rounds = np.zeros(steve_hp.shape, dtype=np.int32)
+    winner[steve_hp <= 0] = CREATURE_WINS # already over
+    winner[(creature_hp <= 0) & (winner == UNFINISHED)] = STEVE_WINS
+    active = np.flatnonzero(winner == UNFINISHED)
+    for _ in range(max_rounds):
+        if active.size == 0:
+            break
+        rounds[active] += 1
+        # Steve hits
+        creature_hp[active] = np.maximum(0, creature_hp[active] - steve_attack[active])
+        dead = creature_hp[active] <= 0
+        winner[active[dead]] = STEVE_WINS
+        active = active[~dead]
+        # the creature moves, low bosses may heal instead
+        healing = is_boss[active] & (creature_hp[active] <= BOSS_HEAL_THRESHOLD)
+        healing[healing] = rng.integers(0, 101, size=int(healing.sum())) <= BOSS_HEAL_CHANCE
+        healers = active[healing]
+        heal = rng.integers(BOSS_HEAL_MIN, BOSS_HEAL_MAX + 1, size=healers.size)
+        creature_hp[healers] = np.minimum(creature_hp[healers] + heal, creature_maxhp[healers])
+        hitters = active[~healing]
+        steve_hp[hitters] = np.maximum(0, steve_hp[hitters] - hit[hitters])
+        dead = steve_hp[active] <= 0
+        winner[active[dead]] = CREATURE_WINS
+        active = active[~dead]
+    return BatchResult(winner, rounds, steve_hp, creature_hp)
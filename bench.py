@@ -0,0 +1,344 @@
+#File for measuring how fast the hot paths of the game are
+# Runs every benchmark case, prints a table and can write the results as JSON to compare commits.
+# e.g. python bench.py --json before.json
+#      (change things)
+#      python bench.py --json after.json --compare before.json
+#      python bench.py --filter generate --sizes 10 100 1000
+#      python bench.py --filter memory --baseline 7f998f1    (the same cases on an older commit, then compared)
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from game import *
+
+DEFAULT_SIZES = [10, 100, 300]
+DIRLIST_NAMES = [NORTH, SOUTH, EAST, WEST]
+
+
+# A benchmark takes its parameters and returns (run, ops): run() does the work being timed once, and ops
+# is how many operations one run() does, for operations per second. Setting up happens before returning.
+
+def bench_generate(size: int):
+    def run():
+        Labyrinth(size, rng=RandomStreams(1)).generate()
+    return run, 1
+
+def bench_generate_random(size: int):
+    def run():
+        Labyrinth(size, rng=RandomStreams(1)).generate_random(verbose=False)
+    return run, 1
+
+def _maze(size: int) -> Labyrinth:
+    lab = Labyrinth(size, rng=RandomStreams(1))
+    lab.generate_random(verbose=False)
+    return lab
+
+def bench_can_move_here(size: int, calls: int = 10000):
+    lab = _maze(size)
+    rng = random.Random(1)
+    queries = [([rng.randrange(size), rng.randrange(size)], rng.choice(DIRLIST_NAMES)) for _ in range(calls)]
+    def run():
+        can_move_here = lab.can_move_here
+        for coords, direction in queries:
+            can_move_here(coords, direction)
+    return run, calls
+
+def bench_move_steve(size: int, moves: int = 2000):
+    lab = _maze(size)
+    rng = random.Random(1)
+    def run():
+        for _ in range(moves):
+            options = [d for d in DIRLIST_NAMES if lab.can_move_here(lab.steve_pos, d)]
+            lab.move_steve(rng.choice(options))
+    return run, moves
+
+def bench_battle(battles: int = 200, food: int = 0):
+    """Whole battles through MUDGame.step(), against a fresh creature each time.
+    With no food a battle is resolved in one step, with food the player is asked every round."""
+    game = MUDGame(1)
+    game.step("bench")
+    rng = random.Random(1)
+    snack = Food("Bench Apple", "Food", 1)
+    def run():
+        for _ in range(battles):
+            game.steve = Steve()
+            if food:
+                game.steve._add_item_to_inv(snack, food)
+            game.maze.get_room(game.maze.get_current_pos()).set_creature(Creature("Bench Zombie", 30, 8, rng))
+            game.state = ASK_FIGHT
+            game.step("1")
+            while game.state == ASK_BATTLE:
+                game.step("1")
+    return run, battles
+
+def bench_repr(size: int, frames: int = 20):
+    """Drawing the map while Steve walks, the first frame draws everything."""
+    lab = _maze(size)
+    rng = random.Random(1)
+    def run():
+        lab._renderer = None
+        for _ in range(frames):
+            options = [d for d in DIRLIST_NAMES if lab.can_move_here(lab.steve_pos, d)]
+            lab.move_steve(rng.choice(options))
+            repr(lab)
+    return run, frames
+
+def bench_shortest_path(size: int, method: str, queries: int = 20):
+    """Paths between random rooms, without the PathFinder cache."""
+    import pathfinding
+    lab = _maze(size)
+    rng = random.Random(1)
+    pairs = [([rng.randrange(size), rng.randrange(size)], [rng.randrange(size), rng.randrange(size)]) for _ in range(queries)]
+    search = pathfinding.astar if method == pathfinding.ASTAR else pathfinding.bidirectional_bfs
+    def run():
+        for start, goal in pairs:
+            search(lab, start, goal)
+    return run, queries
+
+def bench_random_creature(spawns: int = 10000):
+    rng = random.Random(1)
+    def run():
+        for i in range(spawns):
+            random_creature(rng, i % 20, i % 50)
+    return run, spawns
+
+def bench_random_item(spawns: int = 10000):
+    rng = random.Random(1)
+    def run():
+        for i in range(spawns):
+            random_item(rng, i % 20, i % 50)
+    return run, spawns
+
+# A memory case makes one object the way the game would, from a number. Its result is how many bytes
+# each one takes on average, counting everything allocated for it but not what it shares with others (e.g. items in rooms).
+# Rooms are not objects the game keeps (see RoomColumns), so they are measured on whole labyrinths below.
+
+def _creature(i: int) -> Creature:
+    return Creature("Bench Zombie", 30, 8, _MEMORY_RNG)
+
+def _item(i: int) -> Item:
+    return Food("Bench Apple", "Food", i % 20)
+
+_MEMORY_RNG = random.Random(1)
+MEMORY_CASES = {
+    "creature": _creature,
+    "item": _item,
+}
+
+def measure_memory(make, count: int = 20000) -> dict:
+    """Bytes taken by each of count objects made by make(i), using tracemalloc."""
+    objects = [None] * count # the list is not counted
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            objects[i] = make(i)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return {"count": count, "bytes_per_object": (after - before) / count}
+
+# Labyrinths are measured in bytes per cell: everything a generated labyrinth allocates, divided by its number of rooms.
+# An explored labyrinth has also had every room looked at and marked cleared, as Steve walking through all of it would.
+# A room is measured as what exploring adds to a labyrinth, per room, plus the room columns (see RoomColumns) that are
+# made with the labyrinth, so that it is all the room state and nothing else (the random streams, the passages...).
+# Only the labyrinth's public methods are used, so this file can be run on older commits to make a baseline (see --baseline),
+# and compare() tells whether rooms take MEMORY_TARGET times less than in the baseline.
+MEMORY_TARGET = 10
+
+def measure_labyrinth_memory(size: int, explored: bool = False) -> dict:
+    """Bytes per cell of a generated size by size labyrinth, using tracemalloc."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        lab = _maze(size)
+        if explored:
+            _explore(lab)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return {"size": size, "explored": explored, "bytes_per_cell": (after - before) / (size * size)}
+
+def _explore(lab: Labyrinth) -> None:
+    for x in range(lab.width):
+        for y in range(lab.height):
+            lab.get_room([x, y]).cleared = True
+
+def measure_room_memory(size: int) -> dict:
+    """Bytes of room state per room of a generated and explored size by size labyrinth, using tracemalloc."""
+    lab = _maze(size)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        _explore(lab)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    columns = getattr(lab.rooms, "flags", None) # older commits keep Room objects in a dict instead
+    if columns is not None:
+        after += sys.getsizeof(columns) + sys.getsizeof(lab.rooms.creatures) + sys.getsizeof(lab.rooms.items)
+    return {"size": size, "bytes_per_room": (after - before) / (size * size)}
+
+def cases(sizes: list[int]) -> list[tuple[str, object, dict]]:
+    """Every benchmark case: (name, benchmark, parameters)."""
+    found = []
+    for size in sizes:
+        found.append((f"generate[{size}]", bench_generate, {"size": size}))
+    for size in sizes:
+        found.append((f"generate_random[{size}]", bench_generate_random, {"size": size}))
+    for size in sizes:
+        found.append((f"can_move_here[{size}]", bench_can_move_here, {"size": size}))
+        found.append((f"move_steve[{size}]", bench_move_steve, {"size": size}))
+    found.append(("battle[no food]", bench_battle, {"food": 0}))
+    found.append(("battle[food]", bench_battle, {"food": 5}))
+    for size in sizes:
+        found.append((f"repr[{size}]", bench_repr, {"size": size}))
+    for size in sizes:
+        for method in ("astar", "bidirectional"):
+            found.append((f"shortest_path[{method},{size}]", bench_shortest_path, {"size": size, "method": method}))
+    found.append(("random_creature", bench_random_creature, {}))
+    found.append(("random_item", bench_random_item, {}))
+    return found
+
+def measure(benchmark, params: dict, min_time: float = 0.2, min_runs: int = 3, max_runs: int = 1000) -> dict:
+    """Times run() at least min_runs times and until min_time seconds were spent, after one warm-up run."""
+    with redirect_stdout(io.StringIO()): # the game's loading messages
+        run, ops = benchmark(**params)
+        run()
+        times = []
+        total = 0.0
+        while len(times) < max_runs and (len(times) < min_runs or total < min_time):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            times.append(elapsed)
+            total += elapsed
+    median = statistics.median(times)
+    return {
+        "params": params,
+        "runs": len(times),
+        "ops_per_run": ops,
+        "min_s": min(times),
+        "median_s": median,
+        "mean_s": statistics.mean(times),
+        "stdev_s": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "ops_per_s": ops / median if median > 0 else None,
+    }
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_at_commit(commit: str, sizes: list[int], name_filter: str = None, min_time: float = 0.2) -> dict:
+    """Runs this file's benchmark cases on the game as it was at a git commit, checked out in a temporary worktree."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tree = os.path.join(temp_dir, "tree")
+        subprocess.run(["git", "worktree", "add", "--detach", tree, commit], capture_output=True, check=True)
+        try:
+            shutil.copy(__file__, os.path.join(tree, "bench.py"))
+            output = os.path.join(temp_dir, "baseline.json")
+            command = [sys.executable, "bench.py", "--sizes", *map(str, sizes), "--min-time", str(min_time), "--json", output]
+            if name_filter is not None:
+                command += ["--filter", name_filter]
+            subprocess.run(command, cwd=tree, stdout=subprocess.DEVNULL, check=True)
+            with open(output, encoding="utf-8") as f:
+                return json.load(f)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", tree], capture_output=True)
+
+def run_benchmarks(sizes: list[int] = DEFAULT_SIZES, name_filter: str = None, min_time: float = 0.2) -> dict:
+    """Runs the benchmark cases whose name contains name_filter (all of them if None)."""
+    results = {}
+    for name, benchmark, params in cases(sizes):
+        if name_filter is not None and name_filter not in name:
+            continue
+        results[name] = measure(benchmark, params, min_time)
+        print(f"{name:<28} {results[name]['median_s'] * 1000:>10.3f} ms {results[name]['ops_per_s']:>14,.0f} ops/s", flush=True)
+    memory = {}
+    for name, make in MEMORY_CASES.items():
+        name = f"memory[{name}]"
+        if name_filter is not None and name_filter not in name:
+            continue
+        memory[name] = measure_memory(make)
+        print(f"{name:<28} {memory[name]['bytes_per_object']:>10.1f} bytes each", flush=True)
+    for size in sizes:
+        name = f"memory[room,{size}]"
+        if name_filter is None or name_filter in name:
+            memory[name] = measure_room_memory(size)
+            print(f"{name:<28} {memory[name]['bytes_per_room']:>10.1f} bytes per room", flush=True)
+        for explored in (False, True):
+            name = f"memory[labyrinth{',explored' if explored else ''},{size}]"
+            if name_filter is not None and name_filter not in name:
+                continue
+            memory[name] = measure_labyrinth_memory(size, explored)
+            print(f"{name:<28} {memory[name]['bytes_per_cell']:>10.1f} bytes per cell", flush=True)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+        "memory": memory,
+    }
+
+def compare(current: dict, baseline: dict) -> None:
+    """Prints how much faster (> 1) or slower (< 1) each case is than in baseline."""
+    print(f"\nCompared with {baseline['meta'].get('commit')}:")
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:<28} (new)")
+            continue
+        print(f"{name:<28} {old['median_s'] / result['median_s']:>6.2f}x")
+    for name, result in current.get("memory", {}).items():
+        old = baseline.get("memory", {}).get(name)
+        if old is None:
+            print(f"{name:<28} (new)")
+            continue
+        key = next(key for key in ("bytes_per_room", "bytes_per_cell", "bytes_per_object") if key in result)
+        smaller = old[key] / result[key]
+        target = ""
+        if key == "bytes_per_room":
+            target = f", target {MEMORY_TARGET}x {'met' if smaller >= MEMORY_TARGET else 'NOT met'}"
+        print(f"{name:<28} {smaller:>6.2f}x smaller{target}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measures the speed of the game's hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="labyrinth sizes")
+    parser.add_argument("--filter", help="only run the cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each case, at least")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="results of an earlier run to compare with")
+    parser.add_argument("--baseline", metavar="COMMIT", help="run the same cases on the game at this git commit and compare with it")
+    args = parser.parse_args()
+    if args.compare and args.baseline:
+        parser.error("--compare and --baseline cannot be used together")
+    results = run_benchmarks(args.sizes, args.filter, args.min_time)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+    if args.baseline:
+        compare(results, run_at_commit(args.baseline, args.sizes, args.filter, args.min_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,11 @@
 import json
 import random
 import math
-import time
+import os
+import pickle
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
 
 NORTH = "NORTH"
 SOUTH = "SOUTH"
@@ -14,6 +18,9 @@ EAST = "EAST"
 # MASTER = "MASTER"
 STARTROOM = "STARTROOM"
 DIRLIST = [[0, 1], [0, -1], [1, 0], [-1, 0]] # according to N, S, E, W
+DIRBITS = {NORTH: 1, SOUTH: 2, EAST: 4, WEST: 8} # bits of a room's passage mask
+DIROFFSETS = {NORTH: (0, 1), SOUTH: (0, -1), EAST: (1, 0), WEST: (-1, 0)}
+OPPOSITE = {NORTH: SOUTH, SOUTH: NORTH, EAST: WEST, WEST: EAST}
 PI = 3.14159265359
 
 #STANLEY TEST
@@ -53,30 +60,45 @@ def direction_of(targetcoords: list[int], neighbourcoords: list[int]) -> "NORTH
         if xdiff == -1:
             return WEST
 
-labsize = 10 # cannot be too small!!
-def valid_coords(roomcoords: list[int]) -> bool:
-    if type(roomcoords) is not list:
-        print(f"valid_coords() says that roomcoords {roomcoords} is not a list.")
-        return False
-    if len(roomcoords) != 2:
-        print(f"valid_coords() says that roomcoords {roomcoords} does not have exactly 2 elements.")
-        return False
-    i, j = roomcoords
-    if type(i) is not int or type(j) is not int:
-        return False
-        print(f"valid_coords() says that roomcoords {roomcoords} elements are not type int.")
-    if i not in list(range(labsize)) or j not in list(range(labsize)):
-        return False
-        print(f"valid_coords() says that roomcoords {roomcoords} elements are not within integers from 0 to {labsize - 1}.")
-    return True
+class RandomStreams:
+    """
+    Independent random number generators for one game, all derived from a single seed,
+    so that a game can be replayed exactly and games never share random state.
+
+    -- ATTRIBUTES --
+    + seed: int or str
+    + maze: random.Random, for generating the maze and moving the boss
+    + spawn: random.Random, for creatures and items appearing in rooms
+    + combat: random.Random, for everything that happens in battles
+    """
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.randrange(2 ** 63) # follows random.seed(), if anyone set it
+        self.seed = seed
+        self.maze = random.Random(f"{seed}/maze")
+        self.spawn = random.Random(f"{seed}/spawn")
+        self.combat = random.Random(f"{seed}/combat")
+
+labsize = 10 # default width and height of a labyrinth
+MIN_LABSIZE = 4 # cannot be too small!!
+LINK_CHANCE = 0.58 # chance of a room linking to a neighbour while the maze is generated
 
 class Labyrinth:
     """
     -- ATTRIBUTES --
-    - lab: list[list[Room]]
+    - width: int
+    - height: int
+    - passages: bytearray, one 4-bit passage mask per cell (see DIRBITS), indexed by x * height + y
+    - rooms: RoomColumns, what is in every room, indexed like passages
     - difficulty_level
     - boss_pos: list[int]
     - steve_pos: list[int]
+    - start_pos: list[int]
+    - turn: int
+    - boss_hunting: bool, whether the boss walks towards Steve instead of wandering
+    - visited: bytearray, 1 for every cell Steve has been in, indexed like passages
+    - rng: RandomStreams, maze is used for generation and the boss, spawn for the rooms' contents
+    + version: int, goes up every time passages change, so anything worked out from them knows when it is out of date
 
     -- METHODS
     + generate(self) -> None
@@ -84,112 +106,108 @@ class Labyrinth:
     - generate_cmaze(startroom_pos: list) -> None:
     - generate_link_rooms(room1coords: list, room2coords: list) -> None:
     - generate_rooms_connected() -> bool:
+    + valid_coords(self, roomcoords: list[int]) -> bool
+    + get_room(self, roomcoords: list[int]) -> Room
+    + set_access(self, room1coords: list[int], room2coords: list[int]) -> None
+    + boss_distances(self) -> DistanceField
+    + boss_distance(self, coords: list[int]) -> int
+    + renderer(self) -> MapRenderer
     + move_boss(self) -> None:
     + can_move_here(self, coords: list(int), direction):
     + steve_useitem(self, item: Item) -> None
     + monster_roar(self) -> None
     
     """
-    def __init__(self):
-        nonelist = [None] * labsize
-        self.lab = []
-        for i in range(labsize):
-            self.lab.append(nonelist.copy())
+    def __init__(self, width: int = labsize, height: int = None, rng: RandomStreams = None):
+        if height is None:
+            height = width
+        if width < MIN_LABSIZE or height < MIN_LABSIZE:
+            raise ValueError(f"Labyrinth of {width} by {height} rooms is too small, it must be at least {MIN_LABSIZE} by {MIN_LABSIZE}.")
+        self.width = width
+        self.height = height
+        if rng is None:
+            rng = RandomStreams()
+        self.rng = rng
+        self.passages = bytearray(width * height)
+        self.rooms = RoomColumns(width * height)
+        self._connected = bytearray(width * height) # only used during generation
+        self._boss_field = None # built the first time it is needed
+        self._renderer = None # built the first time the map is drawn
+        self.visited = bytearray(width * height)
         self.difficulty_level = None
         self.boss_pos = [-1, -1] # Decided upon generation
         self.steve_pos = [-1, -1] # Decided upon generation
-        self.posscoords = list(range(labsize))
+        self.start_pos = [-1, -1] # Decided upon generation
+        self.turn = 1 # number of rooms Steve has entered, counting the startroom
+        self.boss_hunting = False
+        self.version = 0
 
     def __repr__(self):
-        outputstr = ""
-        for y in range(labsize):
-            fulltopstr = ""
-            fullmidstr = ""
-            fullbottomstr = ""
-            for x in range(labsize):
-                room = self.lab[x][labsize - y - 1]
-                N, S, E, W = room.get_neighbours_accessibility()
-                if N:
-                    topstr = " || "
-                else:
-                    topstr = "    "
-                if S:
-                    bottomstr = " || "
-                else:
-                    bottomstr = "    "
-                if W:
-                    midstr = "="
-                else:
-                    midstr = " "
-                if room.steve_ishere():
-                    midstr += "S"
-                else:
-                    midstr += "/"
-                if room.boss_ishere():
-                    midstr += "B"
-                else:
-                    midstr += "/"
-                if E:
-                    midstr += "="
-                else:
-                    midstr += " "
-                fulltopstr += topstr
-                fullmidstr += midstr
-                fullbottomstr += bottomstr
-            outputstr += fulltopstr + "\n" + fullmidstr + "\n" + fullbottomstr + "\n"
-        return outputstr                    
-                
-                    
+        return self.renderer().render()
+
+    def _reset(self) -> None:
+        """Clears the passages and rooms before a new maze is generated."""
+        self.passages = bytearray(self.width * self.height)
+        self.rooms = RoomColumns(self.width * self.height)
+        self._connected = bytearray(self.width * self.height)
+        self._boss_field = None
+        self._renderer = None
+        self.visited = bytearray(self.width * self.height)
+        self.turn = 1
+        self.version += 1
 
     def generate(self) -> None:
         """Generates a maze without walls"""
-        for x in range(labsize):
-            for y in range(labsize):
-                self.lab[x][y] = Room(x, y)
+        self._reset()
         self._generate_place_steve_boss()
         self._generate_nowalls()
+        self.version += 1
 
     def _generate_nowalls(self) -> None:
         """Helper method for the generate() method. Makes sure all rooms are connected to all adjacent rooms in the labyrinth."""
-        for x in range(labsize):
-            for y in range(labsize):
-                this = self.lab[x][y]
-                for i in range(4):
-                    directionnum = DIRLIST[i]
-                    neighbourx, neighboury = x + directionnum[0], y + directionnum[1]
-                    if valid_coords([neighbourx, neighboury]):
-                        neighbour = self.lab[neighbourx][neighboury]
-                        direction = [NORTH, SOUTH, EAST, WEST][i]
-                        this.connect_dir(direction, neighbour)
+        for x in range(self.width):
+            for y in range(self.height):
+                mask = 0
+                if y + 1 < self.height:
+                    mask |= DIRBITS[NORTH]
+                if y > 0:
+                    mask |= DIRBITS[SOUTH]
+                if x + 1 < self.width:
+                    mask |= DIRBITS[EAST]
+                if x > 0:
+                    mask |= DIRBITS[WEST]
+                self.passages[x * self.height + y] = mask
+                self._connected[x * self.height + y] = 1
                                                      
         
-    def generate_random(self) -> None:
+    def generate_random(self, link_chance: float = LINK_CHANCE, verbose: bool = True) -> None:
         """Generates the maze by:
         1. Filling in empty rooms in the empty maze
         2. Chooses (somewhat) randomly which room is the startroom room where Steve is placed
         3. Places the boss room opposite to startroom
         4. Makes the rooms connected like a maze structure (with walls)
         5. (Unimplemented functionality) Takes in a difficulty level and sets the game accordingly
+
+        link_chance is the chance that a room links to a neighbour while the maze is carved.
+        Higher values give long winding corridors, lower values give more open areas.
+        verbose: whether to print loading messages, background generation turns them off.
         
         Requires the use of helper methods, namely:
 
         _generate_place_steve_boss()
         _generate_maze()
-        _generate_recursive_linking()
-        _generate_count_unconnected_rooms()
+        _generate_iterative_linking()
         _generate_force_connect()
-        _generate_is_linkable_by_recursive()
-        _generate_link_rooms()
+        _generate_count_unconnected_rooms()
         """
         # self.difficulty_level = difficulty_level
-        # put in empty rooms
-        for x in range(labsize):
-            for y in range(labsize):
-                self.lab[x][y] = Room(x, y)
+        # start from a grid with no passages at all
+        self._reset()
         # choose location for steve and boss
         self._generate_place_steve_boss()
         # connecting all the rooms in a maze-like fashion
-        self._generate_maze(self.steve_pos)
+        self._generate_maze(self.steve_pos, link_chance, verbose)
+        self.version += 1 # the maze is carved straight into passages
     
 
     def _generate_place_steve_boss(self) -> None:
@@ -202,187 +220,277 @@ class Labyrinth:
         - The possible rooms to be picked are rooms nearer to the perimeter than the center.
         - e.g. If the labyrinth is 10 by 10 rooms, the middle 6 by 6 rooms cannot be chosen as startroom. the surrounding 64 rooms can be chosen as rooms.
         - Of the 64 rooms nearing the far sides of the labyrinth, one room is chosen at random.
-        - This means that labsize cannot be too small, or the generation may break. ie labsize cannot be less than 4.
+        - For a labyrinth that is not square, the band of rooms near the west/east sides is as wide as a quarter of the width, and the band near the south/north sides as a quarter of the height.
+        - This means that width and height cannot be too small, or the generation may break. ie they cannot be less than 4.
 
         How bossroom is chosen:
-        - e.g. labsize is set to 10 and startroom coords are [1, 7]
+        - e.g. the labyrinth is 10 by 10 and startroom coords are [1, 7]
         - bossroom is at the opposite of the labyrinth at [8, 2]
 
         Startroom will be remembered throughout the game, the starting position of the boss will not be remembered. 
         """
         # choose position of Start room randomly
-        n = labsize // 4
-        n = random.randint(-n, n - 1) % labsize
-        m = random.randint(0, labsize - 1)
-        nm = [n, m]
-        random.shuffle(nm)
-        steve_x, steve_y = nm
-        self.lab[steve_x][steve_y].settype_startroom()
+        rng = self.rng.maze
+        if rng.randint(0, 1) == 0: # near the west or east side
+            n = self.width // 4
+            steve_x = rng.randint(-n, n - 1) % self.width
+            steve_y = rng.randint(0, self.height - 1)
+        else: # near the south or north side
+            n = self.height // 4
+            steve_x = rng.randint(0, self.width - 1)
+            steve_y = rng.randint(-n, n - 1) % self.height
+        self.get_room([steve_x, steve_y]).settype_startroom()
+        self._connected[steve_x * self.height + steve_y] = 1
         self.steve_pos = [steve_x, steve_y]
+        self.start_pos = [steve_x, steve_y]
+        self.visited[steve_x * self.height + steve_y] = 1
         
         # choose position of Monster room opposite to where steve is
-        boss_x = labsize - 1 - (steve_x % labsize)
-        boss_y = labsize - 1 - (steve_y % labsize)
+        boss_x = self.width - 1 - steve_x
+        boss_y = self.height - 1 - steve_y
         self.boss_pos = [boss_x, boss_y]
         if (boss_x, boss_y) == (steve_x, steve_y): # if they happen to be placed in the same room
             raise ValueError("Steve and the Boss have been put at the same location.")
-        self.lab[boss_x][boss_y].boss_enters()    
+        self.get_room([boss_x, boss_y]).boss_enters()    
 
-    def _generate_maze(self, startroom_pos: list[int]) -> None:
+    def _generate_maze(self, startroom_pos: list[int], link_chance: float = LINK_CHANCE, verbose: bool = True) -> None:
         """Links up all rooms in a maze-like fashion"""
-        # link up a "large" number of rooms
-        print("Loading: Generating maze...")
-        self._generate_recursive_linking(startroom_pos)
-        unconnected = self._generate_count_unconnected_rooms()
-        print("Loading: Tying loose ends...")
-        # linearly search through the grid to find unconnected rooms, and connects them. 
-        # Stops when all are connected.
-        while unconnected != 0:
-            for x in range(labsize):
-                for y in range(labsize):
-                    room = self.lab[x][y]
-                    if not room.is_connected_tostart():
-                        self._generate_force_connect([x, y])
-            unconnected = self._generate_count_unconnected_rooms()
-
-    def _generate_force_connect(self, roomcoords: list[int]) -> None:
+        # link up a "large" number of rooms, then tie up the loose ends as they are found
+        if verbose:
+            print("Loading: Generating maze...")
+        self._generate_iterative_linking(startroom_pos, link_chance)
+        if self._generate_count_unconnected_rooms() != 0:
+            raise RuntimeError("_generate_maze(): some rooms were left unconnected, should not happen.")
+
+    def _generate_force_connect(self, index: int) -> list[int]:
         """links holes in connectivity of maze to as many adjacent rooms as possible.
-        Game design: Does so in an unpredictable (random) sequence, so that this has a lower chance of being exploitable by the player."""
-        newdirlist = DIRLIST.copy()
-        random.shuffle(newdirlist)
-        for i in range(4):
-            neighbourcoords = [roomcoords[0] + newdirlist[i][0], roomcoords[1] + newdirlist[i][1]]
-            if valid_coords(neighbourcoords):
-                self._generate_link_rooms(roomcoords, neighbourcoords) # forcing a connection.
-                
-    def _generate_is_linkable_by_recursive(self, roomcoords: list[int]) -> bool:
-        """Rules for a this room with coordinates roomcoords to be linked to its neighbour that is attempting to link to this:
-        
-        1. It must have valid coords, within the appropriate range from 0 to labsize - 1
-        2. It must not already be connected to the start.
+        Game design: Does so in an unpredictable (random) sequence, so that this has a lower chance of being exploitable by the player.
+
+        Works on the cell index (x * height + y) of the room.
+        Returns the indexes of the rooms that became connected because of it.
         """
-        if not valid_coords(roomcoords):
-            return False
-        x, y = roomcoords
-        room_object = self.lab[x][y]
-        if room_object.is_connected_tostart(): # has access
-            return False
-        return True
-                     
+        x, y = divmod(index, self.height)
+        newdirlist = [NORTH, SOUTH, EAST, WEST]
+        self.rng.maze.shuffle(newdirlist)
+        newly_connected = []
+        for direction in newdirlist:
+            dx, dy = DIROFFSETS[direction]
+            neighbourx, neighboury = x + dx, y + dy
+            if not 0 <= neighbourx < self.width or not 0 <= neighboury < self.height:
+                continue
+            neighbour = neighbourx * self.height + neighboury
+            # every linking must happen between rooms of which 1 MUST be connected.
+            if not self._connected[index] and not self._connected[neighbour]:
+                continue
+            for room in (index, neighbour):
+                if not self._connected[room]:
+                    self._connected[room] = 1
+                    newly_connected.append(room)
+            self.passages[index] |= DIRBITS[direction]
+            self.passages[neighbour] |= DIRBITS[OPPOSITE[direction]]
+        return newly_connected
     
-    def _generate_recursive_linking(self, thisroomcoords: list[int]) -> None:
+    def _generate_iterative_linking(self, startroom_pos: list[int], link_chance: float) -> None:
         """
-        Attempts to link a large number of rooms, recursively
+        Links every room to the startroom in one pass, using an explicit stack instead of recursion.
+
         Rules for whether a neighbour room is linkable:
         0. The room exists (has coordinates within the valid range)
         1. The room is not already linked.
 
-        thisroom will make an attempt to link to linkable neighbour rooms.
-        The success of the attempt is based on chance.
-        This chance can be changed, but is hardcoded.
-        This chance should be quite high above 25%; the lower the odds, the more holes in connectivity, the more cleanup linking has to be done.
-        
+        The room on top of the stack makes an attempt to link to each linkable neighbour in turn, N, S, E, W.
+        The success of the attempt is based on chance (link_chance); a linked neighbour is pushed on the stack
+        and carries on from there, exactly like the depth first recursion this replaces.
+        Failed attempts are remembered. Once the stack runs dry, one remembered room that is still unconnected
+        is picked at random and force connected (see _generate_force_connect()), and linking carries on from it.
+        The lower link_chance is, the more the maze looks like the open "tied up" areas force connecting makes.
+
+        Every room is pushed at most once and remembered at most 4 times, so this is O(N) in the number of rooms.
         """
-        # current room should already be connected
-        x, y = thisroomcoords
-        thisroom = self.lab[x][y] # object thisroom object
-        if not thisroom.is_connected_tostart():
-            raise ValueError("Room that is trying to (recursively) link to others is not yet connected, should not happen.")
-        # iteration through N, S, E, W:
-        # checking whether they are linkable by rules
-        # if linkable, there is a chance of linking
-        for i in range(4):
-            neighbourcoords = [x + DIRLIST[i][0], y + DIRLIST[i][1]]
-            if self._generate_is_linkable_by_recursive(neighbourcoords):
-                odds = random.randint(1, 100)
-                if odds <= 58: # n% chance of linking; 
-                    self._generate_link_rooms(thisroomcoords, neighbourcoords)
-                    self._generate_recursive_linking(neighbourcoords) # recursion call
-        # base case should be inherently built into this loop:
-        # Recursion branch ends at a room where
-        # 1. All adjacent rooms are not linkable
-        # 2. By chance, the labyrinth chooses not to link this room to any other room.
-    
+        width, height = self.width, self.height
+        passages = self.passages
+        connected = self._connected
+        rand = self.rng.maze.random
+        # for each direction: step in cell index, passage bit, passage bit of the neighbour, in order N, S, E, W
+        steps = [(1, 1, 2), (-1, 2, 1), (height, 4, 8), (-height, 8, 4)]
+        # border[i] has the bits of the directions in which cell i has a neighbour at all
+        border = bytearray([15]) * (width * height)
+        for x in range(width):
+            border[x * height + height - 1] &= ~1 # north edge
+            border[x * height] &= ~2 # south edge
+        for y in range(height):
+            border[(width - 1) * height + y] &= ~4 # east edge
+            border[y] &= ~8 # west edge
+        nextdir = bytearray(width * height) # which direction each room on the stack tries next
+        x, y = startroom_pos
+        start = x * height + y
+        if not connected[start]:
+            raise ValueError("Room that linking starts from is not yet connected, should not happen.")
+        stack = [start]
+        remembered = []
+        while stack:
+            index = stack[-1]
+            d = nextdir[index]
+            if d < 4:
+                nextdir[index] = d + 1
+                step, bit, neighbourbit = steps[d]
+                if border[index] & bit:
+                    neighbour = index + step
+                    if not connected[neighbour]:
+                        if rand() < link_chance:
+                            passages[index] |= bit
+                            passages[neighbour] |= neighbourbit
+                            connected[neighbour] = 1
+                            stack.append(neighbour)
+                        else:
+                            remembered.append(neighbour)
+                continue
+            stack.pop()
+            # stack ran dry, tie up a loose end and carry on from there
+            while not stack and remembered:
+                i = int(rand() * len(remembered))
+                remembered[i], remembered[-1] = remembered[-1], remembered[i]
+                index = remembered.pop()
+                if connected[index]:
+                    continue
+                newly_connected = self._generate_force_connect(index)
+                stack.extend(newly_connected)
+
     def _generate_link_rooms(self, room1coords: list[int], room2coords: list[int]) -> None:
         # validation
         x1, y1 = room1coords
         x2, y2 = room2coords
-        if not valid_coords(room1coords) or not valid_coords(room2coords):
+        if not self.valid_coords(room1coords) or not self.valid_coords(room2coords):
             raise IndexError("_generate_link_rooms(): a room passed in has coords outside of labyrinth. Cannot be linked.")
         if x1 == x2 and y1 == y2:
             raise IndexError("_generate_link_rooms(): the same room is passed twice, cannot be linked.")
         if not is_adjacent(room1coords, room2coords):
             raise IndexError("_generate_link_rooms(): non adjacent rooms are passed, cannot be linked.")
         # linking rooms
-        room1 = self.lab[x1][y1]
-        room2 = self.lab[x2][y2]
-        if room1.is_connected_tostart() or room2.is_connected_tostart():
-            room1.set_connected_True()
-            room2.set_connected_True()
-        if not room1.is_connected_tostart() and not room2.is_connected_tostart():
+        index1 = x1 * self.height + y1
+        index2 = x2 * self.height + y2
+        if self._connected[index1] or self._connected[index2]:
+            self._connected[index1] = 1
+            self._connected[index2] = 1
+        if not self._connected[index1] and not self._connected[index2]:
             # every linking must happen between rooms of which 1 MUST be connected.
             return None # no linking done if both are unconnected.
-        # print(room1.coords) #xyzxyz
-        # print(room2.coords) #xyzxyz
-        room1.set_access(room2)
-        room2.set_access(room1)
+        self.set_access(room1coords, room2coords)
             
     
     def _generate_count_unconnected_rooms(self) -> int:
         """
         One of many helper methods of the generate() method.
         
-        Linearly search the rooms to check whether the rooms are connected to the startroom.
+        Counts the rooms that are not connected to the startroom.
         Returns the number of rooms that are not connected.
         
         """
-        number_of_unconnected = 0
-        for column in self.lab:
-            for room in column:
-                # room is an instance of the Room class
-                if not room.is_connected_tostart():
-                    number_of_unconnected += 1 # counter
-        return number_of_unconnected
+        return self._connected.count(0)
 
     def get_current_pos(self) -> list[int]:
         """Tells the coordinates of Steve's current location."""
         return self.steve_pos
 
+    def valid_coords(self, roomcoords: list[int]) -> bool:
+        if type(roomcoords) is not list:
+            print(f"valid_coords() says that roomcoords {roomcoords} is not a list.")
+            return False
+        if len(roomcoords) != 2:
+            print(f"valid_coords() says that roomcoords {roomcoords} does not have exactly 2 elements.")
+            return False
+        i, j = roomcoords
+        if type(i) is not int or type(j) is not int:
+            return False
+            print(f"valid_coords() says that roomcoords {roomcoords} elements are not type int.")
+        if not 0 <= i < self.width or not 0 <= j < self.height:
+            return False
+            print(f"valid_coords() says that roomcoords {roomcoords} elements are not within the {self.width} by {self.height} labyrinth.")
+        return True
 
+    def get_room(self, roomcoords: list[int]) -> "Room":
+        """Returns a view of the room at roomcoords.
         
-
-    def move_boss(self) -> None:
+        Rooms are made every time they are asked for and kept by nobody, what is in them lives in rooms (RoomColumns).
+        """
+        x, y = roomcoords
+        if not 0 <= x < self.width or not 0 <= y < self.height:
+            raise IndexError(f"get_room(), room {roomcoords} is outside of the labyrinth.")
+        return Room(x, y, self.rooms, x * self.height + y)
+
+    def set_access(self, room1coords: list[int], room2coords: list[int]) -> None:
+        """Opens the passage between two adjacent rooms, in both directions."""
+        direction = direction_of(room1coords, room2coords)
+        if direction is None:
+            raise ValueError(f"set_access(), room {room2coords} is not adjacent to room {room1coords}")
+        if not self.valid_coords(room1coords) or not self.valid_coords(room2coords):
+            raise ValueError(f"set_access(), room {room1coords} or {room2coords} is outside of the labyrinth, access cannot be set.")
+        x1, y1 = room1coords
+        x2, y2 = room2coords
+        self.passages[x1 * self.height + y1] |= DIRBITS[direction]
+        self.passages[x2 * self.height + y2] |= DIRBITS[OPPOSITE[direction]]
+        self.version += 1
+        self._boss_field = None # distances are no longer right
+        if self._renderer is not None:
+            self._renderer.redraw_cell(room1coords)
+            self._renderer.redraw_cell(room2coords)
+
+    def boss_distances(self) -> "DistanceField":
+        """Returns the distance field rooted at the boss, building it the first time it is needed.
+        After that it is kept up to date as the boss moves, see move_boss()."""
+        if self._boss_field is None:
+            self._boss_field = DistanceField(self, self.boss_pos)
+        return self._boss_field
+
+    def boss_distance(self, coords: list[int] = None) -> int:
+        """Number of rooms one has to walk through to get from the boss to coords (Steve by default)."""
+        if coords is None:
+            coords = self.steve_pos
+        return self.boss_distances().distance(coords)
+
+    def renderer(self) -> "MapRenderer":
+        """Returns the map renderer, building it the first time the map is drawn after generation."""
+        if self._renderer is None:
+            self._renderer = MapRenderer(self)
+        return self._renderer
+
+    def move_boss(self, target: list[int] = None) -> None:
         """Tries to move the boss from its current room to any (available) neighbour rooms.
         
         Does not jump over walls.
+        If boss_hunting is set, the boss takes the first step of the shortest path towards target (Steve by default) instead of a random one.
         If the boss cannot move in any of the 4 cardinal directions, an error is raised as it implies that the room it is in is completely isolated, which should not happen.
         """
-        dirlist = [NORTH, SOUTH, EAST, WEST]
-        random.shuffle(dirlist)
+        if target is None:
+            target = self.steve_pos
+        if self.boss_hunting and self.boss_pos != list(target):
+            dirlist = [self.boss_distances().first_step_to(target)]
+        else:
+            dirlist = [NORTH, SOUTH, EAST, WEST]
+            self.rng.maze.shuffle(dirlist)
         for randomdir in dirlist:
             if self.can_move_here(self.boss_pos, randomdir):
                 x, y = self.boss_pos
-                self.lab[x][y].boss_leaves()
-                for i in range(4):
-                    if randomdir == [NORTH, SOUTH, EAST, WEST][i]:
-                        randomdir = DIRLIST[i]
-                self.boss_pos = [x + randomdir[0], y + randomdir[1]]
-                x, y = self.boss_pos
-                self.lab[x][y].boss_enters()
+                self.get_room(self.boss_pos).boss_leaves()
+                dx, dy = DIROFFSETS[randomdir]
+                self.boss_pos = [x + dx, y + dy]
+                self.get_room(self.boss_pos).boss_enters()
+                if self._boss_field is not None:
+                    self._boss_field.move_root(self.boss_pos)
                 return None
         raise RuntimeError(f"Boss cannot move because its room {self.boss_pos} is unlinked to neighbours.")
                 
     def move_steve(self, direction) -> None:
         if not self.can_move_here(self.steve_pos, direction):
             raise ValueError("move_steve() attempted to move steve to a direction that is not possible.")
-        for i in range(4):
-            if direction == [NORTH, SOUTH, EAST, WEST][i]:
-                direction = DIRLIST[i]
+        dx, dy = DIROFFSETS[direction]
         x, y = self.steve_pos
-        self.lab[x][y].steve_leaves()
-        self.steve_pos = [x + direction[0], y + direction[1]]
-        x, y = self.steve_pos
-        self.lab[x][y].steve_enters()
+        self.get_room(self.steve_pos).steve_leaves()
+        self.steve_pos = [x + dx, y + dy]
+        self.visited[self.steve_pos[0] * self.height + self.steve_pos[1]] = 1
+        self.turn += 1
+        depth = abs(self.steve_pos[0] - self.start_pos[0]) + abs(self.steve_pos[1] - self.start_pos[1])
+        self.get_room(self.steve_pos).steve_enters(self.rng.spawn, depth, self.turn)
         
 
     def can_move_here(self, this_coords: list[int], direction) -> bool:
@@ -391,55 +499,62 @@ class Labyrinth:
         1. There is no wall between this room and the neighbour.
         2. the coordinates are within the range of valid coordinates.
         """
-        if not valid_coords(this_coords): # this should not happen at all
+        x, y = this_coords
+        if not 0 <= x < self.width or not 0 <= y < self.height: # this should not happen at all
             raise IndexError("entity is not inside of maze")
-        thisroom = self.lab[this_coords[0]][this_coords[1]]
-        return thisroom.dir_is_accessible(direction)
+        if direction not in DIRBITS:
+            raise ValueError("argument passed into can_move_here() should be a direction value.")
+        return self.passages[x * self.height + y] & DIRBITS[direction] != 0
+
 
     def _steve_useitem(self, item) -> None:
         """Uses a utility item. Not implemented because no utility items are implemented yet."""
         raise NotImplementedError
 
-    def give_sound_clue(self):
-        """Displays a message giving a hint how far away the boss is from steve and which direction steve might have to go in order to find the boss.
+    def give_sound_clue(self) -> str:
+        """Returns a message giving a hint how far away the boss is from steve and which direction steve might have to go in order to find the boss.
         
-        Calculates straight line distance.
+        Looks up the walking distance through the maze in the boss's distance field.
         Calculates which direction, N, S, E, W, NE, NW, SE, SW
-        displays a message based on distance and direction.
+        returns a message based on distance and direction, for MUDGame to show like its other lines of text.
+        None if steve and the boss are in the same room.
         """
         dx, dy = self.sb_xy_distance()
         if dx == 0 and dy == 0: # They are in the same room, a clue doesn't need to be given LOL
             return None
-        i = random.randint(0, 100)
+        lines = []
+        i = self.rng.maze.randint(0, 100)
         if i <= 20:
-            i = random.randint(0, 2)
+            i = self.rng.maze.randint(0, 2)
             if i == 0:
-                print("The warmth of the torch comforts you.")
+                lines.append("The warmth of the torch comforts you.")
             elif i == 1:
-                print("There was dead silence, so silent you hear your heart tremble.")
+                lines.append("There was dead silence, so silent you hear your heart tremble.")
             else:
-                print("A silent whine was heard in the distance. It might just be any creature out there.")
-            return None
-        r, dirstr = self.r_dir_calc(dx, dy)
+                lines.append("A silent whine was heard in the distance. It might just be any creature out there.")
+            return "\n".join(lines)
+        _, dirstr = self.r_dir_calc(dx, dy)
+        r = self.boss_distance()
         if r < 3:
-            i = random.randint(0, 2)
+            i = self.rng.maze.randint(0, 2)
             if i == 0:
-                print("The torches suddenly blew out without wind, leaving you in darkness. A series of intense heartbeats echoed, sending chills down to your spine. The torhces were then relit slowly, perhaps magically.")
+                lines.append("The torches suddenly blew out without wind, leaving you in darkness. A series of intense heartbeats echoed, sending chills down to your spine. The torhces were then relit slowly, perhaps magically.")
             else:
-                print("A blood-curdling roar seemed to shake the entire room with it. You flinched with no control over your body.")
-            print("You must be close to the king warden.")
+                lines.append("A blood-curdling roar seemed to shake the entire room with it. You flinched with no control over your body.")
+            lines.append("You must be close to the king warden.")
         elif r < 6:
-            i = random.randint(1, 100)
+            i = self.rng.maze.randint(1, 100)
             if i == 1:
-                print("You hear a rawr.")
-                print("Easter egg achieved!")
+                lines.append("You hear a rawr.")
+                lines.append("Easter egg achieved!")
             else:
-                print("A hair-raising, wrathful whine from afar stuns you, shattering the stillness of cold air.")
+                lines.append("A hair-raising, wrathful whine from afar stuns you, shattering the stillness of cold air.")
         elif r < 10:
-            print("Distant but colossal footsteps were heard.")
+            lines.append("Distant but colossal footsteps were heard.")
         else:
-            print("Hardly audible footsteps were heard.")   
-        print(f"The sound seemed to come from {dirstr}.")
+            lines.append("Hardly audible footsteps were heard.")   
+        lines.append(f"The sound seemed to come from {dirstr}.")
+        return "\n".join(lines)
 
     def r_dir_calc(self, dx, dy) -> tuple[float, str]:
         """maths work for give_sound_clue
@@ -450,41 +565,10 @@ class Labyrinth:
         if dx == 0 and dy == 0:
             return None
         r = math.sqrt((dx ** 2) + (dy ** 2)) # Pythagorean theorem
-        basic = abs(math.atan(dy/dx))
-        if dy > 0:
-            if dx > 0:
-                theta = basic # 1st quadrant
-            elif dx < 0:
-                theta = PI - basic # 2nd quadrant
-            else:
-                theta = PI / 2 # up
-        elif dy < 0:
-            if dx < 0:
-                theta = PI + basic # 3rd quadrant
-            elif dx > 0:
-                theta = 2 * PI - basic # 4th quadrant
-            else:
-                theta = 3 * PI / 2 # down
-        elif dy == 0:
-            if dx > 0:
-                theta = 0 # right
-            if dx < 0:
-                theta = PI # left
-        dirstr = None
+        theta = math.atan2(dy, dx) % (2 * PI) # also works when dx is 0
         dirstrlist = ["EAST", "NORTHEAST", "NORTH", "NORTHWEST", "WEST", "SOUTHWEST", "SOUTH", "SOUTHEAST"]
-        if theta <= PI / 8 or theta > 15 * PI / 8:
-            dirstr = dirstrlist[0]
-        lowerbound = PI / 8
-        upperbound = lowerbound + PI / 4
-        i = 1
-        while i <= 7 and dirstr is not None:
-            if i > lowerbound and i <= upperbound:
-                dirstr = dirstrlist[i]
-            i += 1
-            lowerbound += PI / 4
-            upperbound += PI / 4
-        if dirstr is None:
-            raise RuntimeError("Person who implemented r_dir_calc() has a skill issue")
+        # each direction covers PI / 4 of the circle, centred on its angle
+        dirstr = dirstrlist[int(((theta + PI / 8) % (2 * PI)) // (PI / 4)) % 8]
         return r, dirstr
         
         
@@ -494,20 +578,279 @@ class Labyrinth:
         ydiff = self.boss_pos[1] - self.steve_pos[1]
         return [xdiff, ydiff]
 
-SOMEROOM = "SOMEROOM"
+
+class DistanceField:
+    """
+    Shortest path distances, in rooms walked through passages, from one root room to every room of a labyrinth.
+
+    -- ATTRIBUTES --
+    - labyrinth: Labyrinth
+    - root: list[int]
+    - _raw: array of int, the distance of cell i is _raw[i] + _offset
+    - _offset: int
+
+    -- METHODS --
+    + rebuild(self, root: list[int]) -> None
+    + move_root(self, newroot: list[int]) -> None
+    + distance(self, coords: list[int]) -> int
+    + first_step_to(self, coords: list[int]) -> "NORTH or SOUTH or EAST or WEST"
+    """
+    def __init__(self, labyrinth: Labyrinth, root: list[int]):
+        self.labyrinth = labyrinth
+        self.rebuild(root)
+
+    def rebuild(self, root: list[int]) -> None:
+        """Breadth first search from root over the whole labyrinth. O(N)"""
+        lab = self.labyrinth
+        height = lab.height
+        passages = lab.passages
+        ncells = lab.width * height
+        raw = array("i", [ncells]) * ncells # further than any room can be
+        x, y = root
+        start = x * height + y
+        raw[start] = 0
+        queue = [start]
+        for index in queue: # queue grows while it is iterated over
+            newdist = raw[index] + 1
+            mask = passages[index]
+            if mask & 1 and raw[index + 1] > newdist:
+                raw[index + 1] = newdist
+                queue.append(index + 1)
+            if mask & 2 and raw[index - 1] > newdist:
+                raw[index - 1] = newdist
+                queue.append(index - 1)
+            if mask & 4 and raw[index + height] > newdist:
+                raw[index + height] = newdist
+                queue.append(index + height)
+            if mask & 8 and raw[index - height] > newdist:
+                raw[index - height] = newdist
+                queue.append(index - height)
+        self._raw = raw
+        self._offset = 0
+        self.root = [x, y]
+
+    def move_root(self, newroot: list[int]) -> None:
+        """Updates the distances after the root moved to newroot.
+
+        If newroot is adjacent to the old root, only the rooms that got closer are visited:
+        every distance first goes up by one (by bumping _offset, which costs nothing), since walking
+        back through the old root is always possible, then a search from newroot lowers the rooms
+        that have a shorter way. Rooms that did not get closer are never touched.
+        Any other move falls back to rebuild().
+        """
+        lab = self.labyrinth
+        height = lab.height
+        x, y = newroot
+        direction = direction_of(self.root, newroot)
+        if direction is None or not lab.can_move_here(self.root, direction):
+            self.rebuild(newroot)
+            return None
+        passages = lab.passages
+        raw = self._raw
+        self._offset += 1
+        start = x * height + y
+        raw[start] = -self._offset
+        queue = [start]
+        for index in queue:
+            newraw = raw[index] + 1
+            mask = passages[index]
+            if mask & 1 and raw[index + 1] > newraw:
+                raw[index + 1] = newraw
+                queue.append(index + 1)
+            if mask & 2 and raw[index - 1] > newraw:
+                raw[index - 1] = newraw
+                queue.append(index - 1)
+            if mask & 4 and raw[index + height] > newraw:
+                raw[index + height] = newraw
+                queue.append(index + height)
+            if mask & 8 and raw[index - height] > newraw:
+                raw[index - height] = newraw
+                queue.append(index - height)
+        self.root = [x, y]
+
+    def distance(self, coords: list[int]) -> int:
+        """Distance from the root to coords. O(1)"""
+        x, y = coords
+        return self._raw[x * self.labyrinth.height + y] + self._offset
+
+    def first_step_to(self, coords: list[int]) -> "NORTH or SOUTH or EAST or WEST":
+        """Direction the root has to step in to walk the shortest path to coords.
+        Walks the gradient back from coords to the root, so it costs the length of the path, not a search.
+        Returns None if coords is the root."""
+        lab = self.labyrinth
+        height = lab.height
+        raw = self._raw
+        x, y = coords
+        index = x * height + y
+        step = None
+        while raw[index] + self._offset > 0:
+            mask = lab.passages[index]
+            for direction in (NORTH, SOUTH, EAST, WEST):
+                dx, dy = DIROFFSETS[direction]
+                neighbour = index + dx * height + dy
+                if mask & DIRBITS[direction] and raw[neighbour] == raw[index] - 1:
+                    index = neighbour
+                    step = OPPOSITE[direction] # the root walks the other way
+                    break
+            else:
+                raise RuntimeError(f"DistanceField is out of date, no way back to the root from {coords}.")
+        return step
+
+# pieces of the map for each passage mask, every room is drawn 4 characters wide and 3 lines tall
+MAP_TOP = [b" || " if mask & 1 else b"    " for mask in range(16)]
+MAP_MID = [(b"=" if mask & 8 else b" ") + b"//" + (b"=" if mask & 4 else b" ") for mask in range(16)]
+MAP_BOTTOM = [b" || " if mask & 2 else b"    " for mask in range(16)]
+MAP_FOG = b"    "
+
+class MapRenderer:
+    """
+    Draws a labyrinth's map, north at the top.
+    The walls are drawn once into lines, after that only the rooms that changed are drawn again:
+    the ones Steve or the boss left or entered, and the two rooms of a passage opened by set_access().
+
+    -- ATTRIBUTES --
+    - labyrinth: Labyrinth
+    + lines: list[bytearray], 3 lines per row of rooms, the first line is the north side of the labyrinth
+    - _steve: tuple[int, int], where Steve is drawn
+    - _boss: tuple[int, int], where the boss is drawn
+
+    -- METHODS --
+    + rebuild(self) -> None
+    + redraw_cell(self, coords: list[int]) -> None
+    + refresh(self) -> None
+    + render(self, radius: int, fog: bool) -> str
+    """
+    def __init__(self, labyrinth: Labyrinth):
+        self.labyrinth = labyrinth
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Draws the whole map. O(N)"""
+        lab = self.labyrinth
+        height = lab.height
+        self.lines = []
+        for y in range(height - 1, -1, -1):
+            row = lab.passages[y::height] # masks of the rooms of row y, west to east
+            self.lines.append(bytearray(b"".join(map(MAP_TOP.__getitem__, row))))
+            self.lines.append(bytearray(b"".join(map(MAP_MID.__getitem__, row))))
+            self.lines.append(bytearray(b"".join(map(MAP_BOTTOM.__getitem__, row))))
+        self._steve = None
+        self._boss = None
+        self.refresh()
+
+    def _line(self, y: int) -> int:
+        """Index in lines of the top line of row y"""
+        return 3 * (self.labyrinth.height - 1 - y)
+
+    def _mark(self, pos: tuple[int, int], column: int, letter: str) -> None:
+        x, y = pos
+        if 0 <= x < self.labyrinth.width and 0 <= y < self.labyrinth.height:
+            self.lines[self._line(y) + 1][4 * x + column] = ord(letter)
+
+    def redraw_cell(self, coords: list[int]) -> None:
+        """Draws one room again, after its passages changed."""
+        x, y = coords
+        mask = self.labyrinth.passages[x * self.labyrinth.height + y]
+        i = self._line(y)
+        self.lines[i][4 * x:4 * x + 4] = MAP_TOP[mask]
+        self.lines[i + 1][4 * x:4 * x + 4] = MAP_MID[mask]
+        self.lines[i + 2][4 * x:4 * x + 4] = MAP_BOTTOM[mask]
+        if self._steve == (x, y):
+            self._mark(self._steve, 1, "S")
+        if self._boss == (x, y):
+            self._mark(self._boss, 2, "B")
+
+    def refresh(self) -> None:
+        """Moves the S and B marks to where Steve and the boss are now. O(1)"""
+        lab = self.labyrinth
+        steve = tuple(lab.steve_pos)
+        if steve != self._steve:
+            if self._steve is not None:
+                self._mark(self._steve, 1, "/")
+            self._mark(steve, 1, "S")
+            self._steve = steve
+        boss = tuple(lab.boss_pos)
+        if boss != self._boss:
+            if self._boss is not None:
+                self._mark(self._boss, 2, "/")
+            self._mark(boss, 2, "B")
+            self._boss = boss
+
+    def render(self, radius: int = None, fog: bool = False) -> str:
+        """Returns the map as text.
+        radius: only the rooms at most radius rooms away from Steve on each axis are drawn, the whole map if None
+        fog: rooms Steve has not been in are left blank
+        """
+        self.refresh()
+        lab = self.labyrinth
+        if radius is None and not fog:
+            return b"\n".join(self.lines).decode() + "\n"
+        x0, y0, x1, y1 = 0, 0, lab.width - 1, lab.height - 1
+        if radius is not None:
+            if radius < 0:
+                raise ValueError(f"render(), radius must not be negative, not {radius}.")
+            x, y = lab.steve_pos
+            x0, y0 = max(x0, x - radius), max(y0, y - radius)
+            x1, y1 = min(x1, x + radius), min(y1, y + radius)
+        out = []
+        for y in range(y1, y0 - 1, -1):
+            i = self._line(y)
+            rows = [self.lines[i + k][4 * x0:4 * x1 + 4] for k in range(3)] # copies, lines are left as they are
+            if fog:
+                visited = lab.visited[x0 * lab.height + y:x1 * lab.height + y + 1:lab.height]
+                for dx, seen in enumerate(visited):
+                    if not seen:
+                        for row in rows:
+                            row[4 * dx:4 * dx + 4] = MAP_FOG
+            out.extend(rows)
+        return b"\n".join(out).decode() + "\n"
+
+ROOM_CLEARED, ROOM_STARTROOM, ROOM_STEVE, ROOM_BOSS = 1, 2, 4, 8 # bits of Room.flags
+
+class RoomColumns:
+    """
+    What is in every room of a labyrinth, kept as columns indexed by cell (x * height + y) instead of one object per room:
+    a room costs one byte of flags, plus a dict entry only while it holds a creature or an item.
+
+    -- ATTRIBUTES --
+    + flags: bytearray, ROOM_CLEARED, ROOM_STARTROOM, ROOM_STEVE and ROOM_BOSS bits of every cell
+    + creatures: dict[int, Creature], only for cells that have one
+    + items: dict[int, Item], only for cells that have one
+
+    -- METHODS --
+    + used(self) -> list[int]
+    """
+    __slots__ = ("flags", "creatures", "items")
+
+    def __init__(self, cells: int):
+        self.flags = bytearray(cells)
+        self.creatures = {}
+        self.items = {}
+
+    def used(self) -> list[int]:
+        """Cells with any flag, creature or item, in order. The others are exactly as a new room would be."""
+        used = set(self.creatures)
+        used.update(self.items)
+        used.update(index for index, flags in enumerate(self.flags) if flags)
+        return sorted(used)
+
 class Room:
     """
+    A view of one room of a labyrinth, made when it is asked for: what is in the room lives in the labyrinth's RoomColumns,
+    so rooms nobody looks at cost no objects at all. Room(x, y) on its own is a room with columns of its own.
+
     -- ATTRIBUTES --
-    + coords: list[int]
-    + type: dict
-    + connected: bool
-    + mynorth: dict
-    + mysouth: dict
-    + myeast: dict
-    + mywest: dict
+    + x: int
+    + y: int
+    + flags: int, ROOM_CLEARED, ROOM_STARTROOM, ROOM_STEVE and ROOM_BOSS bits
+    + creature: Creature
+    + item: Item
 
+    Walls and passages are not stored here, they live in the Labyrinth's passages mask.
     
     -- METHODS --
+    + coords -> list[int]
+    + cleared -> bool
     + settype_startroom(self) -> None
     + steve_leaves(self) -> None
     + steve_enters -> None
@@ -516,102 +859,104 @@ class Room:
 
     
     """
-
-    def __init__(self, x: int, y: int):
-        self.coords = [x, y]
-        self.cleared = False
-        self.type = {"startroom?": False, "steve?": False, "boss?": False}
-        self.connected = False
-        self.creature = None
-        self.item = None
-        # setting mynorth, mysouth, myeast, mywest status attributes where possible
-        self.mynorth = None
-        self.mysouth = None
-        self.myeast = None
-        self.mywest = None
-        if y + 1 >= labsize:
-            self.mynorth = None
+    __slots__ = ("x", "y", "_columns", "_index")
+
+    def __init__(self, x: int, y: int, columns: RoomColumns = None, index: int = 0):
+        self.x = x
+        self.y = y
+        if columns is None:
+            columns = RoomColumns(1)
+        self._columns = columns
+        self._index = index
+
+    @property
+    def flags(self) -> int:
+        return self._columns.flags[self._index]
+
+    @flags.setter
+    def flags(self, value: int) -> None:
+        self._columns.flags[self._index] = value
+
+    @property
+    def creature(self) -> "Creature":
+        return self._columns.creatures.get(self._index)
+
+    @creature.setter
+    def creature(self, creature: "Creature") -> None:
+        if creature is None:
+            self._columns.creatures.pop(self._index, None)
         else:
-            self.mynorth = SOMEROOM
-        if y <= 0:
-            self.mysouth = None
-        else:
-            self.mysouth = SOMEROOM
-        if x + 1 >= labsize:
-            self.myeast = None
+            self._columns.creatures[self._index] = creature
+
+    @property
+    def item(self) -> "Item":
+        return self._columns.items.get(self._index)
+
+    @item.setter
+    def item(self, item: "Item") -> None:
+        if item is None:
+            self._columns.items.pop(self._index, None)
         else:
-            self.myeast = SOMEROOM
-        if x <= 0:
-            self.mywest = None
+            self._columns.items[self._index] = item
+
+    @property
+    def coords(self) -> list[int]:
+        return [self.x, self.y]
+
+    @property
+    def cleared(self) -> bool:
+        return self.flags & ROOM_CLEARED != 0
+
+    @cleared.setter
+    def cleared(self, value: bool) -> None:
+        if value:
+            self.flags |= ROOM_CLEARED
         else:
-            self.mywest = SOMEROOM
+            self.flags &= ~ROOM_CLEARED
 
     def get_coords(self) -> list[int]:
         return self.coords
 
     def settype_startroom(self) -> None:
-        self.type["startroom?"] = True
-        self.type["steve?"] = True
-        self.connected = True
+        self.flags |= ROOM_STARTROOM | ROOM_STEVE
 
     def steve_leaves(self) -> None:
         if not self.steve_ishere(): # Steve was not even here in this room in the first place
-            raise RuntimeError(f"Steve is not in room {self.coords}, yet steve_leaves() is called.\nPossible desync between Labyrinth object's steve_pos attribute and this room object's type attribute values.")
-        self.type["steve?"] = False
-        self.cleared = True
-
-    def steve_enters(self) -> None:
+            raise RuntimeError(f"Steve is not in room {self.coords}, yet steve_leaves() is called.\nPossible desync between Labyrinth object's steve_pos attribute and this room object's flags.")
+        self.flags = (self.flags & ~ROOM_STEVE) | ROOM_CLEARED
+
+    def steve_enters(self, rng: random.Random = None, depth: int = 0, turn: int = 0) -> None:
+        """Steve walks in. The first time, a creature and/or an item may spawn, drawn from rng.
+        depth (rooms away from the startroom) and turn decide what can spawn, see ContentRegistry."""
+        if rng is None:
+            rng = random
         if self.steve_ishere():
-            raise RuntimeError(f"Steve is already in room {self.coords}, yet steve_enters() is called.\nPossible desync between Labyrinth object's steve_pos attribute and this room object's type attribute values.")
-        self.type["steve?"] = True
-        if not self.cleared and not self.type["boss?"]:
-            if random.randint(1, 100) <= 50: # 50% chance a creature spawn
-                self.creature = random_creature()
-                if random.randint(1, 100) <= 60: # if creature spawns, 60% chance an item spawns
-                    self.item = random_item()
-            elif random.randint(1, 100) <= 40: # if no creature spawned, 40% chance an item spawns
-                self.item = random_item()
+            raise RuntimeError(f"Steve is already in room {self.coords}, yet steve_enters() is called.\nPossible desync between Labyrinth object's steve_pos attribute and this room object's flags.")
+        self.flags |= ROOM_STEVE
+        if not self.flags & (ROOM_CLEARED | ROOM_BOSS):
+            if rng.randint(1, 100) <= 50: # 50% chance a creature spawn
+                self.creature = random_creature(rng, depth, turn)
+                if rng.randint(1, 100) <= 60: # if creature spawns, 60% chance an item spawns
+                    self.item = random_item(rng, depth, turn)
+            elif rng.randint(1, 100) <= 40: # if no creature spawned, 40% chance an item spawns
+                self.item = random_item(rng, depth, turn)
                 
         
 
     def boss_leaves(self) -> None:
         if not self.boss_ishere():
-            raise RuntimeError(f"Boss is not in room {self.coords}, yet boss_leaves() is called.\nPossible desync between Labyrinth object's boss_pos attribute and this room object's type attribute values.")
-        self.type["boss?"] = False
+            raise RuntimeError(f"Boss is not in room {self.coords}, yet boss_leaves() is called.\nPossible desync between Labyrinth object's boss_pos attribute and this room object's flags.")
+        self.flags &= ~ROOM_BOSS
             
     def boss_enters(self) -> None:
         if self.boss_ishere():
-            raise RuntimeError(f"Boss is already in room {self.coords}, yet boss_enters() is called.\nPossible desync between Labyrinth object's boss_pos attribute and this room object's type attribute values.")
-        self.type["boss?"] = True
-
-    def connect_dir(self, direction, neighbour: "Room") -> None:
-        if not isinstance(neighbour, Room):
-            print(self.coords, neighbour.coords)
-            raise ValueError(f"neighbour variable {neighbour} passed is not a room")
-        if not is_adjacent(self.coords, neighbour.coords):
-            print(self.coords, neighbour.coords)
-            raise RuntimeError("neighbour variable passed is not an adjacent room")
-
-        # makes assumptions that {direction} of this room is neighbour.
-        if direction == NORTH:
-            self.mynorth = neighbour
-        elif direction == SOUTH:
-            self.mysouth = neighbour
-        elif direction == EAST:
-            self.myeast = neighbour
-        elif direction == WEST:
-            self.mywest = neighbour
-        else:
-            raise ValueError("Direction passed is not of the right value")
-    
+            raise RuntimeError(f"Boss is already in room {self.coords}, yet boss_enters() is called.\nPossible desync between Labyrinth object's boss_pos attribute and this room object's flags.")
+        self.flags |= ROOM_BOSS
+
     def set_creature_None(self) -> None:
         """When the creature is killed, removes the creature from the room."""
         self.creature = None
     
-    def set_connected_True(self) -> None:
-        """Setter method for connected attribute"""
-        self.connected = True
-
     def get_creature(self) -> "Creature":
         """Getter method for creature attribute"""
         return self.creature
@@ -632,76 +977,11 @@ class Room:
             return None
         self.item = item
 
-    def set_access(self, room: "Room") -> None:
-        targetx, targety = room.get_coords()
-        myx, myy = self.coords
-        xdiff = targetx - myx
-        ydiff = targety - myy
-        i = 0
-        directionnum = -1
-        while i < 4:
-            if DIRLIST[i] == [xdiff, ydiff]:
-                directionnum = i
-            i += 1
-        if directionnum == -1:
-            raise ValueError(f"set_access(), room {[targetx, targety]} is not adjacent to this room {self.coords}")
-        direction = [NORTH, SOUTH, EAST, WEST][directionnum]
-        if direction == NORTH:
-            if self.mynorth is None:
-                raise ValueError(f'Room {self.coords} has no room to the north of it, access cannot be set.')
-            self.mynorth = room
-        elif direction == SOUTH:
-            if self.mysouth is None:
-                raise ValueError(f'Room {self.coords} has no room to the south of it, access cannot be set.')
-            self.mysouth = room
-        elif direction == EAST:
-            if self.myeast is None:
-                raise ValueError(f'Room {self.coords} has no room to the east of it, access cannot be set.')
-            self.myeast = room
-        elif direction == WEST:
-            if self.mywest is None:
-                raise ValueError(f'Room {self.coords} has no room to the west of it, access cannot be set.')
-            self.mywest = room
-        else:
-            raise ValueError(f'Room {self.coords} set_access() had argument passed that is not a direction value.')
-        
-
-    def is_connected_tostart(self) -> bool:
-        return self.connected
-
-    def get_neighbours_statuses(self) -> list["Room or SOMEROOM or None"]: # corresponding to N, S, E, W
-        return [self.mynorth, self.mysouth, self.myeast, self.mywest]
-
-    def get_neighbours_accessibility(self) -> list[bool]:
-        outputlist = []
-        for direction in [NORTH, SOUTH, EAST, WEST]:
-            outputlist.append(self.dir_is_accessible(direction))
-        return outputlist # e.g. [False, True, True, False] according to N, S, E, W
-
-    def dir_is_accessible(self, direction) -> bool:
-        if direction == NORTH:
-            if not isinstance(self.mynorth, Room):
-                return False
-            return True
-        if direction == SOUTH:
-            if not isinstance(self.mysouth, Room):
-                return False
-            return True
-        if direction == EAST:
-            if not isinstance(self.myeast, Room):
-                return False
-            return True
-        if direction == WEST:
-            if not isinstance(self.mywest, Room):
-                return False
-            return True
-        raise ValueError("argument passed into dir_is_accessible() should be a direction value.")
-
     def steve_ishere(self) -> bool:
-        return self.type["steve?"]
+        return self.flags & ROOM_STEVE != 0
 
     def boss_ishere(self) -> bool:
-        return self.type["boss?"]
+        return self.flags & ROOM_BOSS != 0
         
 
 FOODITEM = "FOODITEM"
@@ -712,12 +992,18 @@ UTILITYITEM = "UTILITYITEM"
 class Item:
     """
     -- ATTRIBUTES --
+    + name: str
+    + item_type: str
+    + key: tuple, identifies the item: two items with the same key are the same item, and stack in the inventory
     
     -- METHODS --
     """
+    __slots__ = ("name", "item_type", "key")
+
     def __init__(self, name, item_type):
         self.name = name
         self.item_type = item_type
+        self.key = (item_type, name)
 
     def __repr__(self) -> str:
         outputstr = f"Name: {self.name}\nType: {self.item_type}"
@@ -728,9 +1014,12 @@ class Item:
         return outputstr
 
 class Food(Item):
+    __slots__ = ("hprestore",)
+
     def __init__(self, name, item_type, hprestore):
         super().__init__(name, item_type)
         self.hprestore = hprestore
+        self.key = (item_type, name, hprestore)
 
     def __repr__(self):
         return super().__repr__() + f"\nRestores: {self.hprestore} HP"
@@ -742,10 +1031,13 @@ class Food(Item):
         return self.hprestore
 
 class Armor(Item):
+    __slots__ = ("defence", "armor_slot")
+
     def __init__(self, name, item_type, defence, armor_slot):
         super().__init__(name, item_type)
         self.defence = defence
         self.armor_slot = armor_slot
+        self.key = (item_type, name, defence, armor_slot)
         
     def __repr__(self):
         return super().__repr__() + f"\nProvides: {self.defence} defence"
@@ -757,9 +1049,12 @@ class Armor(Item):
         return self.defence
 
 class Weapon(Item):
+    __slots__ = ("attack",)
+
     def __init__(self, name, item_type, attack):
         super().__init__(name, item_type)
         self.attack = attack
+        self.key = (item_type, name, attack)
         
     def __repr__(self):
         return super().__repr__() + f"\nDoes: {self.attack} damage"
@@ -770,119 +1065,271 @@ class Weapon(Item):
     def get_attack(self):
         return self.attack
 
+class Inventory:
+    """
+    Items, stacked: one stack per kind of item (see Item.key) with the number of that item.
+    Adding, removing, counting and looking up a stack by position or by item are O(1),
+    apart from the first lookup after a stack went away, which renumbers the stacks.
+    Stacks stay in the order they were first added, which is the order menus number them in.
+
+    -- METHODS --
+    + add(self, item: Item, num: int) -> None
+    + remove(self, item: Item, num: int) -> None
+    + count(self, item: Item) -> int
+    + add_many(self, items: list[tuple[Item, int]]) -> None
+    + remove_many(self, items: list[tuple[Item, int]]) -> None
+    + at(self, index: int) -> tuple[Item, int]
+    + index_of(self, item: Item) -> int
+    + clear(self) -> None
+    """
+    def __init__(self):
+        self._stacks = {} # Item.key -> [item, number], in the order they were added
+        self._order = [] # list of keys in menu order, None until rebuilt after a stack goes away
+        self._positions = {} # Item.key -> its index in _order, rebuilt with it
+
+    def __len__(self) -> int:
+        """Number of stacks"""
+        return len(self._stacks)
+
+    def __iter__(self):
+        """Goes through (item, number) of every stack, in order"""
+        for item, number in self._stacks.values():
+            yield item, number
+
+    def __contains__(self, item: Item) -> bool:
+        return item.key in self._stacks
+
+    def count(self, item: Item) -> int:
+        """Number of item in the inventory, 0 if there is none"""
+        stack = self._stacks.get(item.key)
+        if stack is None:
+            return 0
+        return stack[1]
+
+    def add(self, item: Item, num: int = 1) -> None:
+        if num <= 0:
+            raise ValueError(f"Cannot add {num} of an item to the inventory.")
+        stack = self._stacks.get(item.key)
+        if stack is not None: # item is already in the inventory
+            stack[1] += num
+            return None
+        self._stacks[item.key] = [item, num]
+        if self._order is not None: # a new stack goes last, the others keep their positions
+            self._positions[item.key] = len(self._order)
+            self._order.append(item.key)
+
+    def remove(self, item: Item, num: int = 1) -> None:
+        """Removes num of item. The stack goes away once none are left."""
+        stack = self._stacks.get(item.key)
+        if stack is None:
+            raise ValueError(f"{item.name} is not in the inventory.")
+        if num > stack[1]:
+            raise ValueError(f"Cannot remove {num} {item.name}, the inventory only has {stack[1]}.")
+        stack[1] -= num
+        if stack[1] == 0:
+            del self._stacks[item.key]
+            self._order = None
+
+    def add_many(self, items: list[tuple[Item, int]]) -> None:
+        """Adds every (item, number) pair"""
+        for item, num in items:
+            self.add(item, num)
+
+    def remove_many(self, items: list[tuple[Item, int]]) -> None:
+        """Removes every (item, number) pair. Nothing is removed if the inventory does not have them all."""
+        needed = {}
+        for item, num in items:
+            needed[item.key] = needed.get(item.key, 0) + num
+        for key, num in needed.items():
+            stack = self._stacks.get(key)
+            if stack is None or stack[1] < num:
+                raise ValueError(f"Cannot remove {num} of {key[1]}, the inventory does not have that many.")
+        for item, num in items:
+            self.remove(item, num)
+
+    def _renumber(self) -> None:
+        self._order = list(self._stacks)
+        self._positions = {key: i for i, key in enumerate(self._order)}
+
+    def at(self, index: int) -> tuple[Item, int]:
+        """(item, number) of the stack at index, counting from 0 in menu order"""
+        if self._order is None:
+            self._renumber()
+        if not 0 <= index < len(self._order):
+            raise IndexError(f"Inventory has no stack {index}.")
+        item, number = self._stacks[self._order[index]]
+        return item, number
+
+    def index_of(self, item: Item) -> int:
+        """Menu position of item's stack, -1 if the inventory has none"""
+        if self._order is None:
+            self._renumber()
+        return self._positions.get(item.key, -1)
+
+    def clear(self) -> None:
+        self._stacks = {}
+        self._order = []
+        self._positions = {}
+
+class StatModifier(NamedTuple):
+    """A lasting change to Steve's stats, e.g. from a potion or an enchantment. All of Steve's modifiers add up."""
+    name: str
+    attack: int = 0
+    defence: int = 0
+
+class DerivedStats(NamedTuple):
+    """Steve's stats once his weapon, armour and modifiers are counted in."""
+    attack: int
+    defence: int
+    damage_multiplier: float # Steve takes damage * damage_multiplier, rounded down
+
 DEFAULT_HITPOINTS = 50
 class Steve:
     """
     -- ATTRIBUTES --
+    + health: int
+    + armour: dict[str, Armor], slot -> armour worn in it, use equip_armour() to change
+    + weapon: Weapon, use equip_weapon() to change
+    + base_damage: int
+    + modifiers: dict[str, StatModifier], use add_modifier() and remove_modifier() to change
+    + stats_hits: int, number of times stats() had them worked out already
+    + stats_misses: int, number of times stats() had to work them out
     
     -- METHODS --
+    + stats(self) -> DerivedStats
+    + add_modifier(self, modifier: StatModifier) -> None
+    + remove_modifier(self, name: str) -> None
     """
     def __init__(self):
-        self._inventory = [] # list of dict
-        # each dict in self.inventory describes an item, as well as the number of it in the inventory.
-        # e.g. {"item": Health_Potion, "number": 2}
-        # There should NOT be duplicate dicts in self.inventory e.g. 2 different dicts in self.inventory with "item" being Health_Potions
+        self._inventory = Inventory()
+        self._stats = None # DerivedStats, worked out again only after something they depend on changed
+        self.stats_hits = 0
+        self.stats_misses = 0
         self.armour = {}
         for slot in ["helmet", "chestplate", "leggings", "boots"]:
             self.armour[slot] = None
         self.health = DEFAULT_HITPOINTS
         self.weapon = None
         self.base_damage = 5 # default
+        self.modifiers = {}
 
     def __repr__(self):
         return f"Steve has {self.health} HP."
 
     def display_inventory(self) -> None:
-        if self._inventory == []:
-            print("You have no items in your inventory.\n")
-            return None
-        print("\nYou have:\n")
-        for i in range(len(self._inventory)):
-            dict_ = self._inventory[i]
-            item, number = str(dict_["item"]), str(dict_["number"])
-            prefix = i + 1
-            print(f"{prefix:>2}. {number:>2} x {item}")
-        print("\n")
+        print(self.describe_inventory())
         return None
 
+    def describe_inventory(self) -> str:
+        """Returns the inventory listing that display_inventory() prints."""
+        if len(self._inventory) == 0:
+            return "You have no items in your inventory.\n"
+        lines = ["\nYou have:\n"]
+        for i, (item, number) in enumerate(self._inventory):
+            prefix = i + 1
+            lines.append(f"{prefix:>2}. {number:>2} x {item}")
+        lines.append("\n")
+        return "\n".join(lines)
+
     def _add_item_to_inv(self, new_item: "Item", num: int) -> None:
-        for index, dict_ in enumerate(self._inventory): # Linear search through inventory
-            if str(new_item) == str(dict_["item"]): # new_item is already in the inventory
-                self._inventory[index]["number"] += num
-                return None
-        # If exit loop, inventory does not have any of new_item
-        # create a dict to add to self.inventory
-        self._inventory.append({"item": new_item, "number": num})
+        self._inventory.add(new_item, num)
         return None
 
     def _discard_item(self, item: Item, num: int) -> None:
-        for index, dict_ in enumerate(self._inventory): # Linear search through inventory
-            if str(item) == str(dict_["item"]): # new_item is already in the inventory
-                self._inventory[index]["number"] -= num
-                if self._inventory[index]["number"] <=0:
-                    self._inventory[index] = None
-                return None
-        print("Error: Item is not in inventory.")
+        """Throws away up to num of item."""
+        num = min(num, self._inventory.count(item))
+        if num == 0:
+            raise ValueError(f"{item.name} is not in Steve's inventory.")
+        self._inventory.remove(item, num)
         return None
 
+    @property
+    def base_damage(self) -> int:
+        return self._base_damage
+
+    @base_damage.setter
+    def base_damage(self, value: int) -> None:
+        self._base_damage = value
+        self._stats = None
+
+    def stats(self) -> DerivedStats:
+        """Returns Steve's attack, defence and damage multiplier, working them out only if something changed since last time."""
+        if self._stats is not None:
+            self.stats_hits += 1
+            return self._stats
+        self.stats_misses += 1
+        attack = self.base_damage
+        if self.weapon is not None:
+            attack += self.weapon.get_attack()
+        defence = 0
+        for armor in self.armour.values():
+            if armor is not None:
+                defence += armor.get_defence()
+        for modifier in self.modifiers.values():
+            attack += modifier.attack
+            defence += modifier.defence
+        self._stats = DerivedStats(attack, defence, (100 - defence) / 100)
+        return self._stats
+
+    def add_modifier(self, modifier: StatModifier) -> None:
+        """Adds a modifier, replacing the one with the same name if there is one."""
+        self.modifiers[modifier.name] = modifier
+        self._stats = None
+
+    def remove_modifier(self, name: str) -> None:
+        if name not in self.modifiers:
+            raise ValueError(f"Steve has no modifier called {name}.")
+        del self.modifiers[name]
+        self._stats = None
+
     def equip_armour(self, armouritem: Item) -> None:
         self.armour[armouritem.armor_slot] = armouritem
+        self._stats = None
         return None
         
-    def eat(self, foodindex: int) -> None:
-        fooditem = self._inventory[foodindex]["item"]
+    def eat(self, foodindex: int) -> str:
+        """Eats the food at foodindex of the inventory. Returns the message describing the healing."""
         #validation
-        if foodindex < 0:
-            raise RuntimeError(f"{fooditem} cannot be consumed as Steve's inventory does not have it.")
+        if not 0 <= foodindex < len(self._inventory):
+            raise RuntimeError(f"Item {foodindex} cannot be consumed as Steve's inventory does not have it.")
+        fooditem = self._inventory.at(foodindex)[0]
         if not fooditem.item_type == "Food":
             raise ValueError(f"{fooditem} cannot be consumed as it is not food.")
         # consumption
         self.remove_item_from_inv(foodindex)
-        self.heal_health(fooditem.hprestore)
+        return self.heal_health(fooditem.hprestore)
 
     def find_item(self, item: "Item") -> int:
-        """Linear search through inventory to find the index of the item"""
-        for i in self._inventory:
-            if str(i["item"]) == str(item):
-                return i
-        return -1 # return value is -1 when not found.
+        """Finds the index of the item in the inventory menu"""
+        return self._inventory.index_of(item) # return value is -1 when not found.
         
     def remove_item_from_inv(self, index) -> None:
-        if index not in list(range(len(self._inventory))):
+        if not 0 <= index < len(self._inventory):
             raise ValueError("Item that is trying to be removed from inventory has an index outside of the range of Steve's inventory.")
-        if self._inventory[index]["number"] == 1: # Steve has only 1 of this such item left
-            self._inventory.pop(index)
-            # This dict is removed as there are no more of such items in the inventory
-            return None
-        self._inventory[index]["number"] -= 1
+        # The stack goes away when Steve has no more of such items
+        self._inventory.remove(self._inventory.at(index)[0], 1)
         return None
         
-    def heal_health(self, change: int) -> None:
+    def heal_health(self, change: int) -> str:
+        """Changes Steve's HP by change. Returns the message describing it, None if nothing changed."""
         if change == 0:
             return None
         prevhp = self.health
         if change > 0:
             self.health = min(self.health + change, 50)
-            print(f"You were healed by {self.health - prevhp} HP and now have {self.health}.")
-            return None
+            return f"You were healed by {self.health - prevhp} HP and now have {self.health}."
         self.health = max(self.health + change, 0)
-        print(f"You got hurt by {prevhp - self.health} HP and have {self.health} left.")
-        return None
+        return f"You got hurt by {prevhp - self.health} HP and have {self.health} left."
 
     def get_defence(self):
-        defence = 0
-        for armor in self.armour.values():
-            if armor is not None:
-                defence += armor.get_defence()
-        return defence
+        return self.stats().defence
 
     def equip_weapon(self, weapon):
         self.weapon = weapon
+        self._stats = None
         
     def get_attack(self):
-        if self.weapon is None:
-            return self.base_damage
-        return self.base_damage + self.weapon.get_attack()
+        return self.stats().attack
 
     def isdead(self) -> bool:
         """Tells whether Steve is dead or not. Returns True if yes, else False."""
@@ -893,7 +1340,7 @@ class Steve:
     def take_damage(self, damage):
         """Updates hitpoints attribute based on how much damage is dealt."""
         if damage is not None:
-            damage = int(damage * ((100 - self.get_defence())/100))
+            damage = int(damage * self.stats().damage_multiplier)
             self.health = max(0, self.health - damage)
         
 class Creature:
@@ -907,27 +1354,32 @@ class Creature:
     get_attack
     get_health
     """
-    def __init__(self, name: str, maxhp: int, attack: int):
+    __slots__ = ("name", "hitpoints", "attack", "maxhp")
+
+    def __init__(self, name: str, maxhp: int, attack: int, rng: random.Random = None):
+        """Stats are rolled from rng, the random module if none is given."""
+        if rng is None:
+            rng = random
         self.name = name
-        maxhp = self._generate_maxhp(maxhp, turn)
+        maxhp = self._generate_maxhp(maxhp, turn, rng)
         self.hitpoints = maxhp
-        self.attack = self._generate_attack(attack, turn)
+        self.attack = self._generate_attack(attack, turn, rng)
         self.maxhp = maxhp
 
     def __repr__(self):
         return f"Name: {self.name}, HP:{self.hitpoints}/{self.maxhp}"
 
-    def _generate_maxhp(self, maxhp: int, turn_number: int) -> None:
-        maxhp = int((maxhp * ((turn_number / 10) + 1) * random.randint(90, 110) / 100))
+    def _generate_maxhp(self, maxhp: int, turn_number: int, rng: random.Random) -> None:
+        maxhp = int((maxhp * ((turn_number / 10) + 1) * rng.randint(90, 110) / 100))
         return maxhp
 
     def get_name(self) -> None:
         """Returns the name of the creature"""
         return self.name
         
-    def _generate_attack(self, attack: int, turn_number: int) -> None:
+    def _generate_attack(self, attack: int, turn_number: int, rng: random.Random) -> None:
         """"""
-        attack = int((attack) * ((turn_number / 10) + 1) * (random.randint(90, 110) / 100))
+        attack = int((attack) * ((turn_number / 10) + 1) * (rng.randint(90, 110) / 100))
         return attack
         
     def get_attack(self):
@@ -943,8 +1395,8 @@ class Creature:
         """Updates health based on the damage the creature suffered"""
         self.hitpoints = max(0, self.hitpoints - damage)
 
-    def random_move(self) -> int:
-        """Chooses randomly from the following attack moves that the creature can make:
+    def random_move(self, rng: random.Random = None) -> int:
+        """Chooses randomly, using rng, from the following attack moves that the creature can make:
         
         1. normal attack
         
@@ -957,24 +1409,40 @@ class Creature:
             return True
         return False
       
+CREEPER_DODGE_SECONDS = 1.8
 class Creeper(Creature):
-    def _generate_attack(self, attack: int, turn_number: int):
-        random_letter = random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
-        print("AHHHHHHH A CREEPER HAS APPEARED!!!! RUN AWAY QUICK BY\n PRESSING THE FOLLOWING LETTER:")
-        time.sleep(2)
-        start_time = time.time()
-        inp = input("ENTER THE LETTER " + random_letter + " QUICK: ")
-        print("KABOOOOOMMMMM THE CREEPER EXPLODEDDDDD!!!!!!")
+    """
+    A creature that explodes as soon as it appears.
+    The player dodges the explosion by typing the creeper's letter within CREEPER_DODGE_SECONDS.
+
+    The game itself never waits for the player: whoever talks to the player shows
+    the letter, times the answer and passes both to explode().
+    """
+    __slots__ = ("letter",)
+
+    def __init__(self, name: str, maxhp: int, attack: int, rng: random.Random = None):
+        if rng is None:
+            rng = random
+        super().__init__(name, maxhp, attack, rng)
+        self.letter = rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+    def warning(self) -> str:
+        """Message shown to the player when the creeper appears."""
+        return "AHHHHHHH A CREEPER HAS APPEARED!!!! RUN AWAY QUICK BY\n PRESSING THE FOLLOWING LETTER:\nENTER THE LETTER " + self.letter + " QUICK: "
+
+    def explode(self, inp: str, seconds: float) -> tuple[int, str]:
+        """The creeper explodes, killing itself.
+        inp is what the player typed, seconds how long they took.
+        Returns the damage dealt to the player and the message describing what happened."""
         self.hitpoints = 0
-        if inp.upper() == random_letter and time.time() - start_time <= 1.8:
-            print("\nLuckily, your quick reactions allowed you to avoid the explosion. You took no damage.")
-            return None
-        elif inp.upper() != random_letter:
-            print("\nOh no! You took the wrong action and got caught in the blast!")
-        elif (time.time() - start_time) > 1.8:
-            print("\nOh no! You were too slow and got caught in the blast!")
-        attack = int((attack) * ((turn_number / 10) + 1) * (random.randint(90, 110) / 100))
-        return attack
+        message = "KABOOOOOMMMMM THE CREEPER EXPLODEDDDDD!!!!!!"
+        if inp.upper() == self.letter and seconds <= CREEPER_DODGE_SECONDS:
+            return 0, message + "\n\nLuckily, your quick reactions allowed you to avoid the explosion. You took no damage."
+        elif inp.upper() != self.letter:
+            message += "\n\nOh no! You took the wrong action and got caught in the blast!"
+        else:
+            message += "\n\nOh no! You were too slow and got caught in the blast!"
+        return self.attack, message
 
 class Boss(Creature):
     """
@@ -982,62 +1450,324 @@ class Boss(Creature):
     
     -- METHODS --
     """
-    def __init__(self):
-        super().__init__("King Warden", 100, 10)
+    __slots__ = ()
+
+    def __init__(self, rng: random.Random = None):
+        super().__init__("King Warden", 100, 10, rng)
 
-    def heal(self) -> None:
+    def heal(self, rng: random.Random = None) -> None:
         """One of the moves that the boss can make
         Deals boss by an amount"""
-        heal = random.randint(10, 20)
+        if rng is None:
+            rng = random
+        heal = rng.randint(10, 20)
         self.hitpoints = min(self.hitpoints + heal, self.maxhp)
 
     def sonic_boom(self) -> bool:
         """Unimplemented attack that would make the battle more interesting"""
         raise NotImplementedError
 
-    def random_move(self) -> int:
+    def random_move(self, rng: random.Random = None) -> int:
         """If current health gt 50 HP, returns attack damage.
         If current health lte 50 HP, 30 percent chance it heals itself, and does no damage. Otherwise, returns attack damage."""
+        if rng is None:
+            rng = random
         if self.hitpoints > 50:
             return self.attack
-        if random.randint(0, 100) <= 30:
-            self.heal()
+        if rng.randint(0, 100) <= 30:
+            self.heal(rng)
             return 0
         return self.attack
             
         
         
-def random_creature() -> "Creature":
-    """returns a randomly generated creature"""
-    creature_data = random.choice(creature_list)
-    if creature_data["name"] == "Creeper":
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+
+# Every kind of content also has these optional fields, deciding how often and where it spawns:
+# weight: how common it is compared to others of its kind (rarity)
+# min_depth: it only spawns this many rooms (N/S/E/W steps) away from the startroom, or further
+# min_turn: it only spawns from this turn (number of rooms Steve has entered) onwards
+class CreatureTemplate(NamedTuple):
+    name: str
+    base_hp: int
+    base_atk: int
+    weight: float = 1.0
+    min_depth: int = 0
+    min_turn: int = 0
+
+class ArmorTemplate(NamedTuple):
+    name: str
+    defence: int
+    slot: str
+    weight: float = 1.0
+    min_depth: int = 0
+    min_turn: int = 0
+
+class FoodTemplate(NamedTuple):
+    name: str
+    hprestore: int
+    weight: float = 1.0
+    min_depth: int = 0
+    min_turn: int = 0
+
+class WeaponTemplate(NamedTuple):
+    name: str
+    atk: int
+    weight: float = 1.0
+    min_depth: int = 0
+    min_turn: int = 0
+
+class AliasTable:
+    """
+    Draws one of a number of choices, each with its own weight, in O(1) per draw (Vose's alias method).
+    Building the table is O(n).
+
+    -- METHODS --
+    + draw(self, rng: random.Random) -> a choice
+    """
+    def __init__(self, choices: list, weights: list[float]):
+        n = len(choices)
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("AliasTable needs at least one choice with a positive weight.")
+        self.choices = tuple(choices)
+        self.n = n
+        prob = [0.0] * n
+        alias = [0] * n
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i in range(n) if scaled[i] < 1]
+        large = [i for i in range(n) if scaled[i] >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more # the rest of column less goes to more
+            scaled[more] = scaled[more] + scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        for i in large + small: # whatever is left is full, up to rounding errors
+            prob[i] = 1.0
+        self.prob = prob
+        self.alias = alias
+
+    def draw(self, rng: random.Random):
+        u = rng.random() * self.n
+        i = int(u) # column
+        if u - i < self.prob[i]:
+            return self.choices[i]
+        return self.choices[self.alias[i]]
+
+class ContentRegistry:
+    """
+    The game's content (creatures and items), read from the json files in content_dir the first time each kind is needed.
+    Records are validated and kept as tuples (see the *Template classes).
+
+    If cache_path is given, parsed records are also pickled there, and reused by later processes
+    for as long as the json file they came from has not been modified since.
+
+    -- ATTRIBUTES --
+    + content_dir: str
+    + cache_path: str or None
+
+    -- METHODS --
+    + get(self, kind: str) -> tuple
+    + creatures, armor, food, weapons: the records of each kind
+    + creature_table(self, depth: int, turn: int) -> AliasTable
+    + item_table(self, depth: int, turn: int) -> AliasTable
+    + clear(self) -> None
+    """
+    # kind -> json file inside content_dir, template its records are turned into
+    FILES = {
+        "creatures": ("creatures.json", CreatureTemplate),
+        "armor": (os.path.join("items", "armor.json"), ArmorTemplate),
+        "food": (os.path.join("items", "food.json"), FoodTemplate),
+        "weapons": (os.path.join("items", "weapon.json"), WeaponTemplate),
+    }
+
+    def __init__(self, content_dir: str = CONTENT_DIR, cache_path: str = None):
+        self.content_dir = content_dir
+        self.cache_path = cache_path
+        self._records = {}
+        self._tables = {} # (kind, depth level, turn level) -> AliasTable
+        self._thresholds = {} # kind -> (sorted min_depth values, sorted min_turn values)
+
+    @property
+    def creatures(self) -> tuple[CreatureTemplate]:
+        return self.get("creatures")
+
+    @property
+    def armor(self) -> tuple[ArmorTemplate]:
+        return self.get("armor")
+
+    @property
+    def food(self) -> tuple[FoodTemplate]:
+        return self.get("food")
+
+    @property
+    def weapons(self) -> tuple[WeaponTemplate]:
+        return self.get("weapons")
+
+    def get(self, kind: str) -> tuple:
+        """Returns the records of one kind of content, loading them if this is the first time."""
+        records = self._records.get(kind)
+        if records is None:
+            records = self._load(kind)
+            self._records[kind] = records
+        return records
+
+    def clear(self) -> None:
+        """Forgets everything loaded, so the files are read again when next needed."""
+        self._records = {}
+        self._tables = {}
+        self._thresholds = {}
+
+    def creature_table(self, depth: int = 0, turn: int = 0) -> AliasTable:
+        """Table drawing the CreatureTemplate of a creature spawning depth rooms from the start on turn turn."""
+        return self._table("creatures", depth, turn)
+
+    def item_table(self, depth: int = 0, turn: int = 0) -> AliasTable:
+        """Table drawing the Item spawning depth rooms from the start on turn turn.
+
+        The item type is equally likely to be "Armor", "Food" or "Weapon" (among the types that have
+        anything that can spawn there), then weights apply within the type, all in a single draw.
+        Items never change, so the table holds one shared Item object per record rather than making new ones.
+        """
+        return self._table("items", depth, turn)
+
+    def _table(self, kind: str, depth: int, turn: int) -> AliasTable:
+        """Tables only change where some record's min_depth or min_turn is passed,
+        so they are cached per (number of min_depths passed, number of min_turns passed)."""
+        thresholds = self._thresholds.get(kind)
+        if thresholds is None:
+            records = self._spawnable(kind)
+            thresholds = (sorted({record.min_depth for _, record in records}), sorted({record.min_turn for _, record in records}))
+            self._thresholds[kind] = thresholds
+        key = (kind, bisect_right(thresholds[0], depth), bisect_right(thresholds[1], turn))
+        table = self._tables.get(key)
+        if table is None:
+            table = self._build_table(kind, depth, turn)
+            self._tables[key] = table
+        return table
+
+    def _spawnable(self, kind: str) -> list[tuple]:
+        """(item_type, record) of everything of this kind (creatures, or all items) that can spawn."""
+        if kind == "creatures":
+            return [(None, record) for record in self.creatures]
+        return [(item_type, record) for item_type, records in (("Armor", self.armor), ("Food", self.food), ("Weapon", self.weapons)) for record in records]
+
+    def _build_table(self, kind: str, depth: int, turn: int) -> AliasTable:
+        eligible = []
+        for item_type, record in self._spawnable(kind):
+            if record.min_depth <= depth and record.min_turn <= turn and record.weight > 0:
+                eligible.append((item_type, record))
+        if not eligible:
+            raise ValueError(f"No {kind} can spawn {depth} rooms from the start on turn {turn}.")
+        if kind == "creatures":
+            return AliasTable([record for _, record in eligible], [record.weight for _, record in eligible])
+        # each item type gets the same share, split between its records by weight
+        type_totals = {}
+        for item_type, record in eligible:
+            type_totals[item_type] = type_totals.get(item_type, 0) + record.weight
+        choices = [make_item(item_type, record) for item_type, record in eligible]
+        weights = [record.weight / type_totals[item_type] for item_type, record in eligible]
+        return AliasTable(choices, weights)
+
+    def _load(self, kind: str) -> tuple:
+        if kind not in self.FILES:
+            raise KeyError(f"There is no content of kind {kind}, choose from {', '.join(self.FILES)}.")
+        filename, template = self.FILES[kind]
+        path = os.path.join(self.content_dir, filename)
+        mtime = os.stat(path).st_mtime_ns
+        cache = self._read_cache()
+        if kind in cache and cache[kind][0] == (path, mtime):
+            return cache[kind][1]
+        with open(path, 'r', encoding = 'utf-8') as f:
+            records = self._validate(json.load(f), template, path)
+        if self.cache_path is not None:
+            cache[kind] = ((path, mtime), records)
+            self._write_cache(cache)
+        return records
+
+    def _validate(self, data, template, path: str) -> tuple:
+        """Turns the json data of one file into a tuple of template records, checking every field is there with the right type."""
+        if not isinstance(data, list):
+            raise ValueError(f"{path} should hold a list of records.")
+        records = []
+        for i, record in enumerate(data):
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}: record {i} is not an object.")
+            values = []
+            for field, fieldtype in template.__annotations__.items():
+                if field not in record:
+                    if field in template._field_defaults:
+                        values.append(template._field_defaults[field])
+                        continue
+                    raise ValueError(f"{path}: record {i} has no {field}.")
+                value = record[field]
+                if fieldtype is float and type(value) is int:
+                    value = float(value)
+                if type(value) is not fieldtype:
+                    raise ValueError(f"{path}: {field} of record {i} should be of type {fieldtype.__name__}, not {type(value).__name__}.")
+                values.append(value)
+            if values[template._fields.index("weight")] < 0:
+                raise ValueError(f"{path}: weight of record {i} cannot be negative.")
+            records.append(template(*values))
+        if not records:
+            raise ValueError(f"{path} has no records.")
+        return tuple(records)
+
+    def _read_cache(self) -> dict:
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cache = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return {} # missing, or written by an incompatible version; it will be rewritten
+        if not isinstance(cache, dict):
+            return {}
+        return cache
+
+    def _write_cache(self, cache: dict) -> None:
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(cache, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path) # other processes never see half a file
+
+# Shared by the whole process. Set MUD_CONTENT_CACHE to a file path to keep parsed content between runs.
+content_registry = ContentRegistry(cache_path=os.environ.get("MUD_CONTENT_CACHE"))
+
+def random_creature(rng: random.Random = None, depth: int = 0, turn: int = 0) -> "Creature":
+    """returns a randomly generated creature, drawn from rng (the random module by default)
+    according to the creatures' weights at this depth and turn"""
+    if rng is None:
+        rng = random
+    creature_data = content_registry.creature_table(depth, turn).draw(rng)
+    if creature_data.name == "Creeper":
         #remove creeper for now
-        return Creature(creature_data["name"], creature_data["base_hp"], creature_data["base_atk"])
+        return Creature(creature_data.name, creature_data.base_hp, creature_data.base_atk, rng)
     else:
-        return Creature(creature_data["name"], creature_data["base_hp"], creature_data["base_atk"])
+        return Creature(creature_data.name, creature_data.base_hp, creature_data.base_atk, rng)
 
 item_type_list = ["Armor", "Food", "Weapon"]
-def random_item() -> "Item":
-    """returns a randomly generated item"""
-    item_type = random.choice(item_type_list)
+def make_item(item_type: str, item_data: tuple) -> "Item":
+    """returns the Item described by a content record of type item_type"""
     if item_type == "Armor":
-        item_data = random.choice(armor_list)
-        return Armor(item_data["name"], item_type, item_data["defence"], item_data["slot"])
+        return Armor(item_data.name, item_type, item_data.defence, item_data.slot)
     elif item_type == "Food":
-        item_data = random.choice(food_list)
-        return Food(item_data["name"], item_type, item_data["hprestore"])
+        return Food(item_data.name, item_type, item_data.hprestore)
     elif item_type == "Weapon":
-        item_data = random.choice(weapon_list)
-        return Weapon(item_data["name"], item_type, item_data["atk"])
-        
-    
-
-with open("content/creatures.json",'r', encoding = 'utf-8') as f:
-    creature_list = json.load(f)
-with open("content/items/armor.json",'r', encoding = 'utf-8') as f:
-    armor_list = json.load(f)
-with open("content/items/food.json",'r', encoding = 'utf-8') as f:
-    food_list = json.load(f)
-with open("content/items/weapon.json",'r', encoding = 'utf-8') as f:
-    weapon_list = json.load(f)
-turn = 1
\ No newline at end of file
+        return Weapon(item_data.name, item_type, item_data.atk)
+    raise ValueError(f"Item type should be one of {item_type_list}, not {item_type}.")
+
+def random_item(rng: random.Random = None, depth: int = 0, turn: int = 0) -> "Item":
+    """returns a randomly chosen item, drawn from rng (the random module by default)
+    according to the items' weights at this depth and turn.
+    The same Item object is returned every time the same item is drawn, items are never modified."""
+    if rng is None:
+        rng = random
+    return content_registry.item_table(depth, turn).draw(rng)
+
+turn = 1
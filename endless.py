@@ -0,0 +1,287 @@
+#File for the endless labyrinth, which goes on in every direction
+# The world is cut into chunks of CHUNK_SIZE by CHUNK_SIZE rooms. A chunk is generated the first time Steve or the boss
+# comes within NEAR_CHUNKS chunks of it, from the world seed and the chunk's coordinates alone, so it always comes out the same.
+# Inside a chunk the rooms are linked the same way as a Labyrinth's, so every room of a chunk can reach every other.
+# The doors through the border between two chunks are decided by that border alone, so both chunks agree on them,
+# and every border has at least one door, so every chunk can reach every other one.
+# At most budget chunks are kept in memory, the least recently used go first: they are written to spill_dir if there is one,
+# so their rooms keep what was left in them, otherwise they are dropped and come back as new when generated again.
+# Each EndlessLabyrinth spills into a directory of its own inside spill_dir, removed by close(),
+# so worlds sharing a spill_dir never read each other's chunks.
+# Memory therefore depends on how much of the world is near Steve and the boss, not on how big the world is.
+# e.g.
+#   world = EndlessLabyrinth(seed=1, budget=64, spill_dir="chunks")
+#   world.move_steve(NORTH)
+#   print(world.render(radius=8))
+#   world.close()
+import os
+import pickle
+import random
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from data import *
+
+CHUNK_SIZE = 16
+NEAR_CHUNKS = 1 # chunks this many chunks away from Steve or the boss (and closer) are kept loaded
+DOOR_CHANCE = 0.15 # chance of each room along a chunk border having a door through it
+BOSS_START_CHUNKS = 3 # the boss starts this many chunks north east of Steve
+
+
+class Chunk:
+    """
+    CHUNK_SIZE by CHUNK_SIZE rooms of an EndlessLabyrinth.
+
+    -- ATTRIBUTES --
+    + cx: int
+    + cy: int
+    + passages: bytearray, one passage mask per cell (see DIRBITS), indexed by x * size + y within the chunk
+    + rooms: RoomColumns, what is in every room, indexed like passages
+    + visited: bytearray, 1 for every cell Steve has been in, indexed like passages
+    """
+    def __init__(self, cx: int, cy: int, passages: bytearray):
+        self.cx = cx
+        self.cy = cy
+        self.passages = passages
+        self.rooms = RoomColumns(len(passages))
+        self.visited = bytearray(len(passages))
+
+
+def _border_doors(seed, side: str, cx: int, cy: int, size: int) -> list[int]:
+    """Positions along the north (side "N") or east (side "E") border of chunk (cx, cy) that have a door.
+    The chunk on the other side of the border asks for the same border, so gets the same doors."""
+    rng = random.Random(f"{seed}/border/{side}/{cx},{cy}")
+    doors = [i for i in range(size) if rng.random() < DOOR_CHANCE]
+    if not doors:
+        doors = [rng.randrange(size)]
+    return doors
+
+def generate_chunk(seed, cx: int, cy: int, size: int = CHUNK_SIZE, link_chance: float = LINK_CHANCE) -> Chunk:
+    """Generates chunk (cx, cy) of the world seed. The same arguments always give the same chunk."""
+    maze = Labyrinth(size, rng=RandomStreams(f"{seed}/chunk/{cx},{cy}"))
+    maze.generate_random(link_chance, verbose=False)
+    passages = maze.passages
+    for y in _border_doors(seed, "E", cx, cy, size):
+        passages[(size - 1) * size + y] |= DIRBITS[EAST]
+    for y in _border_doors(seed, "E", cx - 1, cy, size):
+        passages[y] |= DIRBITS[WEST]
+    for x in _border_doors(seed, "N", cx, cy, size):
+        passages[x * size + size - 1] |= DIRBITS[NORTH]
+    for x in _border_doors(seed, "N", cx, cy - 1, size):
+        passages[x * size] |= DIRBITS[SOUTH]
+    return Chunk(cx, cy, passages)
+
+
+class EndlessLabyrinth:
+    """
+    A labyrinth with no edges, generated in chunks as Steve and the boss get near them.
+    Coordinates are world coordinates and can be negative, Steve starts at [0, 0].
+    Works like a Labyrinth for moving Steve and the boss around, see move_steve() and move_boss().
+
+    -- ATTRIBUTES --
+    + seed: int or str
+    + chunk_size: int
+    + budget: int, most chunks kept in memory
+    + spill_dir: str, where evicted chunks are written (in a directory of this world's own), None to drop them
+    + chunks: OrderedDict[tuple[int, int], Chunk], loaded chunks, least recently used first
+    + steve_pos: list[int]
+    + boss_pos: list[int]
+    + start_pos: list[int]
+    + turn: int
+    + generated: int, number of chunks generated so far
+    + reloaded: int, number of chunks read back from spill_dir
+    + evicted: int, number of chunks taken out of memory
+    - rng: RandomStreams, maze is used for moving the boss, spawn for the rooms' contents
+    - _spill_root: str, the directory of this world's own in spill_dir, None without a spill_dir
+
+    -- METHODS --
+    + chunk(self, cx: int, cy: int) -> Chunk
+    + get_room(self, coords: list[int]) -> Room
+    + can_move_here(self, coords: list[int], direction) -> bool
+    + move_steve(self, direction) -> None
+    + move_boss(self) -> None
+    + render(self, radius: int) -> str
+    + close(self) -> None
+    """
+    def __init__(self, seed=None, chunk_size: int = CHUNK_SIZE, budget: int = 64, spill_dir: str = None):
+        if chunk_size < MIN_LABSIZE:
+            raise ValueError(f"Chunks of {chunk_size} by {chunk_size} rooms are too small, they must be at least {MIN_LABSIZE} by {MIN_LABSIZE}.")
+        near = (2 * NEAR_CHUNKS + 1) ** 2
+        if budget < 2 * near:
+            raise ValueError(f"A budget of {budget} chunks cannot hold the {2 * near} chunks near Steve and the boss.")
+        self.rng = RandomStreams(seed)
+        self.seed = self.rng.seed
+        self.chunk_size = chunk_size
+        self.budget = budget
+        self.spill_dir = spill_dir
+        self._spill_root = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill_root = tempfile.mkdtemp(prefix="world_", dir=spill_dir)
+        self.chunks = OrderedDict()
+        self.generated = 0
+        self.reloaded = 0
+        self.evicted = 0
+        self.start_pos = [0, 0]
+        self.steve_pos = [0, 0]
+        offset = BOSS_START_CHUNKS * chunk_size
+        self.boss_pos = [offset, offset]
+        self.turn = 1 # number of rooms Steve has entered, counting the startroom
+        self._load_near(self.steve_pos)
+        self._load_near(self.boss_pos)
+        self.get_room(self.start_pos).settype_startroom()
+        self.get_room(self.boss_pos).boss_enters()
+
+    def __len__(self) -> int:
+        """Number of chunks in memory"""
+        return len(self.chunks)
+
+    def close(self) -> None:
+        """Removes the chunks spilled to disk, they cannot be read back after this."""
+        if self._spill_root is not None:
+            shutil.rmtree(self._spill_root, ignore_errors=True)
+            self._spill_root = None
+            self.spill_dir = None # chunks evicted from now on are dropped
+
+    def __enter__(self) -> "EndlessLabyrinth":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _chunk_of(self, coords: list[int]) -> tuple[int, int]:
+        return coords[0] // self.chunk_size, coords[1] // self.chunk_size
+
+    def _cell(self, coords: list[int]) -> tuple[Chunk, int]:
+        """The chunk coords are in and the index of coords within it."""
+        size = self.chunk_size
+        x, y = coords
+        return self.chunk(x // size, y // size), (x % size) * size + y % size
+
+    def _spill_path(self, cx: int, cy: int) -> str:
+        return os.path.join(self._spill_root, f"chunk_{cx}_{cy}.pickle")
+
+    def chunk(self, cx: int, cy: int) -> Chunk:
+        """Returns chunk (cx, cy), reading it back or generating it if it is not in memory."""
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        chunk = None
+        if self.spill_dir is not None:
+            path = self._spill_path(cx, cy)
+            try:
+                with open(path, "rb") as f:
+                    chunk = pickle.load(f)
+            except FileNotFoundError:
+                pass
+            else:
+                os.remove(path)
+                self.reloaded += 1
+        if chunk is None:
+            chunk = generate_chunk(self.seed, cx, cy, self.chunk_size)
+            self.generated += 1
+        self.chunks[key] = chunk
+        self._evict()
+        return chunk
+
+    def _evict(self) -> None:
+        """Takes the least recently used chunks out of memory until there are at most budget,
+        apart from those of Steve and the boss, whose rooms know they are there."""
+        pinned = {self._chunk_of(self.steve_pos), self._chunk_of(self.boss_pos)}
+        while len(self.chunks) > self.budget:
+            key = next(k for k in self.chunks if k not in pinned)
+            chunk = self.chunks.pop(key)
+            self.evicted += 1
+            if self.spill_dir is not None:
+                path = self._spill_path(*key)
+                with open(path + ".tmp", "wb") as f:
+                    pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+                os.replace(path + ".tmp", path)
+
+    def _load_near(self, coords: list[int]) -> None:
+        """Makes sure the chunks near coords are in memory, the one coords is in last, as the most recently used."""
+        cx, cy = self._chunk_of(coords)
+        for dx in range(-NEAR_CHUNKS, NEAR_CHUNKS + 1):
+            for dy in range(-NEAR_CHUNKS, NEAR_CHUNKS + 1):
+                if dx or dy:
+                    self.chunk(cx + dx, cy + dy)
+        self.chunk(cx, cy)
+
+    def get_current_pos(self) -> list[int]:
+        return self.steve_pos
+
+    def get_room(self, coords: list[int]) -> Room:
+        """Returns a view of the room at coords, with world coordinates, like a Labyrinth's."""
+        chunk, index = self._cell(coords)
+        if list(coords) == self.start_pos and not chunk.rooms.flags[index] & ROOM_STARTROOM: # the start chunk was dropped and generated again
+            chunk.rooms.flags[index] |= ROOM_STARTROOM | ROOM_CLEARED
+        return Room(coords[0], coords[1], chunk.rooms, index)
+
+    def can_move_here(self, coords: list[int], direction) -> bool:
+        """Tells whether there is a passage from coords towards direction."""
+        if direction not in DIRBITS:
+            raise ValueError("argument passed into can_move_here() should be a direction value.")
+        chunk, index = self._cell(coords)
+        return chunk.passages[index] & DIRBITS[direction] != 0
+
+    def move_steve(self, direction) -> None:
+        if not self.can_move_here(self.steve_pos, direction):
+            raise ValueError("move_steve() attempted to move steve to a direction that is not possible.")
+        dx, dy = DIROFFSETS[direction]
+        old_chunk = self._chunk_of(self.steve_pos)
+        self.get_room(self.steve_pos).steve_leaves()
+        self.steve_pos = [self.steve_pos[0] + dx, self.steve_pos[1] + dy]
+        if self._chunk_of(self.steve_pos) != old_chunk:
+            self._load_near(self.steve_pos)
+        chunk, index = self._cell(self.steve_pos)
+        chunk.visited[index] = 1
+        self.turn += 1
+        depth = abs(self.steve_pos[0] - self.start_pos[0]) + abs(self.steve_pos[1] - self.start_pos[1])
+        self.get_room(self.steve_pos).steve_enters(self.rng.spawn, depth, self.turn)
+
+    def move_boss(self) -> None:
+        """Moves the boss to a random neighbour room it has a passage to. The boss never hunts here,
+        the shortest path to Steve could lead through any number of chunks that do not exist yet."""
+        dirlist = [NORTH, SOUTH, EAST, WEST]
+        self.rng.maze.shuffle(dirlist)
+        for direction in dirlist:
+            if self.can_move_here(self.boss_pos, direction):
+                dx, dy = DIROFFSETS[direction]
+                old_chunk = self._chunk_of(self.boss_pos)
+                self.get_room(self.boss_pos).boss_leaves()
+                self.boss_pos = [self.boss_pos[0] + dx, self.boss_pos[1] + dy]
+                if self._chunk_of(self.boss_pos) != old_chunk:
+                    self._load_near(self.boss_pos)
+                self.get_room(self.boss_pos).boss_enters()
+                return None
+        raise RuntimeError(f"Boss cannot move because its room {self.boss_pos} is unlinked to neighbours.")
+
+    def render(self, radius: int = 8) -> str:
+        """The map around Steve, radius rooms each way, north at the top. Rooms in chunks that are not in memory are left blank.
+        Does not load any chunk, so it does not change what is in memory."""
+        if radius < 0:
+            raise ValueError(f"render(), radius must not be negative, not {radius}.")
+        size = self.chunk_size
+        sx, sy = self.steve_pos
+        out = []
+        for y in range(sy + radius, sy - radius - 1, -1):
+            rows = [bytearray(), bytearray(), bytearray()]
+            for x in range(sx - radius, sx + radius + 1):
+                chunk = self.chunks.get((x // size, y // size))
+                if chunk is None:
+                    for row in rows:
+                        row += MAP_FOG
+                    continue
+                mask = chunk.passages[(x % size) * size + y % size]
+                rows[0] += MAP_TOP[mask]
+                rows[1] += MAP_MID[mask]
+                rows[2] += MAP_BOTTOM[mask]
+                if [x, y] == self.steve_pos:
+                    rows[1][-3] = ord("S")
+                if [x, y] == self.boss_pos:
+                    rows[1][-2] = ord("B")
+            out.extend(rows)
+        return b"\n".join(out).decode() + "\n"
@@ -0,0 +1,249 @@
+#File for the game's event stream
+# Every change to the state of a game is emitted as a typed event (see EVENT_TYPES) into the game's sink, if it has one.
+# The lines of text from MUDGame.step() are for the player; telemetry and analytics read the events instead.
+# A sink is anything with emit(event) and close(). The ones here:
+# ListSink keeps the events in memory, CountingSink only counts them by kind,
+# and FileSink writes them to a file from a background thread, in batches, so the game never waits on the disk.
+# e.g.
+#   sink = FileSink("game.jsonl")
+#   game = MUDGame(1, events=sink)
+#   ...
+#   sink.close()
+#   for event in read_events("game.jsonl"):
+#       print(event)
+import json
+import queue
+import struct
+import threading
+import time
+from typing import NamedTuple
+
+STEVE = "Steve" # who or target of events about Steve, creatures go by their name
+
+
+class MoveEvent(NamedTuple):
+    """Steve walked into room [x, y]."""
+    kind = "move"
+    turn: int
+    x: int
+    y: int
+    direction: str
+
+class SpawnEvent(NamedTuple):
+    """A creature and/or an item appeared in room [x, y] as Steve walked in."""
+    kind = "spawn"
+    turn: int
+    x: int
+    y: int
+    creature: str # None if no creature appeared
+    item: str # None if no item appeared
+
+class DamageEvent(NamedTuple):
+    """source hit target for amount HP, leaving it with hp."""
+    kind = "damage"
+    turn: int
+    source: str
+    target: str
+    amount: int
+    hp: int
+
+class HealEvent(NamedTuple):
+    """target got amount HP back, and now has hp."""
+    kind = "heal"
+    turn: int
+    target: str
+    amount: int
+    hp: int
+
+class PickupEvent(NamedTuple):
+    """Steve took an item, weapons and armour are equipped straight away."""
+    kind = "pickup"
+    turn: int
+    item: str
+    item_type: str
+
+class BossMoveEvent(NamedTuple):
+    """The boss walked into room [x, y]."""
+    kind = "boss_move"
+    turn: int
+    x: int
+    y: int
+
+class DeathEvent(NamedTuple):
+    """who died."""
+    kind = "death"
+    turn: int
+    who: str
+
+EVENT_TYPES = {cls.kind: cls for cls in (MoveEvent, SpawnEvent, DamageEvent, HealEvent, PickupEvent, BossMoveEvent, DeathEvent)}
+
+def event_to_dict(event) -> dict:
+    return {"kind": event.kind, **event._asdict()}
+
+def event_from_dict(data: dict):
+    data = dict(data)
+    kind = data.pop("kind")
+    if kind not in EVENT_TYPES:
+        raise ValueError(f"Unknown kind of event {kind}.")
+    return EVENT_TYPES[kind](**data)
+
+
+class ListSink:
+    """
+    Keeps every event in memory.
+
+    -- ATTRIBUTES --
+    + events: list, in the order they were emitted
+    """
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event) -> None:
+        self.events.append(event)
+
+    def close(self) -> None:
+        pass
+
+class CountingSink:
+    """
+    Counts events by kind and keeps nothing else, for telemetry.
+
+    -- ATTRIBUTES --
+    + counts: dict[str, int]
+    """
+    def __init__(self):
+        self.counts = {}
+
+    def emit(self, event) -> None:
+        self.counts[event.kind] = self.counts.get(event.kind, 0) + 1
+
+    def close(self) -> None:
+        pass
+
+
+JSONL, FRAMES = "jsonl", "frames" # FileSink formats
+FRAME_HEADER = struct.Struct("<I") # length of the frame that follows
+
+def _encode(event, fmt: str) -> bytes:
+    if fmt == JSONL:
+        return json.dumps(event_to_dict(event), separators=(",", ":")).encode() + b"\n"
+    payload = json.dumps([event.kind, *event], separators=(",", ":")).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+class FileSink:
+    """
+    Writes events to a file from a background thread.
+    emit() only puts the event on a queue. The thread takes up to batch_size events at a time, encodes them and
+    writes them with a single write, flushing the file whenever the queue runs dry or flush_interval seconds have passed.
+    close() writes whatever is left and waits for the thread.
+
+    Formats:
+    JSONL: one json object per line, e.g. {"kind":"move","turn":2,"x":3,"y":4,"direction":"NORTH"}
+    FRAMES: length-prefixed frames, a 4-byte little endian length then a compact json array [kind, fields...],
+            which can be skipped through without parsing
+
+    -- ATTRIBUTES --
+    + path: str
+    + format: str, JSONL or FRAMES
+    + batch_size: int
+    + flush_interval: float
+    + written: int, number of events written so far
+    + batches: int, number of writes so far
+    """
+    def __init__(self, path: str, format: str = JSONL, batch_size: int = 256, flush_interval: float = 0.5, append: bool = False):
+        if format not in (JSONL, FRAMES):
+            raise ValueError(f"FileSink format must be {JSONL} or {FRAMES}, not {format}.")
+        if batch_size < 1:
+            raise ValueError(f"FileSink needs a batch size of at least 1, not {batch_size}.")
+        self.path = path
+        self.format = format
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._error = None
+        self._file = open(path, "ab" if append else "wb")
+        self._thread = threading.Thread(target=self._run, name=f"FileSink {path}", daemon=True)
+        self._thread.start()
+
+    def emit(self, event) -> None:
+        if self._closed:
+            raise RuntimeError(f"Event emitted to FileSink {self.path} after it was closed.")
+        if self._error is not None: # the writer thread has stopped, nothing would ever take the event off the queue
+            raise self._error
+        self._queue.put(event)
+
+    def close(self) -> None:
+        """Writes the events still queued, closes the file and raises any error the writer thread ran into.
+        emit() raises that error too, from the first event after it happened."""
+        if self._closed:
+            return None
+        self._closed = True
+        self._queue.put(None) # tells the thread to stop
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        try:
+            stopping = False
+            last_flush = time.monotonic()
+            while not stopping:
+                try:
+                    event = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = []
+                while True:
+                    if event is None:
+                        stopping = True
+                        break
+                    batch.append(_encode(event, self.format))
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        event = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._file.write(b"".join(batch))
+                    self.written += len(batch)
+                    self.batches += 1
+                if stopping or self._queue.empty() or time.monotonic() - last_flush >= self.flush_interval:
+                    self._file.flush()
+                    last_flush = time.monotonic()
+        except Exception as error: # handed to close(), the game's thread never sees the writer's
+            self._error = error
+        finally:
+            self._file.close()
+
+
+def read_events(path: str, format: str = JSONL):
+    """Goes through the events a FileSink wrote to path, as event tuples."""
+    with open(path, "rb") as f:
+        if format == JSONL:
+            for line in f:
+                if line.strip():
+                    yield event_from_dict(json.loads(line))
+            return None
+        if format != FRAMES:
+            raise ValueError(f"read_events() format must be {JSONL} or {FRAMES}, not {format}.")
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if not header:
+                return None
+            if len(header) < FRAME_HEADER.size:
+                raise ValueError(f"{path} ends in the middle of a frame.")
+            payload = f.read(FRAME_HEADER.unpack(header)[0])
+            kind, *fields = json.loads(payload)
+            if kind not in EVENT_TYPES:
+                raise ValueError(f"Unknown kind of event {kind}.")
+            yield EVENT_TYPES[kind](*fields)
@@ -1,39 +1,129 @@
 #File containing the code for the game
+from types import MappingProxyType
+
 from data import *
-import random
+from events import *
 
 NORTH = "NORTH"
 SOUTH = "SOUTH"
 EAST = "EAST"
 WEST = "WEST"
 
+# What the game is waiting for the player to decide
+ASK_NAME = "ASK_NAME"       # username
+ASK_FIGHT = "ASK_FIGHT"     # creature in the room: 1. Attack 2. Run away
+ASK_BATTLE = "ASK_BATTLE"   # during a battle: 1. Attack 2. Heal
+ASK_FOOD = "ASK_FOOD"       # which food item to eat
+ASK_PICKUP = "ASK_PICKUP"   # food in the room: 1. Pick up 2. Do not pick up
+ASK_MOVE = "ASK_MOVE"       # which direction to go next
+GAMEOVER = "GAMEOVER"       # nothing, the game has ended
+
+PROMPTS = {
+    ASK_NAME: 'Enter your username: ',
+    ASK_FIGHT: 'Please choose option 1 or 2: ',
+    ASK_BATTLE: 'Please choose option 1 or 2: ',
+    ASK_FOOD: 'Please choose a food item: ',
+    ASK_PICKUP: 'Please choose option 1 or 2: ',
+    ASK_MOVE: 'Next location: ',
+}
+
+class MoveOptions(NamedTuple):
+    """Where Steve can go from a room, and the menu asking him, for one passage mask."""
+    directions: tuple[str] # in the order N, S, E, W, choice "1" is the first one
+    menu: str # what _show_directions() says
+    choices: MappingProxyType # what the player can answer -> direction, read-only as every game shares it
+
+def _move_options(mask: int) -> MoveOptions:
+    directions = tuple(d for d in (NORTH, SOUTH, EAST, WEST) if mask & DIRBITS[d])
+    menu = 'Where are you going next? ' + ''.join(f'{i + 1}. {d} ' for i, d in enumerate(directions))
+    return MoveOptions(directions, menu, MappingProxyType({str(i + 1): d for i, d in enumerate(directions)}))
+
+# MOVE_TABLE[mask] for every passage mask, a room's options only depend on its mask so there are only 16 of them,
+# built once here, so asking where to go next is a lookup instead of four can_move_here() calls and some string building
+MOVE_TABLE = tuple(_move_options(mask) for mask in range(16))
+
 
 class MUDGame:
-    """This class encapsulates data for the main game implementation."""
-    def __init__(self) -> None:
+    """This class encapsulates data for the main game implementation.
+
+    The game is a state machine that never touches the terminal:
+    step(action) feeds it the player's answer to the current question (see state and prompt())
+    and returns the lines of text the player should see, in order.
+    run() plays it in the terminal through TerminalFrontEnd.
+    Every change to the game's state is also emitted as an event into events, see events.py.
+    """
+    def __init__(self, seed=None, maze: Labyrinth = None, events = None) -> None:
+        """All randomness in the game comes from self.rng, derived from seed, so the same seed and the same answers replay the same game.
+        maze: a freshly generated labyrinth to play in (e.g. from a MazePool) instead of generating one,
+        the game then uses the labyrinth's random streams and seed cannot be given.
+        events: sink the game's events are emitted into (e.g. events.FileSink), None to not make any."""
         self.gameover = False # default
         self.won = False # default
-        self.maze = Labyrinth()
-        self.maze.generate()
+        if maze is None:
+            self.rng = RandomStreams(seed)
+            self.maze = Labyrinth(rng=self.rng)
+            self.maze.generate()
+        else:
+            if seed is not None:
+                raise ValueError("MUDGame() takes a seed or a maze, not both: the maze's random streams are used.")
+            if maze.turn != 1 or maze.steve_pos != maze.start_pos:
+                raise ValueError("MUDGame() needs a maze that has not been played in yet.")
+            self.rng = maze.rng
+            self.maze = maze
         self.steve = Steve()
         self.steve_path = []
-        self.boss = Boss()
+        self.boss = Boss(self.rng.spawn)
+        self.username = None
+        self.state = ASK_NAME
+        self.available_dir = () # directions Steve can go in, while state is ASK_MOVE
+        self.opponent = None # creature Steve is battling
+        self.damage_taken = {} # creature name -> total damage it dealt to Steve
+        self._events = [] # lines of text produced by the current step
+        self.events = events
+
+    def step(self, action: str) -> list[str]:
+        """Feeds the player's answer to the current question into the game.
+        Returns the lines of text the game produced in response."""
+        self._events = []
+        if self.state == ASK_NAME:
+            self.introduce(action)
+        elif self.state == ASK_FIGHT:
+            self._step_fight(action)
+        elif self.state == ASK_BATTLE:
+            self._step_battle(action)
+        elif self.state == ASK_FOOD:
+            self._step_food(action)
+        elif self.state == ASK_PICKUP:
+            self._step_pickup(action)
+        elif self.state == ASK_MOVE:
+            self._step_move(action)
+        else:
+            raise RuntimeError("step() was called after the game ended.")
+        return self._events
 
+    def prompt(self) -> str:
+        """The question the game is currently waiting on, None once the game is over."""
+        return PROMPTS.get(self.state)
 
+    def _emit(self, event_type, *fields) -> None:
+        """Emits an event of event_type for the current turn, if anyone is listening."""
+        if self.events is not None:
+            self.events.emit(event_type(self.maze.turn, *fields))
+
+    def _say(self, text: str) -> None:
+        """Adds a line of text for the player to see."""
+        self._events.append(text)
     
-    def introduce(self) -> None: 
+    def introduce(self, username: str) -> None: 
         """
         Starting interface of the game
         """
-        username = ''
-        n = 0
-        while username.strip(' ') == '':
-            n += 1
-            if n > 1:
-                print('Please enter a valid username with at least one character.')
-            username = input('Enter your username: ')
-            
-        print(f'{username}, OH NO YOU ARE TRAPPED! \nYou will go through a series of rooms that may give you items or have ANGRY creatures wanting you DEAD :P \nKill them all, especially the boss to escape! \nGOOD LUCK ;D')
+        if username.strip(' ') == '':
+            self._say('Please enter a valid username with at least one character.')
+            return None
+        self.username = username
+        self._say(f'{username}, OH NO YOU ARE TRAPPED! \nYou will go through a series of rooms that may give you items or have ANGRY creatures wanting you DEAD :P \nKill them all, especially the boss to escape! \nGOOD LUCK ;D')
+        self._start_turn()
 
     def game_is_over(self) -> bool:
         """
@@ -41,16 +131,17 @@ class MUDGame:
         """
         if self.steve.isdead() or self.boss.isdead(): # other conditions
             return True
+        return False
 
     def show_status(self) -> None:
         """
-        Print status of Steve.
+        Show status of Steve.
         """
-        print(self.steve)
+        self._say(str(self.steve))
 
     def show_options(self, sit: str) -> None:
         """
-        Print menu of options provided to users according to different situation.
+        Show menu of options provided to users according to different situation.
         """
         if sit == 'creature':
             menu = "1. Attack \n2. Run away"
@@ -60,19 +151,7 @@ class MUDGame:
             menu = '1. Yes \n2. No'
         elif sit == 'battle':
             menu = '1. Attack \n2. Heal'
-        print(menu)
-
-    def prompt_player(self) -> int:
-        """
-        Prompt player to choose option 1 or 2.
-        Returns 1 or 2.
-        """
-        opt = input('Please choose option 1 or 2: ')
-        while not self.isvalid(opt):
-            print('Please enter a valid number(1/2).')
-            opt = input('Please choose option 1 or 2: ')
-        return opt
-
+        self._say(menu)
 
     def isvalid(self, opt) -> bool:
         """
@@ -84,6 +163,49 @@ class MUDGame:
                 return True
         return False
 
+    def _start_turn(self) -> None:
+        """
+        Steve has just arrived in a room (or the game has just started).
+        Checks the room for creatures, then for items, and asks the player about them.
+        """
+        self._say('\n')
+
+        # append the current location to steve_path
+        self.steve_path.append(list(self.maze.get_current_pos()))
+
+        # show steve's status
+        self.show_status()
+
+        # creature is found in the room
+        if self.creature_encountered():
+            # show player action options, then wait for the player to take actions
+            self.show_options('creature')
+            self.state = ASK_FIGHT
+            return None
+        self._say('No creature found in this room.')
+        self._check_item()
+
+    def _step_fight(self, option: str) -> None:
+        """
+        Player chose to attack (1) or run away (2) from the creature in the room.
+        """
+        if not self.isvalid(option):
+            self._say('Please enter a valid number(1/2).')
+            return None
+        # battle if player choose option 1
+        if option == '1':
+            self.battle()
+            return None
+        # steve has 40% chance of running away to another room, 60% chance to battle instead
+        odds = self.rng.combat.randint(1, 100)
+        if odds <= 40:
+            self.movesteve(self.rng.combat.choice(self._move_options().directions))
+            self._say('You have successfully ran away!')
+            self._start_turn()
+            return None
+        self._say("Too late to escape!")
+        self.battle()
+
     def battle(self) -> None:
         """
         Battle between Steve and creatures.
@@ -91,51 +213,103 @@ class MUDGame:
         Only boss and steve are able to heal themselves.
         Battle continues until one dies.
         """
-        x, y = self.maze.get_current_pos()
-        room = self.maze.lab[x][y]
-        creature = room.get_creature()
-        print(f"You have encountered the {creature.get_name()}!")
+        creature = self.current_creature()
+        self.opponent = creature
+        self._say(f"You have encountered the {creature.get_name()}!")
+        self._battle_round()
+
+    def _battle_round(self) -> None:
+        """
+        Plays battle rounds until the battle ends or the player has to choose between attacking and healing.
+        """
+        creature = self.opponent
         while not self.steve.isdead() and not creature.isdead():
-            print(self.steve) # show HP
-            if len(self.steve._inventory) == 0:
-                print(f'You have no heal items! \nAttack the {creature.get_name()}.')
-                damage = self.steve.get_attack()
-                creature.take_damage(damage)
-                print(f"{creature.get_name()} now has {creature.get_health()} HP")
-                if creature.get_health() == 0:
-                    continue
-            else:
+            self._say(str(self.steve)) # show HP
+            if len(self.steve._inventory) != 0:
                 self.show_options('battle')
-                battle_option = self.prompt_player()
-                if battle_option == '1':
-                    #attack
-                    damage = self.steve.get_attack()
-                    creature.take_damage(damage)
-                    print(f"{creature.get_name()} now has {creature.get_health()} HP")
-                elif battle_option == '2':
-                    #heal
-                    heal_option = None
-                    n = 0
-                    while not self.isvalid_heal(heal_option): 
-                        n += 1
-                        self.steve.display_inventory()
-                        if n > 1:
-                            self.invalid_opt()
-                        heal_option = input('Please choose a food item: ')
-                        self.isvalid_heal(heal_option)
-                    heal_option = int(heal_option) - 1
-                    self.steve.eat(heal_option)
-                    print('Healed!')
-            #Steve endturn 
-            damage = creature.random_move()
-            self.steve.take_damage(damage)
-            if damage == 0:
-                print(f"The {creature.name} has healed itself.")
-            else:
-                print(f"The {creature.name} has dealt {damage} damage on you.")
-        if room.creature.isdead():
+                self.state = ASK_BATTLE
+                return None
+            self._say(f'You have no heal items! \nAttack the {creature.get_name()}.')
+            self._steve_attacks(creature)
+            self._creature_attacks(creature)
+        self._end_battle()
+
+    def _step_battle(self, battle_option: str) -> None:
+        """
+        Player chose to attack (1) or heal (2) during a battle.
+        """
+        if not self.isvalid(battle_option):
+            self._say('Please enter a valid number(1/2).')
+            return None
+        if battle_option == '1':
+            #attack
+            creature = self.opponent
+            self._steve_attacks(creature)
+            self._creature_attacks(creature)
+            self._battle_round()
+        elif battle_option == '2':
+            #heal
+            self._say(self.steve.describe_inventory())
+            self.state = ASK_FOOD
+
+    def _step_food(self, heal_option: str) -> None:
+        """
+        Player chose which food to eat during a battle.
+        """
+        if not self.isvalid_heal(heal_option):
+            self._say(self.steve.describe_inventory())
+            self.invalid_opt()
+            return None
+        heal_option = int(heal_option) - 1
+        prevhp = self.steve.health
+        message = self.steve.eat(heal_option)
+        self._emit(HealEvent, STEVE, self.steve.health - prevhp, self.steve.health)
+        if message is not None:
+            self._say(message)
+        self._say('Healed!')
+        #Steve endturn 
+        creature = self.opponent
+        self._creature_attacks(creature)
+        self._battle_round()
+
+    def _steve_attacks(self, creature: Creature) -> None:
+        damage = self.steve.get_attack()
+        creature.take_damage(damage)
+        self._emit(DamageEvent, STEVE, creature.name, damage, creature.hitpoints)
+        self._say(f"{creature.get_name()} now has {creature.get_health()} HP")
+
+    def _creature_attacks(self, creature: Creature) -> None:
+        """The creature's turn in a battle. A creature that has just been killed does nothing."""
+        if creature.isdead():
+            return None
+        creature_prevhp = creature.hitpoints
+        damage = creature.random_move(self.rng.combat)
+        prevhp = self.steve.health
+        self.steve.take_damage(damage)
+        self.damage_taken[creature.name] = self.damage_taken.get(creature.name, 0) + prevhp - self.steve.health
+        if damage == 0:
+            self._emit(HealEvent, creature.name, creature.hitpoints - creature_prevhp, creature.hitpoints)
+            self._say(f"The {creature.name} has healed itself.")
+        else:
+            self._emit(DamageEvent, creature.name, STEVE, prevhp - self.steve.health, self.steve.health)
+            self._say(f"The {creature.name} has dealt {damage} damage on you.")
+
+    def _end_battle(self) -> None:
+        """
+        Someone died. Either the game is over, or Steve carries on with the items in the room.
+        """
+        if self.opponent.isdead():
+            self._emit(DeathEvent, self.opponent.name)
+        if self.steve.isdead():
+            self._emit(DeathEvent, STEVE)
+        self.opponent = None
+        room = self.maze.get_room(self.maze.get_current_pos())
+        if room.creature is not None and room.creature.isdead():
             room.set_creature_None()
-        
+        if self.game_is_over():
+            self._end_game()
+            return None
+        self._check_item()
 
     def isvalid_heal(self, heal_option) -> bool:
         """
@@ -151,13 +325,20 @@ class MUDGame:
         return False
         
 
+    def current_creature(self) -> Creature:
+        """
+        Returns the creature Steve has to face in his room: the boss if it is there, else the room's creature.
+        None if there is neither.
+        """
+        if self.maze.boss_pos == self.maze.get_current_pos() and not self.boss.isdead():
+            return self.boss
+        return self.maze.get_room(self.maze.get_current_pos()).get_creature()
+
     def creature_encountered(self) -> bool:
         """
-        Returns True when creature is found in the room.
+        Returns True when creature (or the boss) is found in the room.
         """
-        x, y = self.maze.get_current_pos()
-        room = self.maze.lab[x][y]
-        if room.get_creature() is None:
+        if self.current_creature() is None:
             return False
         return True
 
@@ -165,153 +346,145 @@ class MUDGame:
         """
         Returns True if item is found in the room.
         """
-        x, y = self.maze.get_current_pos()
-        room = self.maze.lab[x][y]
+        room = self.maze.get_room(self.maze.get_current_pos())
         if room.get_item() is None:
             return False
         return True
 
+    def _check_item(self) -> None:
+        """
+        item can be 'Armor', 'Food', 'Weapon'
+        armor and weapon item will be automatically picked up
+        player can choose to pick up food item or not
+        """
+        if not self.item_found():
+            self._say('No item found in this room.')
+            self._ask_move()
+            return None
+        item = self.maze.get_room(self.maze.get_current_pos()).get_item()
+        if item.item_type == 'Weapon':
+            self.steve.equip_weapon(item)
+            self._emit(PickupEvent, item.name, item.item_type)
+            self._say(f'You have found a stronger weapon! It deals {item.get_attack()} damage now!')
+        elif item.item_type == 'Armor':
+            self.steve.equip_armour(item)
+            self._emit(PickupEvent, item.name, item.item_type)
+            self._say(f'You have found a stronger armor! It blocks {item.get_defence()} damage now!')
+        else:
+            self._say(f"You have found a {item.name}! \nDo you want to pick it up?")
+            self.show_options('item')
+            self.state = ASK_PICKUP
+            return None
+        self._ask_move()
+
+    def _step_pickup(self, item_choice: str) -> None:
+        """
+        Player chose whether to pick up the food in the room.
+        """
+        if not self.isvalid(item_choice):
+            self._say('Please enter a valid number(1/2).')
+            return None
+        if item_choice == '1':
+            item = self.maze.get_room(self.maze.get_current_pos()).get_item()
+            self.steve._add_item_to_inv(item, 1)
+            self._emit(PickupEvent, item.name, item.item_type)
+        self._ask_move()
+
     def show_winscreen(self) -> None:
         """
         Shows winscreen when Boss dies.
         """
-        print('Congratulations! \nYou have escaped!')
+        self._say('Congratulations! \nYou have escaped!')
 
     def show_losescreen(self) -> None:
         """
         Show losescreen when Steve dies."""
-        print("YOU DIED...")
-        print(f"Score: {random.randint(0, 10000)}")
+        self._say("YOU DIED...")
+        self._say(f"Score: {self.rng.combat.randint(0, 10000)}")
 
-    def movesteve(self) -> None:
+    def _ask_move(self) -> None:
+        """
+        Asks the player where Steve goes next, once nothing is left to do in the current room.
+        """
+        self.available_dir = self._move_options().directions
+        self._show_directions()
+        self.state = ASK_MOVE
+
+    def _move_options(self) -> MoveOptions:
+        """Where Steve can go from his room, see MOVE_TABLE."""
+        x, y = self.maze.get_current_pos()
+        return MOVE_TABLE[self.maze.passages[x * self.maze.height + y]]
+
+    def _show_directions(self) -> None:
+        self._say(self._move_options().menu)
+
+    def _step_move(self, choice: str) -> None:
+        """
+        Player chose where Steve goes next.
+        """
+        direction = self._move_options().choices.get(choice)
+        if direction is None:
+            self.invalid_opt()
+            self._show_directions()
+            return None
+        self.movesteve(direction)
+        # 30% chance of moving boss to adjacent room
+        if self.rng.maze.randint(1, 100) <= 30:
+            self.moveboss() 
+        self._start_turn()
+
+    def movesteve(self, direction) -> None:
         """
         Move Steve to another room when no item or creatures left in the current room.
         """
-        current_location = self.maze.get_current_pos()
-        opt_dir = {'1':NORTH, '2':SOUTH, '3':EAST, '4':WEST}
-        available_dir = []
-        dir_provided = ''
-        for dir in opt_dir.values():
-            if self.maze.can_move_here(current_location, dir):
-                available_dir.append(dir)
-        for i in range(len(available_dir)):
-            dir_provided = dir_provided + str(i+1) + '. ' + available_dir[i] + ' '
-        validity = False
-        n = 0
-        while validity == False:
-            n += 1
-            if n > 1:
-                self.invalid_opt()
-            print('Where are you going next? ' + dir_provided )
-            choice = input('Next location: ')
-            no_of_choice = len(available_dir)
-            valid_choice = ''
-            for i in range(no_of_choice):
-                valid_choice += str(i + 1)
-            if choice in valid_choice:
-                if len(choice) == 1:
-                    validity = True
-        choice = int(choice)
-        self.maze.move_steve(available_dir[choice - 1])
+        if self.events is None:
+            self.maze.move_steve(direction)
+            return None
+        x, y = self.maze.get_current_pos()
+        dx, dy = DIROFFSETS[direction]
+        room = self.maze.get_room([x + dx, y + dy])
+        fresh = not room.cleared and not room.boss_ishere() # things may spawn in it
+        self.maze.move_steve(direction)
+        self._emit(MoveEvent, x + dx, y + dy, direction)
+        if fresh and (room.creature is not None or room.item is not None):
+            self._emit(SpawnEvent, x + dx, y + dy,
+                       None if room.creature is None else room.creature.name, None if room.item is None else room.item.name)
 
     def moveboss(self) -> None:
         """
         Move boss to another room.
         """
         self.maze.move_boss()
+        self._emit(BossMoveEvent, *self.maze.boss_pos)
 
     def invalid_opt(self) -> None:
         """
         Show error message.
         """
-        print('Please enter a valid option.')
-    
-    def run(self):
+        self._say('Please enter a valid option.')
 
-        # starting interface
-        self.introduce()
-
-        # while loop continue until steve or boss die
-        while not self.game_is_over():
-            print('\n')
-
-            # append the current location to steve_path
-            self.steve_path.append(self.maze.get_current_pos)
-
-            # print steve's status
-            self.show_status()
-
-            # creature is found in the room
-            if self.creature_encountered():
-                
-                # show player action options
-                self.show_options('creature')
-                
-                # prompt player to take actions
-                option = self.prompt_player()
-
-                # battle if player choose option 1
-                if option == '1':
-                    self.battle()
-                    if self.game_is_over():
-                        continue
-
-                # steve has 40% chance of running away to another room, 60% chance to battle instead
-                else:
-                    odds = random.randint(1, 100)
-                    if odds <= 40:
-                        current_location = self.maze.get_current_pos()
-                        opt_dir = {'1':NORTH, '2':SOUTH, '3':EAST, '4':WEST}
-                        available_dir = []
-                        for dir in opt_dir.values():
-                            if self.maze.can_move_here(current_location, dir):
-                                available_dir.append(dir)
-                                random_dir = random.choice(available_dir)
-                        self.maze.move_steve(random_dir)
-                        print('You have successfully ran away!')
-                        continue
-                    else:
-                        print("Too late to escape!")
-                        self.battle()
-                        if self.game_is_over():
-                            continue
-            else:
-                print('No creature found in this room.')
-
-
-            # item is found in the room
-            # item can be 'Armor', 'Food', 'Weapon'
-            # armor and weapon item will be automatically picked up
-            # player can choose to pick up food item or not
-            if self.item_found():
-                x, y = self.maze.get_current_pos()
-                room = self.maze.lab[x][y]
-                item = room.get_item()
-                if item.item_type == 'Weapon':
-                    self.steve.equip_weapon(item)
-                    print(f'You have found a stronger weapon! It deals {item.get_attack()} damage now!')
-                elif item.item_type == 'Armor':
-                    self.steve.equip_armour(item)
-                    print(f'You have found a stronger armor! It blocks {item.get_defence()} damage now!')
-                else:
-                    print(f"You have found a {item.name}! \nDo you want to pick it up?")
-                    self.show_options('item')
-                    item_choice = self.prompt_player()
-                    if item_choice == '1':
-                        self.steve._add_item_to_inv(item, 1)
-            else:
-                print('No item found in this room.')
-
-            # move steve to the next room according to player's input, 30% chance of moving boss to adjacent room
-            self.movesteve()
-            if random.randint(1, 100) <= 30:
-                self.moveboss() 
-
-        # game end interface
+    def _end_game(self) -> None:
+        """game end interface"""
+        self.gameover = True
+        self.state = GAMEOVER
         if self.steve.isdead():
             self.show_losescreen()
         else:
+            self.won = True
             self.show_winscreen()
+    
+    def run(self):
+        """Plays the game in the terminal."""
+        TerminalFrontEnd(self).run()
+
+
+class TerminalFrontEnd:
+    """Plays a MUDGame with input() and print()."""
+    def __init__(self, game: MUDGame) -> None:
+        self.game = game
 
-            
-            
\ No newline at end of file
+    def run(self) -> None:
+        while self.game.state != GAMEOVER:
+            action = input(self.game.prompt())
+            for line in self.game.step(action):
+                print(line)
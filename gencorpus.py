@@ -0,0 +1,233 @@
+#File for generating many labyrinths at once into a corpus file
+# Labyrinths of one size are generated with Labyrinth.generate_random(), one seed each from a range of seeds,
+# in batches spread over a pool of worker processes, and written to the corpus file as they come back, in seed order.
+# A corpus is:
+#
+#   header    CORPUS_HEADER, padded to CORPUS_HEADER_SIZE bytes: magic, format version, width, height,
+#             number of labyrinths, offset of the index
+#   mazes     one save (see savegame.py) per labyrinth, each starting on a 64 byte boundary
+#   index     one INDEX_ENTRY per labyrinth, in seed order: where its save is, its seed and its statistics
+#
+# so any labyrinth can be read without reading the others, and statistics without reading any labyrinth.
+# e.g.
+#   python gencorpus.py mazes.corpus --count 10000 --size 50 --seed 0
+#   with Corpus("mazes.corpus") as corpus:
+#       lab = corpus[1234]
+import argparse
+import json
+import mmap
+import os
+import statistics
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import savegame
+from game import *
+
+CORPUS_MAGIC = b"MUDCORP\0"
+CORPUS_VERSION = 1
+CORPUS_HEADER = struct.Struct("<8sHIIQQ")
+CORPUS_HEADER_SIZE = 64
+INDEX_ENTRY = struct.Struct("<QQqIIII") # offset, length, seed, then MazeStats
+ALIGN = 64
+
+
+class MazeStats(NamedTuple):
+    """Shape of one labyrinth."""
+    dead_ends: int # rooms with a single passage
+    junctions: int # rooms with three or four passages
+    passages: int # passages between two rooms
+    path_length: int # steps from the startroom to the boss's room along the shortest path
+
+    def branching_factor(self, rooms: int) -> float:
+        """Mean number of passages out of a room other than the one walked in through."""
+        return 2 * self.passages / rooms - 1
+
+# number of passages of a room, for every passage mask (translate() wants all 256 byte values)
+PASSAGE_COUNT = bytes(bin(mask & 15).count("1") for mask in range(256))
+
+def maze_stats(lab: Labyrinth) -> MazeStats:
+    degrees = bytes(lab.passages).translate(PASSAGE_COUNT) # passages can be a memoryview into a save
+    return MazeStats(
+        dead_ends=degrees.count(1),
+        junctions=degrees.count(3) + degrees.count(4),
+        passages=sum(degrees) // 2,
+        path_length=DistanceField(lab, lab.boss_pos).distance(lab.start_pos),
+    )
+
+def _generate_batch(width: int, height: int, seeds: list[int]) -> list[tuple[int, bytes, MazeStats]]:
+    """Worker process entry point, labyrinths are sent back as saves with their statistics."""
+    results = []
+    for seed in seeds:
+        lab = Labyrinth(width, height, rng=RandomStreams(seed))
+        lab.generate_random(verbose=False)
+        results.append((seed, savegame.dumps(lab), maze_stats(lab)))
+    return results
+
+
+def generate_corpus(path: str, width: int, height: int, seeds: range, workers: int = None, batch: int = 20, progress=None) -> None:
+    """Generates a labyrinth for every seed in seeds and writes them to a corpus at path.
+    workers: number of worker processes, all the cores if None, 0 to generate in this process.
+    progress: called with the number of labyrinths written so far after every batch.
+    The corpus does not depend on the number of workers. The file is replaced in one go once it is complete."""
+    if len(seeds) == 0:
+        raise ValueError("A corpus needs at least one labyrinth.")
+    batches = [list(seeds[i:i + batch]) for i in range(0, len(seeds), batch)]
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    index = []
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(bytes(CORPUS_HEADER_SIZE)) # written for real once the index is
+            offset = CORPUS_HEADER_SIZE
+            def write(results):
+                nonlocal offset
+                for seed, save, stats in results:
+                    f.write(save)
+                    index.append(INDEX_ENTRY.pack(offset, len(save), seed, *stats))
+                    padding = -len(save) % ALIGN
+                    f.write(bytes(padding))
+                    offset += len(save) + padding
+                if progress is not None:
+                    progress(len(index))
+            if workers == 0:
+                for seeds_batch in batches:
+                    write(_generate_batch(width, height, seeds_batch))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    # map hands the batches back in order, each as soon as it and the ones before it are done
+                    for results in pool.map(_generate_batch, [width] * len(batches), [height] * len(batches), batches):
+                        write(results)
+            f.write(b"".join(index))
+            f.seek(0)
+            f.write(CORPUS_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, width, height, len(index), offset))
+    except BaseException: # a worker failed, or the user gave up: no half written corpus is left behind
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+
+
+class Corpus:
+    """
+    A corpus file, read with random access. The file is mmap'ed copy-on-write like savegame.load(),
+    so a labyrinth's passages come straight from the page cache and only the labyrinths asked for are read.
+
+    -- ATTRIBUTES --
+    + path: str
+    + width: int
+    + height: int
+
+    -- METHODS --
+    + seed(self, i: int) -> int
+    + stats(self, i: int) -> MazeStats
+    + all_stats(self) -> list[MazeStats]
+    + close(self) -> None
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if len(self._buffer) < CORPUS_HEADER_SIZE:
+            raise ValueError(f"{path} is not a corpus, it is too short.")
+        magic, version, self.width, self.height, self._count, self._index_offset = CORPUS_HEADER.unpack_from(self._buffer, 0)
+        if magic != CORPUS_MAGIC:
+            raise ValueError(f"{path} is not a corpus, the magic number is wrong.")
+        if version != CORPUS_VERSION:
+            raise ValueError(f"Corpus format version {version} is not supported, only version {CORPUS_VERSION} is.")
+        if self._index_offset + self._count * INDEX_ENTRY.size > len(self._buffer):
+            raise ValueError(f"{path} is truncated or corrupt.")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, i: int) -> tuple:
+        if not 0 <= i < self._count:
+            raise IndexError(f"Corpus has {self._count} labyrinths, there is no labyrinth {i}.")
+        return INDEX_ENTRY.unpack_from(self._buffer, self._index_offset + i * INDEX_ENTRY.size)
+
+    def __getitem__(self, i: int) -> Labyrinth:
+        offset, length = self._entry(i)[:2]
+        if offset + length > len(self._buffer):
+            raise ValueError(f"{self.path} is truncated or corrupt, labyrinth {i} goes past its end.")
+        return savegame.loads(memoryview(self._buffer)[offset:offset + length])
+
+    def seed(self, i: int) -> int:
+        return self._entry(i)[2]
+
+    def stats(self, i: int) -> MazeStats:
+        return MazeStats(*self._entry(i)[3:])
+
+    def all_stats(self) -> list[MazeStats]:
+        return [MazeStats(*entry[3:]) for entry in INDEX_ENTRY.iter_unpack(
+            self._buffer[self._index_offset:self._index_offset + self._count * INDEX_ENTRY.size])]
+
+    def close(self) -> None:
+        try:
+            self._buffer.close()
+        except BufferError: # labyrinths read from the corpus still use it, it goes when they do
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def summarise(stats: list[MazeStats], width: int, height: int) -> dict:
+    """Sums up the statistics of many labyrinths of width by height rooms."""
+    rooms = width * height
+    dead_ends = [s.dead_ends for s in stats]
+    path_lengths = [s.path_length for s in stats]
+    return {
+        "mazes": len(stats),
+        "width": width,
+        "height": height,
+        "dead_ends_mean": round(statistics.mean(dead_ends), 2),
+        "dead_end_fraction": round(statistics.mean(dead_ends) / rooms, 4),
+        "junctions_mean": round(statistics.mean(s.junctions for s in stats), 2),
+        "path_length_mean": round(statistics.mean(path_lengths), 2),
+        "path_length_min": min(path_lengths),
+        "path_length_max": max(path_lengths),
+        "branching_factor_mean": round(statistics.mean(s.branching_factor(rooms) for s in stats), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generates many labyrinths into a corpus file and sums up their shape.")
+    parser.add_argument("path", help="corpus file to write")
+    parser.add_argument("-n", "--count", type=int, default=1000)
+    parser.add_argument("--size", type=int, nargs="+", default=[labsize], metavar="N", help="width and height of the labyrinths, or one number for both")
+    parser.add_argument("--seed", type=int, default=0, help="the labyrinths are seeded with seed, seed + 1, ...")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all cores by default, 0 for none")
+    parser.add_argument("--batch", type=int, default=20, help="labyrinths per task sent to a worker")
+    parser.add_argument("--json", metavar="FILE", help="also write the summary to FILE")
+    args = parser.parse_args()
+    if args.count < 1:
+        parser.error(f"--count must be at least 1, not {args.count}")
+    if len(args.size) > 2:
+        parser.error(f"--size takes a width and at most a height, not {len(args.size)} numbers")
+    width = args.size[0]
+    height = args.size[1] if len(args.size) > 1 else width
+    start = time.perf_counter()
+    def progress(done: int) -> None:
+        print(f"\r{done}/{args.count} labyrinths", end="", flush=True)
+    generate_corpus(args.path, width, height, range(args.seed, args.seed + args.count), args.workers, args.batch, progress)
+    elapsed = time.perf_counter() - start
+    print()
+    with Corpus(args.path) as corpus:
+        summary = summarise(corpus.all_stats(), width, height)
+    summary["seconds"] = round(elapsed, 2)
+    summary["mazes_per_second"] = round(args.count / elapsed, 1)
+    summary["file_bytes"] = os.path.getsize(args.path)
+    for key, value in summary.items():
+        print(f"{key:<24} {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#File for keeping labyrinths generated ahead of time
+# Generating a big labyrinth takes seconds, so a MazePool does it in the background
+# and new games start with one that is already made.
+# e.g.
+#   pool = MazePool(capacity=2)
+#   pool.want(200, 200)                  # start filling up the pool
+#   game = MUDGame(maze=pool.get(200, 200))
+#   pool.close()
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from game import *
+import savegame
+
+
+def generate_labyrinth(width: int, height: int, seed, walls: bool) -> Labyrinth:
+    """Generates a labyrinth the way MazePool does.
+    walls: whether the rooms are linked like a maze (generate_random()) or all open (generate(), like MUDGame does)."""
+    lab = Labyrinth(width, height, rng=RandomStreams(seed))
+    if walls:
+        lab.generate_random(verbose=False)
+    else:
+        lab.generate()
+    return lab
+
+def _generate_save(width: int, height: int, seed, walls: bool) -> bytes:
+    """Worker process entry point, labyrinths are sent back as saves."""
+    return savegame.dumps(generate_labyrinth(width, height, seed, walls))
+
+
+class MazePool:
+    """
+    Labyrinths generated ahead of time, capacity of them for each (width, height, seed_class) that is wanted.
+    Background threads keep the pool full, generating in worker processes if there are any.
+
+    A seed class names a sequence of seeds: the nth labyrinth generated for seed_class s is seeded with f"{s}/{n}",
+    so the labyrinths of a seed class are always the same ones (with several workers, not always handed out in the same order).
+    With seed_class None every labyrinth gets a random seed.
+    Either way a labyrinth's seed is in lab.rng.seed, and a game played in it can be replayed.
+
+    -- ATTRIBUTES --
+    + capacity: int, number of labyrinths kept ready for each key
+    + walls: bool, see generate_labyrinth()
+    + hits: int, number of get() that were given a ready labyrinth
+    + misses: int, number of get() that had to generate one themselves
+    - _ready: dict[tuple, deque[Labyrinth]]
+    - _pending: dict[tuple, int], labyrinths of each key being generated
+    - _next_seed: dict[tuple, int], n of the next seed of each seed class
+    - _executor: ProcessPoolExecutor or None
+    - _error: Exception, the first one a background thread ran into, raised by get()
+
+    -- METHODS --
+    + want(self, width: int, height: int, seed_class: str) -> None
+    + get(self, width: int, height: int, seed_class: str) -> Labyrinth
+    + ready(self, width: int, height: int, seed_class: str) -> int
+    + close(self) -> None
+    """
+    def __init__(self, capacity: int = 2, walls: bool = True, workers: int = 0):
+        """workers: number of worker processes generating labyrinths, 0 to generate in a background thread of this process."""
+        if capacity < 1:
+            raise ValueError(f"MazePool capacity must be at least 1, not {capacity}.")
+        self.capacity = capacity
+        self.walls = walls
+        self.hits = 0
+        self.misses = 0
+        self._ready = {}
+        self._pending = {}
+        self._next_seed = {}
+        self._closed = False
+        self._lock = threading.Condition()
+        self._executor = None
+        self._error = None
+        if workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._threads = []
+        for _ in range(max(1, workers)): # one thread per worker process, waiting on it
+            thread = threading.Thread(target=self._refill, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def __enter__(self) -> "MazePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _key(self, width: int, height: int, seed_class) -> tuple:
+        if height is None:
+            height = width
+        return (width, height, seed_class)
+
+    def _seed(self, key: tuple):
+        """Next seed of key's seed class. Must be called with the lock held."""
+        seed_class = key[2]
+        if seed_class is None:
+            return None
+        n = self._next_seed.get(key, 0)
+        self._next_seed[key] = n + 1
+        return f"{seed_class}/{n}"
+
+    def want(self, width: int, height: int = None, seed_class: str = None) -> None:
+        """Starts keeping labyrinths of this size and seed class ready."""
+        key = self._key(width, height, seed_class)
+        if key[0] < MIN_LABSIZE or key[1] < MIN_LABSIZE:
+            raise ValueError(f"Labyrinth of {key[0]} by {key[1]} rooms is too small, it must be at least {MIN_LABSIZE} by {MIN_LABSIZE}.")
+        with self._lock:
+            if key not in self._ready:
+                self._ready[key] = deque()
+                self._pending[key] = 0
+                self._lock.notify_all()
+
+    def ready(self, width: int, height: int = None, seed_class: str = None) -> int:
+        """Number of labyrinths of this size and seed class ready to be taken."""
+        with self._lock:
+            return len(self._ready.get(self._key(width, height, seed_class), ()))
+
+    def get(self, width: int, height: int = None, seed_class: str = None) -> Labyrinth:
+        """Takes a ready labyrinth, and has the pool make another one.
+        If none is ready, one is generated right away rather than waiting for the background.
+        Raises the error a background thread ran into, if one did, as the pool is no longer being refilled."""
+        key = self._key(width, height, seed_class)
+        self.want(*key)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("get() was called on a closed MazePool.")
+            if self._error is not None:
+                raise self._error
+            if self._ready[key]:
+                self.hits += 1
+                lab = self._ready[key].popleft()
+                self._lock.notify_all() # there is room for another one
+                return lab
+            self.misses += 1
+            seed = self._seed(key)
+        return generate_labyrinth(key[0], key[1], seed, self.walls)
+
+    def _next_key(self) -> tuple:
+        """A key that needs more labyrinths, None if the pool is full. Must be called with the lock held."""
+        for key, ready in self._ready.items():
+            if len(ready) + self._pending[key] < self.capacity:
+                return key
+        return None
+
+    def _refill(self) -> None:
+        """Background thread, generates labyrinths whenever the pool is not full."""
+        while True:
+            with self._lock:
+                key = self._next_key()
+                while not self._closed and key is None:
+                    self._lock.wait()
+                    key = self._next_key()
+                if self._closed:
+                    return None
+                seed = self._seed(key)
+                self._pending[key] += 1
+            try:
+                if self._executor is None:
+                    lab = generate_labyrinth(key[0], key[1], seed, self.walls)
+                else:
+                    # a bytearray, so that the passages are used in place instead of copied again
+                    lab = savegame.loads(bytearray(self._executor.submit(_generate_save, key[0], key[1], seed, self.walls).result()))
+            except Exception as error:
+                with self._lock:
+                    self._pending[key] -= 1
+                    if not self._closed and self._error is None: # a closed pool shuts the executor down under us
+                        self._error = error # handed to get(), nobody would see it raised in this thread
+                return None
+            with self._lock:
+                self._pending[key] -= 1
+                if self._closed:
+                    return None
+                self._ready[key].append(lab)
+                self._lock.notify_all()
+
+    def close(self) -> None:
+        """Stops generating and returns straight away, without waiting for labyrinths being generated:
+        the background threads (daemons) throw them away once they are done and stop."""
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,204 @@
+#File for finding paths through a labyrinth's passages
+# shortest_path() and reachable_within() answer more than can_move_here()'s single step, for bots and hints.
+# Two ways of finding a shortest path are offered:
+# - A*, guided by the Manhattan distance to the goal, which never overestimates since every step moves one room
+# - bidirectional breadth first search, from both ends at once, which visits far fewer rooms than a search from one end
+# Every room is one step from its neighbours, so both always find a shortest path, possibly not the same one.
+# A PathFinder keeps its answers in an LRU cache keyed by the labyrinth's version and the endpoints:
+# Labyrinth.version goes up whenever the passages change, so a cached path is never stale.
+# e.g.
+#   paths = PathFinder(lab)
+#   path = paths.shortest_path(lab.steve_pos, lab.boss_pos)
+#   print(path_directions(path))
+import heapq
+from collections import OrderedDict
+
+from data import *
+
+ASTAR = "astar"
+BIDIRECTIONAL = "bidirectional"
+CACHE_SIZE = 1024 # answers a PathFinder keeps
+
+
+def _neighbours(passages, index: int, height: int):
+    """Cells that cell index has a passage to."""
+    mask = passages[index]
+    if mask & 1:
+        yield index + 1
+    if mask & 2:
+        yield index - 1
+    if mask & 4:
+        yield index + height
+    if mask & 8:
+        yield index - height
+
+def _index(lab: Labyrinth, coords: list[int]) -> int:
+    x, y = coords
+    if not 0 <= x < lab.width or not 0 <= y < lab.height:
+        raise IndexError(f"Room {coords} is outside of the labyrinth.")
+    return x * lab.height + y
+
+def _coords(lab: Labyrinth, index: int) -> list[int]:
+    return [index // lab.height, index % lab.height]
+
+def astar(lab: Labyrinth, start: list[int], goal: list[int]) -> list[list[int]]:
+    """A shortest path from start to goal, both included, found with A*. None if goal cannot be reached."""
+    height = lab.height
+    passages = lab.passages
+    begin, end = _index(lab, start), _index(lab, goal)
+    gx, gy = goal
+    parent = {begin: begin}
+    cost = {begin: 0}
+    heap = [(abs(start[0] - gx) + abs(start[1] - gy), 0, begin)]
+    while heap:
+        _, g, index = heapq.heappop(heap)
+        g = -g
+        if index == end:
+            path = [index]
+            while index != begin:
+                index = parent[index]
+                path.append(index)
+            return [_coords(lab, i) for i in reversed(path)]
+        if g > cost[index]: # a shorter way here was found after this was pushed
+            continue
+        for neighbour in _neighbours(passages, index, height):
+            if neighbour not in cost or g + 1 < cost[neighbour]:
+                cost[neighbour] = g + 1
+                parent[neighbour] = index
+                estimate = g + 1 + abs(neighbour // height - gx) + abs(neighbour % height - gy)
+                heapq.heappush(heap, (estimate, -(g + 1), neighbour)) # deeper first on ties
+    return None
+
+def bidirectional_bfs(lab: Labyrinth, start: list[int], goal: list[int]) -> list[list[int]]:
+    """A shortest path from start to goal, both included, found by searching from both ends until they meet.
+    None if goal cannot be reached."""
+    height = lab.height
+    passages = lab.passages
+    begin, end = _index(lab, start), _index(lab, goal)
+    if begin == end:
+        return [list(start)]
+    # parents and distances of the cells each side has reached, and the cells it reached last
+    parents = ({begin: None}, {end: None})
+    distances = ({begin: 0}, {end: 0})
+    frontiers = ([begin], [end])
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1 # grow the smaller side
+        mine, theirs = parents[side], parents[1 - side]
+        mydistance, theirdistance = distances[side], distances[1 - side]
+        best = None
+        newfrontier = []
+        for index in frontiers[side]:
+            for neighbour in _neighbours(passages, index, height):
+                if neighbour in mine:
+                    continue
+                mine[neighbour] = index
+                mydistance[neighbour] = mydistance[index] + 1
+                newfrontier.append(neighbour)
+                if neighbour in theirs and (best is None or theirdistance[neighbour] < theirdistance[best]):
+                    best = neighbour
+        # the whole layer is grown before stopping, as the meeting cell that is closest to the other end can come last
+        if best is not None:
+            path = []
+            index = best
+            while index is not None:
+                path.append(index)
+                index = parents[0][index]
+            path.reverse()
+            index = parents[1][best]
+            while index is not None:
+                path.append(index)
+                index = parents[1][index]
+            return [_coords(lab, i) for i in path]
+        frontiers = (newfrontier, frontiers[1]) if side == 0 else (frontiers[0], newfrontier)
+    return None
+
+def reachable_within(lab: Labyrinth, start: list[int], steps: int) -> dict[tuple[int, int], int]:
+    """Every room that can be walked to from start in at most steps steps -> the number of steps it takes."""
+    if steps < 0:
+        raise ValueError(f"reachable_within() needs a number of steps that is not negative, not {steps}.")
+    height = lab.height
+    passages = lab.passages
+    begin = _index(lab, start)
+    distance = {begin: 0}
+    frontier = [begin]
+    for step in range(1, steps + 1):
+        newfrontier = []
+        for index in frontier:
+            for neighbour in _neighbours(passages, index, height):
+                if neighbour not in distance:
+                    distance[neighbour] = step
+                    newfrontier.append(neighbour)
+        if not newfrontier:
+            break
+        frontier = newfrontier
+    return {(index // height, index % height): d for index, d in distance.items()}
+
+def path_directions(path: list[list[int]]) -> list[str]:
+    """The directions to walk in to follow path, one fewer than its rooms."""
+    return [direction_of(path[i], path[i + 1]) for i in range(len(path) - 1)]
+
+
+class PathFinder:
+    """
+    Paths through one labyrinth, with the answers cached.
+
+    -- ATTRIBUTES --
+    + labyrinth: Labyrinth
+    + method: str, ASTAR or BIDIRECTIONAL, how shortest_path() searches
+    + cache_size: int
+    + hits: int
+    + misses: int
+
+    -- METHODS --
+    + shortest_path(self, start: list[int], goal: list[int]) -> list[list[int]]
+    + distance(self, start: list[int], goal: list[int]) -> int
+    + reachable_within(self, start: list[int], steps: int) -> dict[tuple[int, int], int]
+    + clear(self) -> None
+    """
+    def __init__(self, labyrinth: Labyrinth, method: str = BIDIRECTIONAL, cache_size: int = CACHE_SIZE):
+        if method not in (ASTAR, BIDIRECTIONAL):
+            raise ValueError(f"PathFinder method must be {ASTAR} or {BIDIRECTIONAL}, not {method}.")
+        self.labyrinth = labyrinth
+        self.method = method
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict() # (version, kind, start, goal or steps) -> answer, least recently used first
+        self._version = labyrinth.version
+
+    def clear(self) -> None:
+        self._cache = OrderedDict()
+
+    def _cached(self, key: tuple, work):
+        if self.labyrinth.version != self._version: # nothing in the cache can be asked for again
+            self._cache = OrderedDict()
+            self._version = self.labyrinth.version
+        key = (self._version,) + key
+        answer = self._cache.get(key)
+        if answer is not None or key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return answer
+        self.misses += 1
+        answer = work()
+        self._cache[key] = answer
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return answer
+
+    def shortest_path(self, start: list[int], goal: list[int]) -> list[list[int]]:
+        """A shortest path from start to goal, both included, None if there is none.
+        The list is shared with the cache, copy it before changing it."""
+        search = astar if self.method == ASTAR else bidirectional_bfs
+        return self._cached(("path", tuple(start), tuple(goal)), lambda: search(self.labyrinth, start, goal))
+
+    def distance(self, start: list[int], goal: list[int]) -> int:
+        """Number of steps from start to goal, None if goal cannot be reached."""
+        path = self.shortest_path(start, goal)
+        if path is None:
+            return None
+        return len(path) - 1
+
+    def reachable_within(self, start: list[int], steps: int) -> dict[tuple[int, int], int]:
+        """See reachable_within(). The dict is shared with the cache, copy it before changing it."""
+        return self._cached(("within", tuple(start), steps), lambda: reachable_within(self.labyrinth, start, steps))
@@ -0,0 +1,288 @@
+#File for seeing where the game's time goes
+# Instrumentation is opt-in: enable() wraps the game's phases and Labyrinth's methods in timers,
+# disable() puts the original methods back, so when it is off nothing is timed and nothing costs anything.
+# Every timer counts its calls and keeps a histogram of how long they took, in powers of two of nanoseconds.
+# Times are inclusive: step() contains the phases it runs, a phase contains the Labyrinth methods it calls.
+# e.g. in a server:
+#   from profiling import profiler
+#   profiler.enable()
+#   ...
+#   print(profiler.report())
+# or to play bot games and dump the results:
+#   python profiling.py --games 20 --json timings.json --cprofile turns.prof --capture-turns 200
+import argparse
+import cProfile
+import functools
+import json
+import pstats
+import time
+import tracemalloc
+
+from game import *
+
+# what gets timed when the profiler is enabled, the name of a timer is "Class.method"
+GAME_PHASES = [
+    "step",
+    "_start_turn",    # checking the room Steve walked into
+    "battle",
+    "_step_battle",
+    "_step_food",
+    "_check_item",    # the item in the room, weapons and armour are equipped straight away
+    "_step_pickup",   # picking up an item
+    "_step_move",
+    "movesteve",
+    "moveboss",
+]
+LABYRINTH_METHODS = [
+    "can_move_here",
+    "move_steve",
+    "move_boss",
+    "get_room",
+    "boss_distance",
+    "generate",
+    "generate_random",
+    "__repr__",
+]
+HISTOGRAM_BUCKETS = 64 # bucket b counts durations of 2**(b-1) to 2**b - 1 nanoseconds
+
+
+class Timer:
+    """
+    Calls and durations of one instrumented method.
+
+    -- ATTRIBUTES --
+    + name: str
+    + calls: int
+    + total_ns: int
+    + min_ns: int
+    + max_ns: int
+    + histogram: list[int], see HISTOGRAM_BUCKETS
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, ns: int) -> None:
+        self.calls += 1
+        self.total_ns += ns
+        if self.min_ns is None or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.histogram[min(ns.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, p: float) -> int:
+        """Duration in ns that p percent of the calls took at most, rounded up to the end of its histogram bucket."""
+        if self.calls == 0:
+            return None
+        wanted = self.calls * p / 100
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= wanted:
+                return min(2 ** bucket - 1, self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> dict:
+        last = max((b for b, count in enumerate(self.histogram) if count), default=0)
+        return {
+            "calls": self.calls,
+            "total_ns": self.total_ns,
+            "mean_ns": self.total_ns / self.calls if self.calls else None,
+            "min_ns": self.min_ns,
+            "max_ns": self.max_ns,
+            "p50_ns": self.percentile(50),
+            "p99_ns": self.percentile(99),
+            "histogram": self.histogram[:last + 1],
+        }
+
+
+def _format_ns(ns: float) -> str:
+    if ns is None:
+        return "-"
+    if ns < 1000:
+        return f"{ns:.0f}ns"
+    if ns < 1000000:
+        return f"{ns / 1000:.1f}us"
+    return f"{ns / 1000000:.2f}ms"
+
+
+class Profiler:
+    """
+    Timers for the game's phases and Labyrinth's methods, plus counters for anything else.
+
+    -- ATTRIBUTES --
+    + enabled: bool
+    + timers: dict[str, Timer]
+    + counters: dict[str, int]
+    + profile: pstats.Stats, from the last capture with cprofile, None until it has finished
+    + memory: tracemalloc.Snapshot, from the last capture with memory, None until it has finished
+    - _originals: list[tuple[class, str, function]], methods to put back on disable()
+
+    -- METHODS --
+    + enable(self) -> None
+    + disable(self) -> None
+    + reset(self) -> None
+    + count(self, name: str, n: int) -> None
+    + capture(self, turns: int, cprofile: bool, memory: bool) -> None
+    + report(self, histograms: bool) -> str
+    + to_dict(self) -> dict
+    """
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}
+        self.counters = {}
+        self.profile = None
+        self.memory = None
+        self._originals = []
+        self._capture_left = 0
+        self._cprofile = None
+        self._tracing = False
+
+    def _timed(self, name: str, func, turn: bool = False):
+        """Returns func wrapped in the timer called name. A turn ends every time a turn function returns."""
+        timer = self.timers.setdefault(name, Timer(name))
+        clock = time.perf_counter_ns # monotonic
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.add(clock() - start)
+                if turn and self._capture_left:
+                    self._turn_done()
+        return timed
+
+    def enable(self) -> None:
+        """Starts timing, by wrapping the methods in GAME_PHASES and LABYRINTH_METHODS."""
+        if self.enabled:
+            return None
+        for cls, names in ((MUDGame, GAME_PHASES), (Labyrinth, LABYRINTH_METHODS)):
+            for name in names:
+                func = cls.__dict__[name]
+                self._originals.append((cls, name, func))
+                setattr(cls, name, self._timed(f"{cls.__name__}.{name}", func, turn=(cls is MUDGame and name == "step")))
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stops timing and puts the original methods back. The timers keep what they measured."""
+        self._stop_capture()
+        for cls, name, func in self._originals:
+            setattr(cls, name, func)
+        self._originals = []
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Forgets everything measured so far. Not while a capture is running, as it would end it."""
+        if self._capture_left:
+            raise RuntimeError(f"reset() was called during a capture, {self._capture_left} turns before it ends.")
+        self.timers = {}
+        self.counters = {}
+        self.profile = None
+        self.memory = None
+        if self.enabled: # the wrappers hold on to the old timers
+            self.disable()
+            self.enable()
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Adds n to a counter, for anything that is not a method call (e.g. bytes sent)."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def capture(self, turns: int, cprofile: bool = True, memory: bool = False) -> None:
+        """Runs cProfile and/or tracemalloc for the next turns calls of MUDGame.step (of any game).
+        The results end up in profile and memory. Enables the profiler if needed."""
+        if turns < 1:
+            raise ValueError(f"capture() needs at least 1 turn, not {turns}.")
+        self._stop_capture()
+        self.enable()
+        self._capture_left = turns
+        if memory:
+            tracemalloc.start()
+            self._tracing = True
+        if cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def _turn_done(self) -> None:
+        self._capture_left -= 1
+        if self._capture_left == 0:
+            self._stop_capture()
+
+    def _stop_capture(self) -> None:
+        self._capture_left = 0
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self.profile = pstats.Stats(self._cprofile)
+            self._cprofile = None
+        if self._tracing:
+            self.memory = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self._tracing = False
+
+    def to_dict(self) -> dict:
+        return {
+            "timers": {name: timer.to_dict() for name, timer in sorted(self.timers.items()) if timer.calls},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def report(self, histograms: bool = True, width: int = 40) -> str:
+        """The timers as a table, slowest in total first, each followed by its histogram."""
+        lines = [f"{'timer':<28} {'calls':>9} {'total':>10} {'mean':>9} {'p50':>9} {'p99':>9} {'max':>9}"]
+        timers = sorted((t for t in self.timers.values() if t.calls), key=lambda t: t.total_ns, reverse=True)
+        for timer in timers:
+            lines.append(f"{timer.name:<28} {timer.calls:>9} {_format_ns(timer.total_ns):>10} {_format_ns(timer.total_ns / timer.calls):>9} "
+                         f"{_format_ns(timer.percentile(50)):>9} {_format_ns(timer.percentile(99)):>9} {_format_ns(timer.max_ns):>9}")
+            if histograms:
+                biggest = max(timer.histogram)
+                for bucket, count in enumerate(timer.histogram):
+                    if count:
+                        bar = "#" * max(1, count * width // biggest)
+                        lines.append(f"    < {_format_ns(2 ** bucket):>8} {bar} {count}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<28} {value:>9}")
+        return "\n".join(lines)
+
+profiler = Profiler()
+
+
+def main() -> None:
+    import simulate
+    parser = argparse.ArgumentParser(description="Plays bot games with the profiler on and shows where the time went.")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--policy", choices=sorted(simulate.POLICIES), default="aggressive")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--capture-turns", type=int, default=0, help="run cProfile and tracemalloc for the first N turns")
+    parser.add_argument("--cprofile", metavar="FILE", help="write the cProfile capture to FILE (for pstats/snakeviz)")
+    parser.add_argument("--no-histograms", action="store_true")
+    parser.add_argument("--json", metavar="FILE", help="write the timers and counters to FILE")
+    args = parser.parse_args()
+    profiler.enable()
+    if args.capture_turns:
+        profiler.capture(args.capture_turns, cprofile=True, memory=True)
+    for seed in range(args.seed, args.seed + args.games):
+        result = simulate.play_game(seed, args.policy, 500)
+        profiler.count("games." + result["outcome"])
+        profiler.count("turns", result["turns"])
+    profiler.disable()
+    print(profiler.report(histograms=not args.no_histograms))
+    if profiler.memory is not None:
+        print("\nBiggest allocations during the capture:")
+        for stat in profiler.memory.statistics("lineno")[:10]:
+            print(stat)
+    if profiler.profile is not None:
+        print()
+        profiler.profile.sort_stats("cumulative").print_stats(15)
+        if args.cprofile:
+            profiler.profile.dump_stats(args.cprofile)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(profiler.to_dict(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
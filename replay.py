@@ -0,0 +1,210 @@
+#File for recording games and replaying them up to any point
+# A recording is the game's save (see savegame.py) from before the first action, plus every action passed to step(), in order.
+# All randomness comes from the game's RandomStreams, which saves include, so replaying the actions gives back the same game.
+# Every keyframe_every actions the game is saved again, as a keyframe: going to action N loads the last keyframe
+# at or before N and replays only the actions after it, with no text shown and no prompts,
+# so going anywhere in a long session costs at most keyframe_every steps instead of a replay from the start.
+# e.g. recording a game while it is played:
+#   recorder = Recorder(MUDGame(1))
+#   lines = recorder.step("alice")
+#   ...
+#   recorder.recording.save("bugreport.replay")
+# and looking at it later:
+#   recording = Recording.load("bugreport.replay")
+#   game = recording.game_at_turn(250)
+#   python replay.py bugreport.replay --turn 250 --map
+import argparse
+import os
+from bisect import bisect_left, bisect_right
+
+import savegame
+from game import *
+
+KEYFRAME_EVERY = 100
+REPLAY_MAGIC = b"MUDREPLY"
+REPLAY_VERSION = 1
+
+
+class Recording:
+    """
+    A recorded game.
+
+    -- ATTRIBUTES --
+    + actions: list[str], every action passed to step(), in order
+    + turns: list[int], the game's turn (Labyrinth.turn) after each action
+    + keyframes: dict[int, bytes], number of actions done -> save of the game at that point, there is always one at 0
+    + keyframe_every: int
+
+    -- METHODS --
+    + game_at(self, step: int) -> MUDGame
+    + step_of_turn(self, turn: int) -> int
+    + game_at_turn(self, turn: int) -> MUDGame
+    + verify(self) -> int
+    + save(self, path: str) -> None
+    + load(path: str) -> Recording
+    """
+    def __init__(self, start: bytes, keyframe_every: int = KEYFRAME_EVERY):
+        if keyframe_every < 1:
+            raise ValueError(f"Keyframes must be at least 1 action apart, not {keyframe_every}.")
+        self.actions = []
+        self.turns = []
+        self.keyframes = {0: start}
+        self.keyframe_every = keyframe_every
+        self._keyframe_steps = [0] # sorted keys of keyframes
+
+    def __len__(self) -> int:
+        """Number of actions recorded"""
+        return len(self.actions)
+
+    def _add_keyframe(self, step: int, save: bytes) -> None:
+        self.keyframes[step] = save
+        self._keyframe_steps.append(step)
+
+    def game_at(self, step: int) -> MUDGame:
+        """The game as it was after the first step actions, a new MUDGame each time."""
+        if not 0 <= step <= len(self.actions):
+            raise IndexError(f"Recording has {len(self.actions)} actions, there is no action {step}.")
+        keyframe = self._keyframe_steps[bisect_right(self._keyframe_steps, step) - 1]
+        game = savegame.loads(self.keyframes[keyframe])
+        for action in self.actions[keyframe:step]:
+            game.step(action)
+        return game
+
+    def step_of_turn(self, turn: int) -> int:
+        """Number of actions after which the game first got to turn (had entered turn rooms)."""
+        if turn <= 1:
+            return 0
+        step = bisect_left(self.turns, turn)
+        if step == len(self.turns):
+            raise IndexError(f"The recorded game never got to turn {turn}, it ended on turn {self.turns[-1] if self.turns else 1}.")
+        return step + 1
+
+    def game_at_turn(self, turn: int) -> MUDGame:
+        """The game as it was when Steve walked into the room of turn turn."""
+        return self.game_at(self.step_of_turn(turn))
+
+    def verify(self) -> int:
+        """Replays the whole recording from the start and checks the game matches every keyframe on the way.
+        Returns the number of keyframes checked, raises RuntimeError at the first one that does not match,
+        which means something in the game is not deterministic."""
+        game = savegame.loads(self.keyframes[0])
+        for step, action in enumerate(self.actions, 1):
+            game.step(action)
+            if step in self.keyframes and savegame.dumps(game) != self.keyframes[step]:
+                raise RuntimeError(f"Replaying the recording does not give the game of its keyframe at action {step}.")
+        return len(self.keyframes)
+
+    def save(self, path: str) -> None:
+        """Writes the recording to path, replacing the file in one go."""
+        w = savegame._Writer()
+        w.out += REPLAY_MAGIC
+        w.put("HII", REPLAY_VERSION, self.keyframe_every, len(self.actions))
+        for action, turn in zip(self.actions, self.turns):
+            w.put_str(action)
+            w.put("i", turn)
+        w.put("I", len(self.keyframes))
+        for step in self._keyframe_steps:
+            w.put("I", step)
+            w.put_bytes(self.keyframes[step])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(w.out)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def load(path: str) -> "Recording":
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(REPLAY_MAGIC)] != REPLAY_MAGIC:
+            raise ValueError(f"{path} is not a recording, the magic number is wrong.")
+        r = savegame._Reader(data, len(REPLAY_MAGIC))
+        version, keyframe_every, nactions = r.take("HII")
+        if version != REPLAY_VERSION:
+            raise ValueError(f"Recording format version {version} is not supported, only version {REPLAY_VERSION} is.")
+        actions, turns = [], []
+        for _ in range(nactions):
+            actions.append(r.take_str())
+            turns.append(r.take("i"))
+        keyframes = []
+        for _ in range(r.take("I")):
+            step = r.take("I")
+            keyframes.append((step, bytes(r.take_bytes())))
+        recording = Recording(keyframes[0][1], keyframe_every)
+        recording.actions = actions
+        recording.turns = turns
+        for step, save in keyframes[1:]:
+            recording._add_keyframe(step, save)
+        return recording
+
+
+class Recorder:
+    """
+    Plays a game and records it: step() is MUDGame.step() that also adds the action to recording.
+
+    -- ATTRIBUTES --
+    + game: MUDGame
+    + recording: Recording
+    """
+    def __init__(self, game: MUDGame, keyframe_every: int = KEYFRAME_EVERY):
+        self.game = game
+        self.recording = Recording(savegame.dumps(game), keyframe_every)
+
+    def step(self, action: str) -> list[str]:
+        lines = self.game.step(action)
+        recording = self.recording
+        recording.actions.append(action)
+        recording.turns.append(self.game.maze.turn)
+        if len(recording.actions) % recording.keyframe_every == 0:
+            recording._add_keyframe(len(recording.actions), savegame.dumps(self.game))
+        return lines
+
+
+def record_bot_game(seed: int, policy_name: str = "aggressive", max_turns: int = 500, keyframe_every: int = KEYFRAME_EVERY) -> Recording:
+    """Records a game played by one of simulate's bots, the same game simulate.play_game() plays."""
+    import simulate
+    policy = simulate.POLICIES[policy_name]
+    policy_rng = random.Random(f"{seed}/policy")
+    recorder = Recorder(MUDGame(seed), keyframe_every)
+    while recorder.game.state != GAMEOVER and len(recorder.game.steve_path) <= max_turns:
+        recorder.step(policy(recorder.game, policy_rng))
+    return recorder.recording
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replays a recorded game up to a given point and shows it.")
+    parser.add_argument("path", help="recording to read, or to write with --record")
+    parser.add_argument("--record", type=int, metavar="SEED", help="record a bot game with this seed to path first")
+    parser.add_argument("--policy", default="aggressive", help="bot for --record, see simulate.py")
+    parser.add_argument("--keyframe-every", type=int, default=KEYFRAME_EVERY)
+    parser.add_argument("--step", type=int, help="go to the game after this many actions")
+    parser.add_argument("--turn", type=int, help="go to the game when Steve entered the room of this turn")
+    parser.add_argument("--map", action="store_true", help="draw the labyrinth")
+    parser.add_argument("--verify", action="store_true", help="replay everything and check it against the keyframes")
+    args = parser.parse_args()
+    if args.record is not None:
+        record_bot_game(args.record, args.policy, keyframe_every=args.keyframe_every).save(args.path)
+    recording = Recording.load(args.path)
+    print(f"{len(recording)} actions, {len(recording.keyframes)} keyframes, last turn {recording.turns[-1] if recording.turns else 1}")
+    if args.verify:
+        print(f"{recording.verify()} keyframes match")
+    if args.step is None and args.turn is None:
+        return None
+    if args.step is not None and not 0 <= args.step <= len(recording):
+        parser.error(f"--step must be from 0 to {len(recording)}, the number of actions recorded, not {args.step}")
+    if args.turn is not None:
+        last_turn = recording.turns[-1] if recording.turns else 1
+        if args.turn > last_turn:
+            parser.error(f"--turn {args.turn} was never reached, the recorded game ended on turn {last_turn}")
+    step = args.step if args.turn is None else recording.step_of_turn(args.turn)
+    game = recording.game_at(step)
+    print(f"After action {step}: turn {game.maze.turn}, state {game.state}")
+    print(f"Steve at {game.maze.steve_pos}, {game.steve.health} HP, attack {game.steve.get_attack()}, defence {game.steve.get_defence()}")
+    print(f"Boss at {game.maze.boss_pos}, {game.boss.hitpoints} HP")
+    if game.prompt() is not None:
+        print(f"Waiting for: {game.prompt()}")
+    if args.map:
+        print(game.maze)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#File for saving and loading games and labyrinths
+# A save is a header, the labyrinth's passage masks, then everything else:
+#
+#   header    HEADER, padded to HEADER_SIZE bytes: magic, format version, flags, width, height,
+#             offset and length of the passages section and of the entities section
+#   passages  width * height bytes, Labyrinth.passages exactly as it is in memory, so that
+#             load() can mmap the file and use it without copying or parsing it
+#   entities  the rest of the labyrinth (positions, visited rooms, the rooms' contents, random state),
+#             then, if FLAG_GAME is set, the rest of the game: Steve, the boss and the player's progress
+#
+# Numbers are little endian, strings are an int32 length (-1 for None) followed by UTF-8.
+# Items are written once each, in a table at the start of the entities, and referred to by their index,
+# so items shared between rooms and the inventory stay shared after loading.
+# e.g. save(game, "checkpoint.sav") ... game = load("checkpoint.sav")
+import mmap
+import os
+import struct
+
+from game import *
+
+MAGIC = b"MUDSAVE\0"
+FORMAT_VERSION = 2 # 2: Steve's stat modifiers
+READABLE_VERSIONS = (1, 2) # saves of these versions can still be loaded
+HEADER = struct.Struct("<8sHHIIQQQQ")
+HEADER_SIZE = 64 # the passages start on a 64 byte boundary
+FLAG_GAME = 1 # a whole MUDGame was saved, not just a Labyrinth
+
+STATES = [ASK_NAME, ASK_FIGHT, ASK_BATTLE, ASK_FOOD, ASK_PICKUP, ASK_MOVE, GAMEOVER]
+ITEM_CLASSES = [Item, Food, Armor, Weapon]
+CREATURE_CLASSES = [None, Creature, Creeper, Boss]
+NO_OPPONENT, OPPONENT_BOSS, OPPONENT_ROOM = 0, 1, 2
+
+
+class _Writer:
+    """Appends values to a bytearray."""
+    def __init__(self):
+        self.out = bytearray()
+
+    def put(self, fmt: str, *values) -> None:
+        self.out += struct.pack("<" + fmt, *values)
+
+    def put_str(self, text: str) -> None:
+        if text is None:
+            self.put("i", -1)
+            return None
+        data = text.encode()
+        self.put("i", len(data))
+        self.out += data
+
+    def put_bytes(self, data) -> None:
+        self.put("I", len(data))
+        self.out += data
+
+
+class _Reader:
+    """Reads values from a buffer, starting at offset."""
+    def __init__(self, buffer, offset: int = 0):
+        self.buffer = buffer
+        self.offset = offset
+
+    def take(self, fmt: str):
+        fmt = "<" + fmt
+        values = struct.unpack_from(fmt, self.buffer, self.offset)
+        self.offset += struct.calcsize(fmt)
+        if len(values) == 1:
+            return values[0]
+        return values
+
+    def take_str(self) -> str:
+        length = self.take("i")
+        if length < 0:
+            return None
+        text = bytes(self.buffer[self.offset:self.offset + length]).decode()
+        self.offset += length
+        return text
+
+    def take_bytes(self) -> bytearray:
+        length = self.take("I")
+        data = bytearray(self.buffer[self.offset:self.offset + length])
+        self.offset += length
+        return data
+
+
+def _put_random(w: _Writer, rng: random.Random) -> None:
+    version, internal, gauss_next = rng.getstate()
+    w.put("BH", version, len(internal))
+    w.put(f"{len(internal)}I", *internal)
+    w.put("?d", gauss_next is not None, gauss_next or 0.0)
+
+def _take_random(r: _Reader, rng: random.Random) -> None:
+    version, length = r.take("BH")
+    internal = r.take(f"{length}I")
+    has_gauss, gauss_next = r.take("?d")
+    rng.setstate((version, internal, gauss_next if has_gauss else None))
+
+def _put_streams(w: _Writer, streams: RandomStreams) -> None:
+    w.put("?", isinstance(streams.seed, int))
+    w.put_str(str(streams.seed))
+    for rng in (streams.maze, streams.spawn, streams.combat):
+        _put_random(w, rng)
+
+def _take_streams(r: _Reader) -> RandomStreams:
+    seed_is_int = r.take("?")
+    seed = r.take_str()
+    if seed_is_int:
+        seed = int(seed)
+    streams = RandomStreams(seed)
+    for rng in (streams.maze, streams.spawn, streams.combat):
+        _take_random(r, rng)
+    return streams
+
+
+def _put_item(w: _Writer, item: Item) -> None:
+    w.put("B", ITEM_CLASSES.index(type(item)))
+    w.put_str(item.name)
+    w.put_str(item.item_type)
+    if isinstance(item, Food):
+        w.put("i", item.hprestore)
+    elif isinstance(item, Armor):
+        w.put("i", item.defence)
+        w.put_str(item.armor_slot)
+    elif isinstance(item, Weapon):
+        w.put("i", item.attack)
+
+def _take_item(r: _Reader) -> Item:
+    cls = ITEM_CLASSES[r.take("B")]
+    name = r.take_str()
+    item_type = r.take_str()
+    if cls is Food:
+        return Food(name, item_type, r.take("i"))
+    if cls is Armor:
+        defence = r.take("i")
+        return Armor(name, item_type, defence, r.take_str())
+    if cls is Weapon:
+        return Weapon(name, item_type, r.take("i"))
+    return Item(name, item_type)
+
+def _put_creature(w: _Writer, creature: Creature) -> None:
+    if creature is None:
+        w.put("B", 0)
+        return None
+    w.put("B", CREATURE_CLASSES.index(type(creature)))
+    w.put_str(creature.name)
+    w.put("iii", creature.hitpoints, creature.maxhp, creature.attack)
+    if isinstance(creature, Creeper):
+        w.put_str(creature.letter)
+
+def _take_creature(r: _Reader) -> Creature:
+    cls = CREATURE_CLASSES[r.take("B")]
+    if cls is None:
+        return None
+    creature = cls.__new__(cls) # the stats were rolled when it first appeared, they are not rolled again
+    creature.name = r.take_str()
+    creature.hitpoints, creature.maxhp, creature.attack = r.take("iii")
+    if cls is Creeper:
+        creature.letter = r.take_str()
+    return creature
+
+
+def _collect_items(lab: Labyrinth, steve: Steve) -> list[Item]:
+    """Every item in the labyrinth and on Steve, each once."""
+    items = {}
+    room_items = lab.rooms.items
+    for index in sorted(room_items): # in cell order, so that a loaded labyrinth saves the same as the one it was saved from
+        items.setdefault(room_items[index].key, room_items[index])
+    if steve is not None:
+        for item, _ in steve._inventory:
+            items.setdefault(item.key, item)
+        for item in [steve.weapon] + list(steve.armour.values()):
+            if item is not None:
+                items.setdefault(item.key, item)
+    return list(items.values())
+
+def _put_labyrinth(w: _Writer, lab: Labyrinth, item_index: dict) -> None:
+    w.put_str(lab.difficulty_level)
+    w.put("6i", *lab.boss_pos, *lab.steve_pos, *lab.start_pos)
+    w.put("i?", lab.turn, lab.boss_hunting)
+    w.put_bytes(lab.visited)
+    _put_streams(w, lab.rng)
+    rooms = lab.rooms
+    used = rooms.used()
+    w.put("I", len(used))
+    for index in used:
+        w.put("IB", index, rooms.flags[index])
+        _put_creature(w, rooms.creatures.get(index))
+        item = rooms.items.get(index)
+        w.put("i", -1 if item is None else item_index[item.key])
+
+def _take_labyrinth(r: _Reader, width: int, height: int, passages, items: list[Item]) -> Labyrinth:
+    difficulty_level = r.take_str()
+    positions = r.take("6i")
+    turn, boss_hunting = r.take("i?")
+    visited = r.take_bytes()
+    lab = Labyrinth(width, height, rng=_take_streams(r))
+    lab.passages = passages
+    lab.visited = visited
+    lab.difficulty_level = difficulty_level
+    lab.boss_pos = list(positions[0:2])
+    lab.steve_pos = list(positions[2:4])
+    lab.start_pos = list(positions[4:6])
+    lab.turn = turn
+    lab.boss_hunting = boss_hunting
+    rooms = lab.rooms
+    for _ in range(r.take("I")):
+        index, flags = r.take("IB")
+        rooms.flags[index] = flags
+        creature = _take_creature(r)
+        if creature is not None:
+            rooms.creatures[index] = creature
+        item = r.take("i")
+        if item >= 0:
+            rooms.items[index] = items[item]
+    return lab
+
+def _put_game(w: _Writer, game: MUDGame, item_index: dict) -> None:
+    w.put("??B", game.won, game.gameover, STATES.index(game.state))
+    w.put_str(game.username)
+    w.put("B", len(game.available_dir))
+    for direction in game.available_dir:
+        w.put_str(direction)
+    if game.opponent is None:
+        w.put("B", NO_OPPONENT)
+    elif game.opponent is game.boss:
+        w.put("B", OPPONENT_BOSS)
+    else:
+        w.put("B", OPPONENT_ROOM)
+    w.put("I", len(game.steve_path))
+    for x, y in game.steve_path:
+        w.put("ii", x, y)
+    w.put("I", len(game.damage_taken))
+    for name, amount in game.damage_taken.items():
+        w.put_str(name)
+        w.put("i", amount)
+    steve = game.steve
+    w.put("ii", steve.health, steve.base_damage)
+    w.put("i", -1 if steve.weapon is None else item_index[steve.weapon.key])
+    w.put("B", len(steve.armour))
+    for slot, item in steve.armour.items():
+        w.put_str(slot)
+        w.put("i", -1 if item is None else item_index[item.key])
+    w.put("I", len(steve._inventory))
+    for item, number in steve._inventory:
+        w.put("ii", item_index[item.key], number)
+    w.put("B", len(steve.modifiers))
+    for modifier in steve.modifiers.values():
+        w.put_str(modifier.name)
+        w.put("ii", modifier.attack, modifier.defence)
+    _put_creature(w, game.boss)
+
+def _take_game(r: _Reader, lab: Labyrinth, items: list[Item], version: int = FORMAT_VERSION) -> MUDGame:
+    game = MUDGame.__new__(MUDGame) # __init__ would generate a new labyrinth
+    game.won, game.gameover, state = r.take("??B")
+    game.state = STATES[state]
+    game.username = r.take_str()
+    game.available_dir = [r.take_str() for _ in range(r.take("B"))]
+    opponent = r.take("B")
+    game.steve_path = [list(r.take("ii")) for _ in range(r.take("I"))]
+    game.damage_taken = {}
+    for _ in range(r.take("I")):
+        name = r.take_str()
+        game.damage_taken[name] = r.take("i")
+    steve = Steve()
+    steve.health, steve.base_damage = r.take("ii")
+    weapon = r.take("i")
+    if weapon >= 0:
+        steve.equip_weapon(items[weapon])
+    for _ in range(r.take("B")):
+        slot = r.take_str()
+        item = r.take("i")
+        if item >= 0:
+            steve.equip_armour(items[item])
+    for _ in range(r.take("I")):
+        item, number = r.take("ii")
+        steve._inventory.add(items[item], number)
+    for _ in range(r.take("B") if version >= 2 else 0): # version 1 saves have no modifiers
+        name = r.take_str()
+        attack, defence = r.take("ii")
+        steve.add_modifier(StatModifier(name, attack, defence))
+    game.steve = steve
+    game.boss = _take_creature(r)
+    game.rng = lab.rng
+    game.maze = lab
+    game._events = []
+    game.events = None # sinks are not saved
+    game.opponent = None
+    if opponent == OPPONENT_BOSS:
+        game.opponent = game.boss
+    elif opponent == OPPONENT_ROOM:
+        game.opponent = lab.get_room(lab.get_current_pos()).get_creature()
+    return game
+
+
+def dumps(thing) -> bytes:
+    """Returns the save of a MUDGame or a Labyrinth."""
+    if isinstance(thing, MUDGame):
+        lab, steve, flags = thing.maze, thing.steve, FLAG_GAME
+    elif isinstance(thing, Labyrinth):
+        lab, steve, flags = thing, None, 0
+    else:
+        raise ValueError(f"Only a MUDGame or a Labyrinth can be saved, not {type(thing).__name__}.")
+    items = _collect_items(lab, steve)
+    item_index = {item.key: i for i, item in enumerate(items)}
+    w = _Writer()
+    w.put("I", len(items))
+    for item in items:
+        _put_item(w, item)
+    _put_labyrinth(w, lab, item_index)
+    if flags & FLAG_GAME:
+        _put_game(w, thing, item_index)
+    npassages = lab.width * lab.height
+    entities_offset = HEADER_SIZE + npassages
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, lab.width, lab.height,
+                         HEADER_SIZE, npassages, entities_offset, len(w.out))
+    return header.ljust(HEADER_SIZE, b"\0") + bytes(lab.passages) + w.out
+
+def read_header(buffer) -> dict:
+    """Checks and returns the header of a save."""
+    if len(buffer) < HEADER_SIZE:
+        raise ValueError("Not a save, it is too short.")
+    magic, version, flags, width, height, passages_offset, passages_length, entities_offset, entities_length = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a save, the magic number is wrong.")
+    if version not in READABLE_VERSIONS:
+        raise ValueError(f"Save format version {version} is not supported, only versions {READABLE_VERSIONS[0]} to {READABLE_VERSIONS[-1]} are.")
+    if passages_length != width * height or entities_offset + entities_length > len(buffer):
+        raise ValueError("Save is truncated or corrupt.")
+    return {
+        "version": version,
+        "flags": flags,
+        "width": width,
+        "height": height,
+        "passages_offset": passages_offset,
+        "passages_length": passages_length,
+        "entities_offset": entities_offset,
+        "entities_length": entities_length,
+    }
+
+def loads(buffer):
+    """Returns the MUDGame or Labyrinth saved in buffer.
+    If buffer is writable (a bytearray, an mmap...), the labyrinth's passages are a memoryview into it instead of a copy."""
+    header = read_header(buffer)
+    start = header["passages_offset"]
+    view = memoryview(buffer)
+    if view.readonly:
+        passages = bytearray(view[start:start + header["passages_length"]])
+    else:
+        passages = view[start:start + header["passages_length"]]
+    r = _Reader(view, header["entities_offset"])
+    items = [_take_item(r) for _ in range(r.take("I"))]
+    lab = _take_labyrinth(r, header["width"], header["height"], passages, items)
+    if header["flags"] & FLAG_GAME:
+        return _take_game(r, lab, items, header["version"])
+    return lab
+
+def save(thing, path: str) -> None:
+    """Saves a MUDGame or a Labyrinth to path. The file is replaced in one go, a crash never leaves half a save."""
+    data = dumps(thing)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def load(path: str):
+    """Loads the MUDGame or Labyrinth saved at path.
+    The file is mmap'ed copy-on-write: the labyrinth's passages are read straight from the page cache,
+    and changing them (set_access) never writes to the file."""
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    return loads(buffer)
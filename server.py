@@ -0,0 +1,221 @@
+#File for hosting many games at once over TCP
+# Every connection gets its own MUDGame, played line by line like in the terminal (telnet works as a client).
+# Everything runs on one asyncio event loop: MUDGame.step() never blocks, so one slow player never holds up the others.
+# e.g. python server.py --port 4000 --max-sessions 500
+#      telnet localhost 4000
+import argparse
+import asyncio
+import logging
+import time
+
+from game import *
+
+MAX_LINE = 1024 # longest line a player may send, in bytes
+WRITE_HIGH_WATER = 64 * 1024 # bytes waiting to be sent to a player before the game stops to wait for them
+
+log = logging.getLogger("server")
+
+
+class Session:
+    """
+    One player connected to the server.
+
+    -- ATTRIBUTES --
+    + game: MUDGame, None while it is being made
+    + peer: str, address of the player
+    + writer: asyncio.StreamWriter, to the player
+    + started: float, time.monotonic() when the player connected
+    + actions: int, number of lines the player has sent
+    """
+    def __init__(self, peer: str, writer: asyncio.StreamWriter):
+        self.game = None
+        self.peer = peer
+        self.writer = writer
+        self.started = time.monotonic()
+        self.actions = 0
+
+
+class MUDServer:
+    """
+    Hosts a MUDGame for every connection.
+
+    Each session waits for at most idle_timeout seconds for the player to send a line,
+    and for the player to take what was sent to them (backpressure: a player who stops reading
+    has their session waiting on drain() instead of the server buffering for them without end).
+    Players connecting while max_sessions are playing are told the server is full.
+
+    -- ATTRIBUTES --
+    + host: str
+    + port: int, the port actually listened on after start(), useful with port 0
+    + max_sessions: int
+    + idle_timeout: float, seconds
+    + sessions: dict[asyncio.Task, Session], the sessions being played
+    + refused: int, connections turned away because the server was full
+    + timed_out: int, sessions ended because the player was idle
+    + crashed: int, sessions ended because their game could not be made or raised an exception
+    - make_game: function returning a new MUDGame
+
+    -- METHODS --
+    + start(self) -> None
+    + serve_forever(self) -> None
+    + close(self) -> None
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 4000, max_sessions: int = 200,
+                 idle_timeout: float = 300.0, make_game=MUDGame):
+        """make_game: called in a worker thread for every new session, it may take a while (e.g. lambda: MUDGame(maze=pool.get(200)))"""
+        if max_sessions < 1:
+            raise ValueError(f"max_sessions must be at least 1, not {max_sessions}.")
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.make_game = make_game
+        self.sessions = {}
+        self.refused = 0
+        self.timed_out = 0
+        self.crashed = 0
+        self._server = None
+
+    async def start(self) -> None:
+        """Starts listening."""
+        # a backlog as big as the sessions, so a burst of players connecting at once is not dropped by the kernel
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE,
+                                                  backlog=max(100, self.max_sessions))
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stops listening and ends every session."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for session in self.sessions.values():
+            session.writer.close() # the session sees the player hang up and ends
+        if self.sessions:
+            await asyncio.gather(*self.sessions, return_exceptions=True)
+
+    async def _send(self, writer: asyncio.StreamWriter, lines: list[str]) -> None:
+        """Sends lines to the player, waiting while too much is still unsent."""
+        if not lines:
+            return None
+        text = "\n".join(lines) + "\n"
+        writer.write(text.replace("\n", "\r\n").encode())
+        await asyncio.wait_for(writer.drain(), self.idle_timeout)
+
+    async def _crashed(self, session: Session, writer: asyncio.StreamWriter, when: str) -> None:
+        """Logs the exception being handled and tells the player their session is over.
+        A bug in a game ends that session only, _handle() then closes the writer as for every other way a session ends."""
+        self.crashed += 1
+        log.exception("Game of %s crashed %s", session.peer, when)
+        await self._send(writer, ["", "Something went wrong in the game, disconnected."])
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Plays one session, from connection to disconnection."""
+        writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        task = asyncio.current_task()
+        try:
+            if len(self.sessions) >= self.max_sessions:
+                self.refused += 1
+                await self._send(writer, ["The server is full, please try again later."])
+                return None
+            session = Session(str(writer.get_extra_info("peername")), writer)
+            self.sessions[task] = session # counts against max_sessions while the game is made
+            try:
+                session.game = await asyncio.to_thread(self.make_game)
+            except Exception:
+                await self._crashed(session, writer, "while it was being made")
+                return None
+            await self._play(session, reader, writer)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass # the player went away, or stopped reading
+        finally:
+            self.sessions.pop(task, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _play(self, session: Session, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        game = session.game
+        while game.state != GAMEOVER:
+            writer.write(game.prompt().encode())
+            await asyncio.wait_for(writer.drain(), self.idle_timeout)
+            try:
+                line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                await self._send(writer, ["", "Disconnected for being idle."])
+                return None
+            except ValueError: # longer than MAX_LINE
+                await self._send(writer, ["", "Line too long, disconnected."])
+                return None
+            if not line: # the player disconnected
+                return None
+            session.actions += 1
+            action = line.decode("utf-8", errors="ignore").strip("\r\n")
+            action = "".join(c for c in action if c.isprintable()) # drops telnet negotiation and control characters
+            try:
+                lines = game.step(action)
+            except Exception:
+                await self._crashed(session, writer, f"on action {action!r}")
+                return None
+            await self._send(writer, lines)
+
+
+async def run_client(host: str, port: int, actions: list[str], timeout: float = 10.0) -> str:
+    """Plays a session as a player would, sending actions one line at a time after each prompt,
+    then hangs up after the next prompt (or when the game ends first).
+    Returns everything the server sent. For trying the server out locally."""
+    reader, writer = await asyncio.open_connection(host, port)
+    received = []
+    try:
+        for action in actions:
+            text = await asyncio.wait_for(_read_until_prompt(reader), timeout)
+            received.append(text)
+            if not text.endswith(": "): # the game is over and the server hung up
+                return "".join(received)
+            writer.write(action.encode() + b"\r\n")
+            await writer.drain()
+        received.append(await asyncio.wait_for(_read_until_prompt(reader), timeout))
+    finally:
+        writer.close()
+    return "".join(received)
+
+async def _read_until_prompt(reader: asyncio.StreamReader) -> str:
+    """Reads until the server asks something (its prompts end with ': ') or closes the connection."""
+    data = b""
+    while not data.endswith(b": "):
+        chunk = await reader.read(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hosts a game for every player connecting over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--max-sessions", type=int, default=200)
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = MUDServer(args.host, args.port, args.max_sessions, args.idle_timeout)
+    async def serve() -> None:
+        await server.start()
+        print(f"Serving on {server.host}:{server.port}") # once it is actually listening
+        await server.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#File for balancing the game by simulation
+# Plays many games with bots instead of players, across all cores, and sums up how they went.
+# e.g. python simulate.py -n 10000 --policy aggressive --seed 1
+import argparse
+import json
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+from game import *
+
+
+def options(game: MUDGame) -> list[str]:
+    """Returns the answers the game accepts to its current question."""
+    if game.state == ASK_NAME:
+        return ["bot"]
+    if game.state == ASK_FOOD:
+        return [str(i + 1) for i in range(len(game.steve._inventory))]
+    if game.state == ASK_MOVE:
+        return [str(i + 1) for i in range(len(game.available_dir))]
+    if game.state in (ASK_FIGHT, ASK_BATTLE, ASK_PICKUP):
+        return ["1", "2"]
+    return []
+
+
+def random_policy(game: MUDGame, rng: random.Random) -> str:
+    """Picks any valid answer."""
+    return rng.choice(options(game))
+
+
+def aggressive_policy(game: MUDGame, rng: random.Random) -> str:
+    """Fights everything, picks up all food, eats when low on HP and prefers rooms it has not been to."""
+    if game.state == ASK_BATTLE:
+        if game.steve.health < 20:
+            return "2"
+        return "1"
+    if game.state == ASK_MOVE:
+        x, y = game.maze.get_current_pos()
+        unvisited = []
+        for i, direction in enumerate(game.available_dir):
+            dx, dy = DIROFFSETS[direction]
+            if [x + dx, y + dy] not in game.steve_path[-50:]:
+                unvisited.append(str(i + 1))
+        if unvisited:
+            return rng.choice(unvisited)
+        return random_policy(game, rng)
+    return options(game)[0]
+
+
+def cowardly_policy(game: MUDGame, rng: random.Random) -> str:
+    """Runs away from every creature, picks up all food and wanders at random."""
+    if game.state in (ASK_FIGHT, ASK_BATTLE):
+        if game.state == ASK_BATTLE and game.steve.health < 20:
+            return "2"
+        return "2" if game.state == ASK_FIGHT else "1"
+    if game.state == ASK_MOVE:
+        return random_policy(game, rng)
+    return options(game)[0]
+
+
+# A policy is given the game and its own random generator, and returns the answer to the game's current question.
+POLICIES = {
+    "random": random_policy,
+    "aggressive": aggressive_policy,
+    "cowardly": cowardly_policy,
+}
+
+
+def play_game(seed: int, policy_name: str, max_turns: int) -> dict:
+    """Plays a whole game with a bot. A turn is a room Steve enters.
+
+    Returns a dict describing how it went:
+    - outcome: "won", "lost", or "timeout" if it took more than max_turns turns
+    - turns: int
+    - hp: list[int], Steve's HP at the start of each turn, and at the end
+    - damage_taken: dict, creature name -> damage it dealt to Steve
+    """
+    policy = POLICIES[policy_name]
+    policy_rng = random.Random(f"{seed}/policy")
+    game = MUDGame(seed)
+    hp = []
+    while game.state != GAMEOVER and len(game.steve_path) <= max_turns:
+        game.step(policy(game, policy_rng))
+        if len(game.steve_path) > len(hp):
+            hp.append(game.steve.health)
+    hp.append(game.steve.health)
+    if game.state != GAMEOVER:
+        outcome = "timeout"
+    elif game.won:
+        outcome = "won"
+    else:
+        outcome = "lost"
+    return {
+        "seed": seed,
+        "outcome": outcome,
+        "turns": len(game.steve_path),
+        "hp": hp,
+        "damage_taken": game.damage_taken,
+    }
+
+
+def _play_games(seeds: list[int], policy_name: str, max_turns: int) -> list[dict]:
+    """Worker process entry point, plays a batch of games."""
+    return [play_game(seed, policy_name, max_turns) for seed in seeds]
+
+
+def simulate(games: int, policy_name: str = "aggressive", seed: int = 0, workers: int = None, max_turns: int = 500, batch: int = 50) -> list[dict]:
+    """Plays games games, game i being seeded with seed + i, spread over a pool of worker processes.
+    Returns the result of every game, see play_game(). The results do not depend on the number of workers."""
+    if policy_name not in POLICIES:
+        raise ValueError(f"Unknown policy {policy_name}, choose from {', '.join(POLICIES)}.")
+    if games < 1:
+        raise ValueError(f"simulate() needs at least 1 game, not {games}.")
+    if workers is not None and workers < 1:
+        raise ValueError(f"simulate() workers must be at least 1, not {workers}.")
+    seeds = list(range(seed, seed + games))
+    batches = [seeds[i:i + batch] for i in range(0, games, batch)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch_results in pool.map(_play_games, batches, [policy_name] * len(batches), [max_turns] * len(batches)):
+            results.extend(batch_results)
+    return results
+
+
+def summarise(results: list[dict], curve_length: int = 50) -> dict:
+    """Sums up the results of many games.
+    The HP curve is the mean HP at the start of each of the first curve_length turns, among the games that got that far."""
+    games = len(results)
+    outcomes = {"won": 0, "lost": 0, "timeout": 0}
+    for result in results:
+        outcomes[result["outcome"]] += 1
+    finished = [result["turns"] for result in results if result["outcome"] != "timeout"]
+    hp_curve = []
+    for turn in range(curve_length):
+        hps = [result["hp"][turn] for result in results if len(result["hp"]) > turn]
+        if not hps:
+            break
+        hp_curve.append(round(statistics.mean(hps), 2))
+    damage = {}
+    for result in results:
+        for name, amount in result["damage_taken"].items():
+            damage[name] = damage.get(name, 0) + amount
+    summary = {
+        "games": games,
+        "win_rate": outcomes["won"] / games,
+        "loss_rate": outcomes["lost"] / games,
+        "timeout_rate": outcomes["timeout"] / games,
+        "turns_to_finish": None,
+        "hp_curve": hp_curve,
+        "damage_taken_per_game": {name: amount / games for name, amount in sorted(damage.items())},
+    }
+    if finished:
+        summary["turns_to_finish"] = {
+            "mean": statistics.mean(finished),
+            "median": statistics.median(finished),
+            "min": min(finished),
+            "max": max(finished),
+        }
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Plays many games with bots and sums up how they went.")
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="aggressive")
+    parser.add_argument("--seed", type=int, default=0, help="game i is seeded with seed + i")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--max-turns", type=int, default=500, help="games taking longer count as timeouts")
+    parser.add_argument("--json", metavar="FILE", help="also write the summary and every game's result to FILE")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error(f"--games must be at least 1, not {args.games}")
+    if args.workers is not None and args.workers < 1:
+        parser.error(f"--workers must be at least 1, not {args.workers}")
+    results = simulate(args.games, args.policy, args.seed, args.workers, args.max_turns)
+    summary = summarise(results)
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "games": results}, f)
+
+
+if __name__ == "__main__":
+    main()
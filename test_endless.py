@@ -0,0 +1,26 @@
+#File for testing the endless labyrinth
+import os
+
+from endless import *
+
+
+def _walk(world: EndlessLabyrinth, steps: int = 2000) -> None:
+    rng = random.Random(1)
+    for _ in range(steps):
+        direction = rng.choice([NORTH, SOUTH, EAST, WEST])
+        if world.can_move_here(world.steve_pos, direction):
+            world.move_steve(direction)
+
+def test_worlds_sharing_a_spill_dir(tmp_path):
+    """Chunks read back from disk are the world's own, and its borders still match the neighbouring chunks'."""
+    first = EndlessLabyrinth(seed=1, budget=18, spill_dir=str(tmp_path))
+    second = EndlessLabyrinth(seed=2, budget=18, spill_dir=str(tmp_path))
+    _walk(first)
+    _walk(second)
+    assert first.reloaded and second.reloaded
+    for world in (first, second):
+        for (cx, cy), chunk in world.chunks.items():
+            assert chunk.passages == generate_chunk(world.seed, cx, cy, world.chunk_size).passages
+    first.close()
+    second.close()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,39 @@
+#File for testing the game's event stream
+import time
+
+import pytest
+
+from events import *
+from game import *
+
+
+def _play(sink) -> None:
+    game = MUDGame(1, events=sink)
+    game.step("alice")
+    for _ in range(20):
+        if game.state == GAMEOVER:
+            break
+        game.step("1")
+
+@pytest.mark.parametrize("format", [JSONL, FRAMES])
+def test_file_sink_round_trip(tmp_path, format):
+    memory = ListSink()
+    _play(memory)
+    path = str(tmp_path / "events")
+    with FileSink(path, format=format, batch_size=4) as sink:
+        for event in memory.events:
+            sink.emit(event)
+    assert list(read_events(path, format)) == memory.events
+
+def test_emit_raises_once_the_writer_failed(tmp_path):
+    sink = FileSink(str(tmp_path / "events"), flush_interval=0.01)
+    sink._file.close() # the writer thread fails on its next write
+    sink.emit(MoveEvent(1, 0, 0, NORTH))
+    deadline = time.monotonic() + 5
+    while sink._error is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    with pytest.raises(ValueError):
+        sink.emit(MoveEvent(2, 0, 1, NORTH))
+    with pytest.raises(ValueError):
+        sink.close()
@@ -0,0 +1,23 @@
+#File for testing the game's state machine
+import pytest
+
+from game import *
+
+
+def test_move_table_cannot_be_changed():
+    options = MOVE_TABLE[DIRBITS[NORTH] | DIRBITS[EAST]]
+    assert dict(options.choices) == {"1": NORTH, "2": EAST}
+    with pytest.raises(TypeError):
+        options.choices["3"] = WEST
+
+def test_same_seed_same_game():
+    transcripts = []
+    for _ in range(2):
+        game = MUDGame(7)
+        lines = game.step("alice")
+        for _ in range(50):
+            if game.state == GAMEOVER:
+                break
+            lines += game.step("1")
+        transcripts.append(lines)
+    assert transcripts[0] == transcripts[1]
@@ -0,0 +1,42 @@
+#File for testing corpora of labyrinths
+import os
+
+import pytest
+
+import gencorpus
+from gencorpus import *
+
+
+def test_corpus_round_trip(tmp_path):
+    path = str(tmp_path / "mazes.corpus")
+    generate_corpus(path, 8, 6, range(10, 15), workers=0, batch=2)
+    with Corpus(path) as corpus:
+        assert len(corpus) == 5
+        assert (corpus.width, corpus.height) == (8, 6)
+        for i, seed in enumerate(range(10, 15)):
+            lab = Labyrinth(8, 6, rng=RandomStreams(seed))
+            lab.generate_random(verbose=False)
+            assert corpus.seed(i) == seed
+            assert bytes(corpus[i].passages) == bytes(lab.passages)
+            assert corpus.stats(i) == maze_stats(lab)
+        assert corpus.all_stats() == [corpus.stats(i) for i in range(5)]
+        with pytest.raises(IndexError):
+            corpus[5]
+
+def test_failed_generation_leaves_no_file(tmp_path, monkeypatch):
+    def broken(width, height, seeds):
+        raise RuntimeError("broken on purpose")
+    monkeypatch.setattr(gencorpus, "_generate_batch", broken)
+    with pytest.raises(RuntimeError):
+        generate_corpus(str(tmp_path / "mazes.corpus"), 8, 8, range(3), workers=0)
+    assert os.listdir(tmp_path) == []
+
+def test_entry_past_the_end(tmp_path):
+    path = str(tmp_path / "mazes.corpus")
+    generate_corpus(path, 8, 8, range(2), workers=0)
+    with open(path, "r+b") as f: # make the first entry claim a length that goes past the end of the file
+        f.seek(CORPUS_HEADER.unpack_from(f.read(CORPUS_HEADER.size))[-1] + 8)
+        f.write(struct.pack("<Q", 1 << 40))
+    with Corpus(path) as corpus:
+        with pytest.raises(ValueError):
+            corpus[0]
@@ -0,0 +1,36 @@
+#File for testing Steve's inventory
+from data import *
+
+
+def _foods(n: int) -> list[Food]:
+    return [Food(f"Test Food {i}", "Food", i + 1) for i in range(n)]
+
+def test_positions_follow_menu_order():
+    inventory = Inventory()
+    foods = _foods(5)
+    for food in foods:
+        inventory.add(food, 2)
+    assert [inventory.index_of(food) for food in foods] == [0, 1, 2, 3, 4]
+    inventory.remove(foods[1], 2) # the stack goes away, the ones after it move up
+    assert inventory.index_of(foods[1]) == -1
+    assert [inventory.index_of(food) for food in foods[2:]] == [1, 2, 3]
+    inventory.add(foods[1])
+    assert inventory.index_of(foods[1]) == 4
+    assert [inventory.at(i)[0] for i in range(len(inventory))] == [foods[0], foods[2], foods[3], foods[4], foods[1]]
+
+def test_partial_remove_keeps_position():
+    inventory = Inventory()
+    foods = _foods(3)
+    inventory.add_many([(food, 3) for food in foods])
+    inventory.remove(foods[0], 1)
+    assert inventory.index_of(foods[0]) == 0
+    assert inventory.count(foods[0]) == 2
+
+def test_clear():
+    inventory = Inventory()
+    food = _foods(1)[0]
+    inventory.add(food)
+    inventory.clear()
+    assert inventory.index_of(food) == -1
+    inventory.add(food)
+    assert inventory.index_of(food) == 0 and inventory.at(0) == (food, 1)
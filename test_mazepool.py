@@ -0,0 +1,49 @@
+#File for testing the pool of labyrinths generated ahead of time
+import time
+
+import pytest
+
+import mazepool
+from mazepool import MazePool
+
+
+def _wait_ready(pool: MazePool, *key) -> None:
+    deadline = time.monotonic() + 10
+    while not pool.ready(*key):
+        assert time.monotonic() < deadline, "the pool never filled up"
+        time.sleep(0.01)
+
+def test_get_ready_labyrinth():
+    with MazePool(capacity=1) as pool:
+        pool.want(10, seed_class="test")
+        _wait_ready(pool, 10, None, "test")
+        lab = pool.get(10, seed_class="test")
+        assert pool.hits == 1
+        assert lab.rng.seed == "test/0"
+        assert (lab.width, lab.height) == (10, 10)
+
+def test_miss_generates_right_away():
+    with MazePool(capacity=1) as pool:
+        lab = pool.get(12, 8)
+        assert (lab.width, lab.height) == (12, 8)
+
+def test_close_does_not_wait_for_generation():
+    pool = MazePool(capacity=1)
+    pool.want(600)
+    time.sleep(0.05) # the background thread is generating
+    start = time.monotonic()
+    pool.close()
+    assert time.monotonic() - start < 0.5
+
+def test_background_error_raised_by_get(monkeypatch):
+    def broken(width, height, seed, walls):
+        raise MemoryError("broken on purpose")
+    monkeypatch.setattr(mazepool, "generate_labyrinth", broken)
+    with MazePool(capacity=1) as pool:
+        pool.want(10)
+        deadline = time.monotonic() + 10
+        while pool._error is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        with pytest.raises(MemoryError):
+            pool.get(10)
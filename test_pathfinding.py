@@ -0,0 +1,49 @@
+#File for testing pathfinding
+import pytest
+
+from pathfinding import *
+
+
+def _maze(size: int = 12, seed: int = 5) -> Labyrinth:
+    lab = Labyrinth(size, rng=RandomStreams(seed))
+    lab.generate_random(verbose=False)
+    return lab
+
+def _check_path(lab: Labyrinth, path: list[list[int]], start: list[int], goal: list[int]) -> None:
+    assert path[0] == list(start) and path[-1] == list(goal)
+    for here, there in zip(path, path[1:]):
+        assert lab.can_move_here(here, direction_of(here, there))
+
+@pytest.mark.parametrize("search", [astar, bidirectional_bfs])
+def test_paths_are_shortest(search):
+    lab = _maze()
+    rng = random.Random(1)
+    for _ in range(50):
+        start = [rng.randrange(lab.width), rng.randrange(lab.height)]
+        goal = [rng.randrange(lab.width), rng.randrange(lab.height)]
+        path = search(lab, start, goal)
+        _check_path(lab, path, start, goal)
+        assert len(path) - 1 == DistanceField(lab, goal).distance(start)
+
+def test_reachable_within():
+    lab = _maze()
+    field = DistanceField(lab, lab.start_pos)
+    reachable = reachable_within(lab, lab.start_pos, 4)
+    assert reachable == {(x, y): field.distance([x, y]) for x in range(lab.width) for y in range(lab.height)
+                         if field.distance([x, y]) <= 4}
+
+def test_cache_follows_the_labyrinth_version():
+    lab = _maze()
+    paths = PathFinder(lab)
+    start, goal = lab.start_pos, lab.boss_pos
+    first = paths.shortest_path(start, goal)
+    assert paths.shortest_path(start, goal) is first
+    assert paths.hits == 1 and paths.misses == 1
+    x, y = first[len(first) // 2]
+    walls = [d for d in (NORTH, SOUTH, EAST, WEST) if not lab.can_move_here([x, y], d)
+             and 0 <= x + DIROFFSETS[d][0] < lab.width and 0 <= y + DIROFFSETS[d][1] < lab.height]
+    dx, dy = DIROFFSETS[walls[0]]
+    lab.set_access([x, y], [x + dx, y + dy]) # a new passage, the cached path may no longer be the shortest
+    path = paths.shortest_path(start, goal)
+    assert paths.misses == 2
+    assert len(path) - 1 == DistanceField(lab, goal).distance(start)
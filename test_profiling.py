@@ -0,0 +1,30 @@
+#File for testing the profiler
+import pytest
+
+from profiling import *
+
+
+def test_every_phase_is_timed():
+    profiler = Profiler()
+    profiler.enable()
+    try:
+        game = MUDGame(1)
+        game.step("alice")
+        for _ in range(30):
+            if game.state == GAMEOVER:
+                break
+            game.step("1")
+    finally:
+        profiler.disable()
+    for name in GAME_PHASES:
+        assert f"MUDGame.{name}" in profiler.timers
+    assert profiler.timers["MUDGame._check_item"].calls > 0
+
+def test_reset_during_capture():
+    profiler = Profiler()
+    profiler.capture(2, cprofile=False)
+    try:
+        with pytest.raises(RuntimeError):
+            profiler.reset()
+    finally:
+        profiler.disable()
@@ -0,0 +1,29 @@
+#File for testing recordings and replays
+import pytest
+
+import savegame
+from replay import *
+
+
+def test_game_at_matches_playing_from_the_start(tmp_path):
+    recording = record_bot_game(4, keyframe_every=10)
+    assert len(recording.keyframes) == len(recording) // 10 + 1
+    path = str(tmp_path / "game.replay")
+    recording.save(path)
+    loaded = Recording.load(path)
+    assert loaded.actions == recording.actions and loaded.turns == recording.turns
+    assert loaded.verify() == len(recording.keyframes)
+    game = savegame.loads(recording.keyframes[0])
+    for step, action in enumerate(recording.actions, 1):
+        game.step(action)
+        if step % 7 == 0:
+            assert savegame.dumps(loaded.game_at(step)) == savegame.dumps(game)
+
+def test_turns():
+    recording = record_bot_game(4, keyframe_every=10)
+    turn = recording.turns[len(recording) // 2]
+    assert recording.game_at_turn(turn).maze.turn == turn
+    with pytest.raises(IndexError):
+        recording.step_of_turn(recording.turns[-1] + 1)
+    with pytest.raises(IndexError):
+        recording.game_at(len(recording) + 1)
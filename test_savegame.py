@@ -0,0 +1,59 @@
+#File for testing saving and loading games
+import savegame
+from game import *
+
+
+def test_loaded_game_steps():
+    """A loaded game must have every attribute step() uses, not only the ones that are saved."""
+    game = MUDGame(1)
+    game.step("alice")
+    loaded = savegame.loads(savegame.dumps(game))
+    assert loaded.step("1") == game.step("1")
+    assert savegame.dumps(loaded) == savegame.dumps(game)
+
+def _version_1_save(game: MUDGame) -> bytes:
+    """The save of game as version 1 wrote it, before Steve's stat modifiers were saved."""
+    assert not game.steve.modifiers
+    data = bytearray(savegame.dumps(game))
+    boss = savegame._Writer()
+    savegame._put_creature(boss, game.boss)
+    modifiers = len(data) - len(boss.out) - 1 # the modifiers are one count byte of 0 just before the boss
+    assert data[modifiers] == 0
+    del data[modifiers]
+    header = list(savegame.HEADER.unpack_from(data, 0))
+    header[1] = 1 # version
+    header[-1] -= 1 # entities length
+    savegame.HEADER.pack_into(data, 0, *header)
+    return bytes(data)
+
+def test_loads_version_1():
+    game = MUDGame(2)
+    game.step("alice")
+    data = _version_1_save(game)
+    assert savegame.read_header(data)["version"] == 1
+    loaded = savegame.loads(data)
+    assert loaded.steve.modifiers == {}
+    assert savegame.dumps(loaded) == savegame.dumps(game)
+    assert loaded.step("1") == game.step("1")
+
+def test_room_contents_survive():
+    lab = Labyrinth(8, rng=RandomStreams(3))
+    lab.generate_random(verbose=False)
+    creature = Creature("Test Zombie", 30, 8, random.Random(1))
+    lab.get_room([2, 5]).set_creature(creature)
+    lab.get_room([2, 5]).set_item(Food("Test Apple", "Food", 3))
+    lab.get_room([7, 0]).cleared = True
+    loaded = savegame.loads(savegame.dumps(lab))
+    room = loaded.get_room([2, 5])
+    assert room.creature.name == "Test Zombie" and room.creature.hitpoints == creature.hitpoints
+    assert room.item.name == "Test Apple"
+    assert loaded.get_room([7, 0]).cleared
+    assert loaded.rooms.used() == lab.rooms.used()
+
+def test_saves_do_not_depend_on_the_order_items_were_placed_in():
+    lab = Labyrinth(8, rng=RandomStreams(3))
+    lab.generate_random(verbose=False)
+    lab.get_room([6, 6]).set_item(Food("Test Apple", "Food", 3))
+    lab.get_room([1, 1]).set_item(Food("Test Apple", "Food", 2))
+    data = savegame.dumps(lab)
+    assert savegame.dumps(savegame.loads(data)) == data
@@ -0,0 +1,57 @@
+#File for testing the server on loopback
+import asyncio
+
+import server
+from game import *
+
+
+def _serve(test, **options):
+    """Runs test(mud) against a MUDServer listening on a free loopback port."""
+    async def main():
+        mud = server.MUDServer(port=0, **options)
+        await mud.start()
+        try:
+            return await test(mud)
+        finally:
+            await mud.close()
+    return asyncio.run(main())
+
+def test_session():
+    async def test(mud):
+        return await server.run_client("127.0.0.1", mud.port, ["alice"])
+    text = _serve(test, make_game=lambda: MUDGame(1))
+    assert "alice, OH NO YOU ARE TRAPPED!" in text
+    assert text.endswith(": ")
+
+def test_server_full():
+    async def test(mud):
+        reader, writer = await asyncio.open_connection("127.0.0.1", mud.port)
+        await server._read_until_prompt(reader) # the first player is playing
+        text = await server.run_client("127.0.0.1", mud.port, ["bob"])
+        writer.close()
+        return text, mud.refused
+    text, refused = _serve(test, max_sessions=1, make_game=lambda: MUDGame(1))
+    assert "The server is full" in text
+    assert refused == 1
+
+def test_idle_timeout():
+    async def test(mud):
+        reader, writer = await asyncio.open_connection("127.0.0.1", mud.port)
+        await server._read_until_prompt(reader)
+        text = (await asyncio.wait_for(reader.read(), 5)).decode()
+        writer.close()
+        return text, mud.timed_out
+    text, timed_out = _serve(test, idle_timeout=0.2, make_game=lambda: MUDGame(1))
+    assert "Disconnected for being idle." in text
+    assert timed_out == 1
+
+def test_game_that_crashes():
+    class Broken(MUDGame):
+        def step(self, action):
+            raise RuntimeError("broken on purpose")
+    async def test(mud):
+        text = await server.run_client("127.0.0.1", mud.port, ["alice"])
+        return text, mud.crashed
+    text, crashed = _serve(test, make_game=lambda: Broken(1))
+    assert "Something went wrong in the game" in text
+    assert crashed == 1
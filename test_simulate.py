@@ -0,0 +1,17 @@
+#File for testing the bot simulations
+import pytest
+
+import simulate
+
+
+def test_rejects_no_games():
+    for games in (0, -3):
+        with pytest.raises(ValueError):
+            simulate.simulate(games)
+
+def test_rejects_no_workers():
+    with pytest.raises(ValueError):
+        simulate.simulate(1, workers=0)
+
+def test_results_do_not_depend_on_workers():
+    assert simulate.simulate(6, workers=1, batch=2) == simulate.simulate(6, workers=2, batch=4)
@@ -0,0 +1,246 @@
+#File for the shared world, where many players play in the same labyrinth
+# Each player has their own Steve, but the rooms, their creatures and items, and the boss are shared.
+# The world does not wait for players: a TickScheduler calls SharedWorld.tick() at a fixed rate,
+# which moves the boss and has every creature that shares a room with players attack one of them.
+# e.g.
+#   world = SharedWorld(lab)
+#   alice = world.add_player("alice")
+#   world.move_player(alice.id, NORTH)
+#   asyncio.run(TickScheduler(world, interval=0.5).run())
+import asyncio
+
+from game import *
+
+BOSS_MOVE_CHANCE = 30 # percent chance the boss moves on a tick, like between turns in MUDGame
+
+
+class Player:
+    """
+    One of the players of a SharedWorld.
+
+    -- ATTRIBUTES --
+    + id: int
+    + name: str
+    + steve: Steve
+    + pos: list[int]
+    + turns: int, number of rooms the player has entered, counting the startroom
+    + messages: list[str], what happened to the player since the front end last took them
+    """
+    def __init__(self, player_id: int, name: str, pos: list[int]):
+        self.id = player_id
+        self.name = name
+        self.steve = Steve()
+        self.pos = list(pos)
+        self.turns = 1
+        self.messages = []
+
+    def __repr__(self):
+        return f"Player {self.id} ({self.name}) at {self.pos}, {self.steve.health} HP"
+
+    def take_messages(self) -> list[str]:
+        """Returns the messages and forgets them."""
+        messages = self.messages
+        self.messages = []
+        return messages
+
+
+class SharedWorld:
+    """
+    Many players in one labyrinth.
+
+    occupancy maps a cell (indexed like Labyrinth.passages) to the ids of the players in it,
+    only cells with players in them are kept, so a tick costs the number of occupied rooms, not the size of the labyrinth.
+    A room's ROOM_STEVE flag tells whether any player is in it: the room spawns its contents when the first player
+    walks in and is cleared once the last one leaves, the same as with a single Steve.
+
+    -- ATTRIBUTES --
+    + labyrinth: Labyrinth
+    + boss: Boss
+    + players: dict[int, Player], players that are alive
+    + occupancy: dict[int, set[int]], cell -> ids of the players in it
+    + ticks: int, number of ticks so far
+    - rng: RandomStreams, the labyrinth's
+
+    -- METHODS --
+    + add_player(self, name: str) -> Player
+    + remove_player(self, player_id: int) -> None
+    + players_at(self, coords: list[int]) -> list[Player]
+    + move_player(self, player_id: int, direction) -> None
+    + attack(self, player_id: int) -> None
+    + pick_up(self, player_id: int) -> None
+    + tick(self) -> None
+    """
+    def __init__(self, labyrinth: Labyrinth):
+        self.labyrinth = labyrinth
+        self.rng = labyrinth.rng
+        self.boss = Boss(self.rng.spawn)
+        self.players = {}
+        self.occupancy = {}
+        self.ticks = 0
+        self._next_id = 1
+        # nobody is in the startroom until a player joins, and nothing ever spawns there
+        startroom = labyrinth.get_room(labyrinth.start_pos)
+        startroom.flags = (startroom.flags & ~ROOM_STEVE) | ROOM_CLEARED
+
+    def _index(self, coords: list[int]) -> int:
+        return coords[0] * self.labyrinth.height + coords[1]
+
+    def _player(self, player_id: int) -> Player:
+        if player_id not in self.players:
+            raise ValueError(f"There is no player {player_id} in the world, or they are dead.")
+        return self.players[player_id]
+
+    def _enter(self, player: Player) -> None:
+        """Puts player in the occupancy index at player.pos."""
+        lab = self.labyrinth
+        index = self._index(player.pos)
+        lab.visited[index] = 1
+        occupants = self.occupancy.get(index)
+        if occupants is None: # first player in the room
+            occupants = self.occupancy[index] = set()
+            depth = abs(player.pos[0] - lab.start_pos[0]) + abs(player.pos[1] - lab.start_pos[1])
+            lab.get_room(player.pos).steve_enters(self.rng.spawn, depth, player.turns)
+        occupants.add(player.id)
+
+    def _leave(self, player: Player) -> None:
+        """Takes player out of the occupancy index."""
+        index = self._index(player.pos)
+        occupants = self.occupancy[index]
+        occupants.discard(player.id)
+        if not occupants: # last player out
+            del self.occupancy[index]
+            self.labyrinth.get_room(player.pos).steve_leaves()
+
+    def add_player(self, name: str) -> Player:
+        """A new player joins, in the startroom."""
+        player = Player(self._next_id, name, self.labyrinth.start_pos)
+        self._next_id += 1
+        self.players[player.id] = player
+        self._enter(player)
+        return player
+
+    def remove_player(self, player_id: int) -> None:
+        """A player leaves the world (or dies)."""
+        player = self._player(player_id)
+        self._leave(player)
+        del self.players[player_id]
+
+    def players_at(self, coords: list[int]) -> list[Player]:
+        """The players in a room, in the order they joined the world."""
+        return [self.players[i] for i in sorted(self.occupancy.get(self._index(coords), ()))]
+
+    def creature_at(self, coords: list[int]) -> Creature:
+        """The creature the players in a room have to deal with: the boss if it is there, else the room's creature."""
+        if self.labyrinth.boss_pos == list(coords) and not self.boss.isdead():
+            return self.boss
+        creature = self.labyrinth.get_room(coords).get_creature()
+        if creature is not None and creature.isdead():
+            return None
+        return creature
+
+    def move_player(self, player_id: int, direction) -> None:
+        player = self._player(player_id)
+        if not self.labyrinth.can_move_here(player.pos, direction):
+            raise ValueError(f"{player.name} cannot go {direction} from room {player.pos}.")
+        self._leave(player)
+        dx, dy = DIROFFSETS[direction]
+        player.pos = [player.pos[0] + dx, player.pos[1] + dy]
+        player.turns += 1
+        self._enter(player)
+        creature = self.creature_at(player.pos)
+        if creature is not None:
+            player.messages.append(f"A {creature.get_name()} is in this room!")
+
+    def attack(self, player_id: int) -> None:
+        """The player hits the creature in their room."""
+        player = self._player(player_id)
+        creature = self.creature_at(player.pos)
+        if creature is None:
+            raise ValueError(f"There is nothing for {player.name} to attack in room {player.pos}.")
+        creature.take_damage(player.steve.get_attack())
+        for other in self.players_at(player.pos):
+            other.messages.append(f"{player.name} hit the {creature.get_name()}, it now has {creature.get_health()} HP")
+        if creature.isdead() and creature is not self.boss:
+            self.labyrinth.get_room(player.pos).set_creature_None()
+
+    def pick_up(self, player_id: int) -> None:
+        """The player takes the item in their room, nobody else can have it then."""
+        player = self._player(player_id)
+        room = self.labyrinth.get_room(player.pos)
+        if room.item is None:
+            raise ValueError(f"There is no item for {player.name} to pick up in room {player.pos}.")
+        player.steve._add_item_to_inv(room.item, 1)
+        player.messages.append(f"You picked up {room.item.name}.")
+        room.item = None
+
+    def tick(self) -> None:
+        """Moves the world on by one tick: the boss may move, towards the nearest player if it is hunting,
+        then every creature in a room with players makes one move against one of them."""
+        self.ticks += 1
+        lab = self.labyrinth
+        if not self.boss.isdead() and self.rng.maze.randint(1, 100) <= BOSS_MOVE_CHANCE:
+            target = lab.boss_pos # nobody to hunt, it wanders
+            if lab.boss_hunting and self.players:
+                field = lab.boss_distances()
+                target = min(self.players.values(), key=lambda player: (field.distance(player.pos), player.id)).pos
+            lab.move_boss(target)
+        for index in list(self.occupancy):
+            coords = [index // lab.height, index % lab.height]
+            creature = self.creature_at(coords)
+            if creature is None:
+                continue
+            player = self.players[self.rng.combat.choice(sorted(self.occupancy[index]))]
+            damage = creature.random_move(self.rng.combat)
+            if damage == 0:
+                player.messages.append(f"The {creature.name} has healed itself.")
+                continue
+            player.steve.take_damage(damage)
+            player.messages.append(f"The {creature.name} has dealt {damage} damage on you.")
+            if player.steve.isdead():
+                player.messages.append("YOU DIED...")
+                self.remove_player(player.id)
+
+
+class TickScheduler:
+    """
+    Calls world.tick() every interval seconds on the running event loop.
+    Ticks are scheduled from when the scheduler started, not from when the last tick ended, so they do not drift.
+    If the loop falls more than max_behind ticks behind, the missed ticks are skipped rather than run back to back.
+
+    -- ATTRIBUTES --
+    + world: SharedWorld
+    + interval: float, seconds between ticks
+    + max_behind: int
+    + skipped: int, number of ticks skipped so far
+    """
+    def __init__(self, world: SharedWorld, interval: float = 0.5, max_behind: int = 5):
+        if interval <= 0:
+            raise ValueError(f"Tick interval must be positive, not {interval}.")
+        self.world = world
+        self.interval = interval
+        self.max_behind = max_behind
+        self.skipped = 0
+        self._stopped = False
+
+    def stop(self) -> None:
+        """Makes run() return before its next tick."""
+        self._stopped = True
+
+    async def run(self, ticks: int = None) -> None:
+        """Ticks until stop() is called, or ticks times if given."""
+        loop = asyncio.get_running_loop()
+        next_time = loop.time()
+        done = 0
+        while not self._stopped and (ticks is None or done < ticks):
+            delay = next_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            behind = int((loop.time() - next_time) / self.interval)
+            if behind > self.max_behind:
+                self.skipped += behind
+                next_time += behind * self.interval
+            if self._stopped:
+                break
+            self.world.tick()
+            done += 1
+            next_time += self.interval